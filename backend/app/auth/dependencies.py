@@ -26,7 +26,7 @@ async def get_current_user(
         )
     # validate jti against redis denylist
     jti = token.get("jti")
-    if redis_service.get(f"denylist:{jti}"):
+    if await redis_service.get(f"denylist:{jti}"):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="Token has been revoked"
         )
@@ -22,7 +22,9 @@ def get_password_hash(password):
     return pwd_context.hash(password)
 
 
-def create_access_token(data: dict, expires_delta: Union[timedelta, None] = None):
+async def create_access_token(
+    data: dict, expires_delta: Union[timedelta, None] = None
+):
     redis_service = get_redis_service()
     jti = str(uuid.uuid4())
     to_encode = data.copy()
@@ -37,12 +39,14 @@ def create_access_token(data: dict, expires_delta: Union[timedelta, None] = None
     encoded_jwt = jwt.encode(
         to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM
     )
-    redis_service.set(jti, jti, expiry=int(expires_delta.total_seconds()))
+    await redis_service.set(
+        f"jti:{jti}", jti, expiry=int(expires_delta.total_seconds())
+    )
 
     return encoded_jwt
 
 
-def verify_access_token(
+async def verify_access_token(
     token: str = Depends(oauth2_scheme),
     redis_service: RedisService = Depends(get_redis_service),
 ):
@@ -54,7 +58,10 @@ def verify_access_token(
         if not jti:
             return None
 
-        in_redis = redis_service.get(jti)
+        in_redis = await redis_service.get(f"jti:{jti}")
+        if not in_redis:
+            # Tokens issued before the key was namespaced live under the bare jti
+            in_redis = await redis_service.get(jti)
         if not in_redis:
             return None
 
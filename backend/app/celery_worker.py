@@ -1,4 +1,10 @@
+import asyncio
+
 from celery import Celery
+from celery.signals import worker_process_init, worker_process_shutdown
+
+from app.utils.bitcoin_rpc import rpc_client
+from app.utils.rate_limiter import BACKGROUND, priority
 
 celery_app = Celery(
     "bitcoin_app",
@@ -14,3 +20,33 @@ celery_app.conf.update(
     enable_utc=True,
     imports=["app.tasks.tasks"],
 )
+
+# Each worker process keeps one event loop alive for its whole lifetime so the
+# pooled RPC client (and its keep-alive connections) survive between calls.
+_worker_loop = None
+
+
+async def _as_background(coro):
+    # Task work yields to interactive API requests at the upstream rate limits
+    with priority(BACKGROUND):
+        return await coro
+
+
+def run_async(coro):
+    """Run a coroutine on the worker process' long-lived event loop."""
+    global _worker_loop
+    if _worker_loop is None or _worker_loop.is_closed():
+        _worker_loop = asyncio.new_event_loop()
+    return _worker_loop.run_until_complete(_as_background(coro))
+
+
+@worker_process_init.connect
+def start_rpc_client(**kwargs):
+    run_async(rpc_client.start())
+
+
+@worker_process_shutdown.connect
+def close_rpc_client(**kwargs):
+    if _worker_loop is not None and not _worker_loop.is_closed():
+        run_async(rpc_client.close())
+        _worker_loop.close()
@@ -1,4 +1,5 @@
 import os
+from typing import List
 from dotenv import load_dotenv
 from pydantic_settings import BaseSettings
 from pydantic import Field, computed_field
@@ -24,16 +25,161 @@ class Settings(BaseSettings):
 
     WALLET_NAME: str = Field(default=os.getenv("BITCOIN_WALLET_NAME", "default_wallet"))
 
+    # Bitcoin RPC client pooling
+    RPC_MAX_CONNECTIONS: int = Field(
+        default=int(os.getenv("BITCOIN_RPC_MAX_CONNECTIONS", 16))
+    )
+    RPC_TIMEOUT: float = Field(default=float(os.getenv("BITCOIN_RPC_TIMEOUT", 30)))
+    RPC_KEEPALIVE_TIMEOUT: float = Field(
+        default=float(os.getenv("BITCOIN_RPC_KEEPALIVE_TIMEOUT", 60))
+    )
+    RPC_BATCH_SIZE: int = Field(default=int(os.getenv("BITCOIN_RPC_BATCH_SIZE", 500)))
+
+    # Optional comma separated list of bitcoind backends ("host:port" or full
+    # URLs, credentials in the URL override BITCOIN_RPC_USER/PASSWORD).
+    # Falls back to BITCOIN_RPC_HOST/BITCOIN_RPC_PORT when empty.
+    RPC_BACKENDS: str = Field(default=os.getenv("BITCOIN_RPC_BACKENDS", ""))
+    RPC_ROUTING: str = Field(default=os.getenv("BITCOIN_RPC_ROUTING", "ewma"))
+    RPC_HEALTH_CHECK_INTERVAL: float = Field(
+        default=float(os.getenv("BITCOIN_RPC_HEALTH_CHECK_INTERVAL", 10))
+    )
+    RPC_HEALTH_CHECK_TIMEOUT: float = Field(
+        default=float(os.getenv("BITCOIN_RPC_HEALTH_CHECK_TIMEOUT", 5))
+    )
+    RPC_MAX_BLOCK_LAG: int = Field(
+        default=int(os.getenv("BITCOIN_RPC_MAX_BLOCK_LAG", 2))
+    )
+
+    # Fetch blocks/transactions as binary through bitcoind's REST interface
+    # (requires -rest=1), falling back to JSON-RPC when it is unavailable
+    RPC_USE_REST: bool = Field(
+        default=os.getenv("BITCOIN_RPC_USE_REST", "false").lower() == "true"
+    )
+    # Chain used to render addresses from raw scripts: mainnet, testnet, regtest
+    BITCOIN_NETWORK: str = Field(default=os.getenv("BITCOIN_NETWORK", "mainnet"))
+
+    # In-process header chain index (height -> hash/time/nTx), polled for
+    # new tips every HEADER_INDEX_POLL_INTERVAL seconds
+    HEADER_INDEX_ENABLED: bool = Field(
+        default=os.getenv("HEADER_INDEX_ENABLED", "true").lower() == "true"
+    )
+    HEADER_INDEX_POLL_INTERVAL: float = Field(
+        default=float(os.getenv("HEADER_INDEX_POLL_INTERVAL", 5))
+    )
+
+    @computed_field
+    @property
+    def RPC_BACKEND_URLS(self) -> List[str]:
+        urls = [url.strip() for url in self.RPC_BACKENDS.split(",") if url.strip()]
+        return urls or [f"{self.RPC_HOST}:{self.RPC_PORT}"]
+
     # Umbrel
     UMBREL_HOST: str = Field(default=os.getenv("UMBREL_HOST", "127.0.0.1"))
     UMBREL_PORT: int = Field(default=int(os.getenv("UMBREL_PORT", 3006)))
 
+    # Mempool (esplora) REST client
+    MEMPOOL_MAX_CONNECTIONS: int = Field(
+        default=int(os.getenv("MEMPOOL_MAX_CONNECTIONS", 32))
+    )
+    MEMPOOL_TIMEOUT: float = Field(default=float(os.getenv("MEMPOOL_TIMEOUT", 30)))
+    MEMPOOL_RETRIES: int = Field(default=int(os.getenv("MEMPOOL_RETRIES", 2)))
+    MEMPOOL_RETRY_BACKOFF: float = Field(
+        default=float(os.getenv("MEMPOOL_RETRY_BACKOFF", 0.2))
+    )
+    # Mempool request rate per worker process (requests/s, 0 = unlimited) and
+    # burst size; interactive requests are served before background ones when
+    # throttled
+    MEMPOOL_RATE_LIMIT: float = Field(
+        default=float(os.getenv("MEMPOOL_RATE_LIMIT", 0))
+    )
+    MEMPOOL_RATE_BURST: int = Field(default=int(os.getenv("MEMPOOL_RATE_BURST", 20)))
+    # Bodies kept for ETag/Last-Modified revalidation, in response bytes
+    MEMPOOL_HTTP_CACHE_BYTES: int = Field(
+        default=int(os.getenv("MEMPOOL_HTTP_CACHE_BYTES", 64 * 1024 * 1024))
+    )
+    MEMPOOL_HTTP_CACHE_MAX_ENTRY_BYTES: int = Field(
+        default=int(os.getenv("MEMPOOL_HTTP_CACHE_MAX_ENTRY_BYTES", 4 * 1024 * 1024))
+    )
+
+    # Address history paging: pages fetched ahead of processing, and pages
+    # fetched concurrently from stored page anchors in parallel mode
+    ADDRESS_PAGE_PREFETCH: int = Field(
+        default=int(os.getenv("ADDRESS_PAGE_PREFETCH", 4))
+    )
+    ADDRESS_PARALLEL_PAGES: bool = Field(
+        default=os.getenv("ADDRESS_PARALLEL_PAGES", "true").lower() == "true"
+    )
+    ADDRESS_PARALLEL_FETCHES: int = Field(
+        default=int(os.getenv("ADDRESS_PARALLEL_FETCHES", 8))
+    )
+
+    # Bulk lookup endpoints: items accepted per request and upstream fetches
+    # a single request may have in flight
+    BULK_LOOKUP_MAX_ITEMS: int = Field(
+        default=int(os.getenv("BULK_LOOKUP_MAX_ITEMS", 1000))
+    )
+    BULK_LOOKUP_CONCURRENCY: int = Field(
+        default=int(os.getenv("BULK_LOOKUP_CONCURRENCY", 16))
+    )
+
+    # Adaptive (AIMD) concurrency limits for upstream calls. The RPC limit is
+    # per backend and should stay at or below bitcoind's -rpcworkqueue.
+    RPC_CONCURRENCY_INITIAL: int = Field(
+        default=int(os.getenv("BITCOIN_RPC_CONCURRENCY_INITIAL", 4))
+    )
+    RPC_CONCURRENCY_MIN: int = Field(
+        default=int(os.getenv("BITCOIN_RPC_CONCURRENCY_MIN", 1))
+    )
+    RPC_CONCURRENCY_MAX: int = Field(
+        default=int(os.getenv("BITCOIN_RPC_CONCURRENCY_MAX", 16))
+    )
+    MEMPOOL_CONCURRENCY_INITIAL: int = Field(
+        default=int(os.getenv("MEMPOOL_CONCURRENCY_INITIAL", 8))
+    )
+    MEMPOOL_CONCURRENCY_MIN: int = Field(
+        default=int(os.getenv("MEMPOOL_CONCURRENCY_MIN", 1))
+    )
+    MEMPOOL_CONCURRENCY_MAX: int = Field(
+        default=int(os.getenv("MEMPOOL_CONCURRENCY_MAX", 32))
+    )
+
+    # Maximum number of distinct upstream calls coalesced at the same time
+    SINGLE_FLIGHT_MAX_KEYS: int = Field(
+        default=int(os.getenv("SINGLE_FLIGHT_MAX_KEYS", 1024))
+    )
+
     # Redis
     REDIS_HOST: str = Field(default=os.getenv("REDIS_HOST", "127.0.0.1"))
     REDIS_PORT: int = Field(default=int(os.getenv("REDIS_PORT", 6379)))
     REDIS_USERNAME: str = Field(default=os.getenv("REDIS_USERNAME", ""))
     REDIS_PASSWORD: str = Field(default=os.getenv("REDIS_PASSWORD", ""))
     REDIS_DB: int = Field(default=int(os.getenv("REDIS_DB", 0)))
+    # Async connection pool shared by the API process; callers wait up to
+    # REDIS_POOL_TIMEOUT seconds for a free connection
+    REDIS_MAX_CONNECTIONS: int = Field(
+        default=int(os.getenv("REDIS_MAX_CONNECTIONS", 64))
+    )
+    REDIS_POOL_TIMEOUT: float = Field(
+        default=float(os.getenv("REDIS_POOL_TIMEOUT", 5))
+    )
+    # In-process L1 tier in front of Redis: byte budget, largest entry, and
+    # "namespace=seconds" TTLs of the key prefixes it caches (empty disables)
+    L1_CACHE_BYTES: int = Field(
+        default=int(os.getenv("L1_CACHE_BYTES", 32 * 1024 * 1024))
+    )
+    L1_CACHE_MAX_ENTRY_BYTES: int = Field(
+        default=int(os.getenv("L1_CACHE_MAX_ENTRY_BYTES", 1024 * 1024))
+    )
+    L1_CACHE_TTLS: str = Field(
+        default=os.getenv(
+            "L1_CACHE_TTLS",
+            "node_info=5,latest_blocks=5,tx-info=30,tx-info-mempool=10,"
+            "wallet_info=10,jti=30,denylist=30",
+        )
+    )
+    L1_CACHE_CHANNEL: str = Field(
+        default=os.getenv("L1_CACHE_CHANNEL", "l1-cache-invalidation")
+    )
 
     # Use computed_field for dynamic Redis URL generation
     @computed_field
@@ -52,6 +198,60 @@ class Settings(BaseSettings):
         else:
             return f"redis://{self.REDIS_HOST}:{self.REDIS_PORT}/{self.REDIS_DB}"
 
+    # Local store for deeply confirmed (immutable) transactions and blocks;
+    # Redis keeps only volatile entries, which expire per app.utils.cache_policy
+    IMMUTABLE_STORE_PATH: str = Field(
+        default=os.getenv("IMMUTABLE_STORE_PATH", "data/immutable.sqlite3")
+    )
+    IMMUTABLE_MIN_CONFIRMATIONS: int = Field(
+        default=int(os.getenv("IMMUTABLE_MIN_CONFIRMATIONS", 6))
+    )
+    VOLATILE_CACHE_TTL: int = Field(default=int(os.getenv("VOLATILE_CACHE_TTL", 300)))
+    # Redis TTLs by object state (see app.utils.cache_policy); 0 = no expiry.
+    # Tip-dependent keys are also deleted as soon as a new block arrives.
+    CACHE_TTL_UNCONFIRMED: int = Field(
+        default=int(os.getenv("CACHE_TTL_UNCONFIRMED", 30))
+    )
+    CACHE_TTL_CONFIRMED: int = Field(
+        default=int(os.getenv("CACHE_TTL_CONFIRMED", 600))
+    )
+    CACHE_TTL_TIP: int = Field(default=int(os.getenv("CACHE_TTL_TIP", 600)))
+    CACHE_TTL_FINAL: int = Field(
+        default=int(os.getenv("CACHE_TTL_FINAL", 7 * 24 * 3600))
+    )
+    # "namespace=seconds" overrides for keys with a lifetime of their own
+    CACHE_NAMESPACE_TTLS: str = Field(
+        default=os.getenv(
+            "CACHE_NAMESPACE_TTLS",
+            "task=86400,tx-origin-trace=86400,tx-origin-trace-in-progress=3600,"
+            "address-page-anchors=604800",
+        )
+    )
+    # Stampede protection for hot keys read through get_or_compute: values are
+    # kept CACHE_STALE_TTL seconds past expiry to be served while one worker
+    # (holding a lock for at most CACHE_LOCK_TIMEOUT) recomputes them;
+    # CACHE_XFETCH_BETA > 1 favours refreshing earlier
+    CACHE_STALE_TTL: int = Field(default=int(os.getenv("CACHE_STALE_TTL", 60)))
+    CACHE_LOCK_TIMEOUT: float = Field(
+        default=float(os.getenv("CACHE_LOCK_TIMEOUT", 10))
+    )
+    CACHE_XFETCH_BETA: float = Field(
+        default=float(os.getenv("CACHE_XFETCH_BETA", 1.0))
+    )
+    # Cache values of CACHE_COMPRESS_THRESHOLD bytes or more (0 disables) are
+    # stored zstd-compressed as "json" or "msgpack" (see app.utils.value_codec)
+    CACHE_VALUE_FORMAT: str = Field(default=os.getenv("CACHE_VALUE_FORMAT", "json"))
+    CACHE_COMPRESS_THRESHOLD: int = Field(
+        default=int(os.getenv("CACHE_COMPRESS_THRESHOLD", 16 * 1024))
+    )
+    CACHE_COMPRESS_LEVEL: int = Field(
+        default=int(os.getenv("CACHE_COMPRESS_LEVEL", 3))
+    )
+    # Per-address history sync state (last final tx, totals, tx ids)
+    ADDRESS_SYNC_PATH: str = Field(
+        default=os.getenv("ADDRESS_SYNC_PATH", "data/address_sync.sqlite3")
+    )
+
     # Environment
     ENVIRONMENT: str = Field(default=os.getenv("ENVIRONMENT", "dev"))
 
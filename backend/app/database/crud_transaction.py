@@ -4,6 +4,7 @@ from app.schema.transaction import Transaction, TransactionUpdate
 from app.models.transactions import Transactions
 from app.models.wallets import Wallets
 from app.models.blocks import Blocks
+from app.utils.mempool_api import MempoolClient, mempool_client
 from app.utils.wallet_types import identify_bitcoin_wallet_type
 from typing import List, Optional
 import time
@@ -115,14 +116,14 @@ async def create_transaction_from_txid(
     db: AsyncSession,
     txid: str,
     user_id: int,
-    mempool_api_call,  # Pass this function as dependency
+    mempool: MempoolClient = mempool_client,
     block_hash: str = None,
     block_size: int = None
 ) -> Transactions:
     """Create a transaction from a transaction ID, auto-creating wallet and block"""
     
     # Fetch transaction info from mempool API
-    tx_info = await mempool_api_call(f"api/tx/{txid}")
+    tx_info = await mempool.get_transaction(txid)
     if not tx_info:
         raise ValueError(f"Transaction {txid} not found")
     
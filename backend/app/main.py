@@ -3,6 +3,7 @@ import logging
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 
 from app.routers import (
     auth, 
@@ -17,6 +18,17 @@ from app.routers import (
     background_tasks
 )
 from app.services.background_monitoring import background_service
+from app.config.config import settings
+from app.utils.address_sync import address_sync_store
+from app.utils.bitcoin_rpc import rpc_client
+from app.utils.header_index import header_index
+from app.utils.immutable_store import immutable_store
+from app.utils.mempool_api import mempool_client
+from app.utils.l1_cache import l1_cache
+from app.utils.redis import close_async_redis, get_async_redis, start_async_redis
+from app.utils.redis_service import get_redis_service
+from app.utils.metrics import registry as metrics_registry
+from app.utils.serialization import FastJSONResponse
 
 # Configure logging
 logging.basicConfig(
@@ -29,6 +41,11 @@ logger = logging.getLogger(__name__)
 # Background task for the monitoring service
 background_task = None
 
+
+async def expire_tip_dependent_cache(height: int, block_hash: str):
+    await get_redis_service().expire_tip_keys(block_hash)
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Handle application startup and shutdown"""
@@ -36,6 +53,18 @@ async def lifespan(app: FastAPI):
     
     # Startup
     logger.info("Starting application...")
+
+    # Open the pooled Bitcoin RPC client
+    await rpc_client.start()
+    await mempool_client.start()
+    await start_async_redis()
+    l1_cache.start(get_async_redis())
+
+    # Build and follow the header chain index in the background; every new
+    # block expires the cached values that depend on the tip
+    if settings.HEADER_INDEX_ENABLED:
+        header_index.on_new_tip(expire_tip_dependent_cache)
+        header_index.start(settings.HEADER_INDEX_POLL_INTERVAL)
     
     # Start the background monitoring service
     logger.info("Starting background monitoring service...")
@@ -56,11 +85,22 @@ async def lifespan(app: FastAPI):
         except asyncio.CancelledError:
             logger.info("Background monitoring service stopped")
 
+    await header_index.stop()
+
+    # Close the Bitcoin RPC client connections
+    await rpc_client.close()
+    await mempool_client.close()
+    await l1_cache.stop()
+    await close_async_redis()
+    immutable_store.close()
+    address_sync_store.close()
+
 app = FastAPI(
     title="Bitcoin Analysis API",
     description="API for Bitcoin blockchain analysis and monitoring",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse,
 )
 
 # Add CORS middleware
@@ -104,5 +144,21 @@ async def health_check():
             "running": background_service.is_running,
             "websocket_connected": background_service.mempool_service.is_connected,
             "tracked_addresses_count": len(background_service.mempool_service.tracked_addresses)
-        }
-    }
\ No newline at end of file
+        },
+        "upstream": {
+            "bitcoin_rpc": {
+                "backends": rpc_client.pool.snapshot(),
+                "coalescing": rpc_client.single_flight.stats(),
+            },
+            "mempool": mempool_client.stats(),
+        },
+        "header_index": header_index.stats(),
+        "immutable_store": immutable_store.stats(),
+        "l1_cache": l1_cache.stats(),
+    }
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Upstream call metrics in the Prometheus text format."""
+    return metrics_registry.render()
@@ -29,7 +29,7 @@ async def login_for_access_token(
             headers={"WWW-Authenticate": "Bearer"},
         )
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
+    access_token = await create_access_token(
         data={"sub": user.username}, expires_delta=access_token_expires
     )
 
@@ -69,7 +69,7 @@ async def logout(
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
         jti = payload.get("jti")
         if jti:
-            redis_service.set(
+            await redis_service.set(
                 f"denylist:{jti}",
                 "denylisted",
                 expiry=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
@@ -101,7 +101,7 @@ async def validate_token(
     token_data = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
     # check if token is denylisted
     jti = token_data.get("jti")
-    if redis_service.get(f"denylist:{jti}"):
+    if await redis_service.get(f"denylist:{jti}"):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="Token has been revoked"
         )
@@ -2,6 +2,7 @@ import uuid
 import json
 from datetime import datetime
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from app.utils.redis_service import RedisService, get_redis_service
 from app.auth.dependencies import get_current_active_user
 from app.tasks.tasks import perform_transaction_origin_trace
@@ -10,7 +11,7 @@ router = APIRouter()
 
 
 @router.get("/trace-tx-origin", response_model=dict)
-def trace_transaction_to_origin(
+async def trace_transaction_to_origin(
     txid: str,
     include_tx_details: bool = False,
     current_user: dict = Depends(get_current_active_user),
@@ -27,7 +28,7 @@ def trace_transaction_to_origin(
 
     # Check if this trace has been completed before
     cache_key = f"tx-origin-trace:{txid}:{include_tx_details}"
-    cached_result = redis_service.get(cache_key)
+    cached_result = await redis_service.get(cache_key)
 
     if cached_result:
         if isinstance(cached_result, dict):
@@ -40,15 +41,15 @@ def trace_transaction_to_origin(
 
     # Check if this trace is already in progress
     in_progress_key = f"tx-origin-trace-in-progress:{txid}"
-    if redis_service.get(in_progress_key):
-        existing_task_id = redis_service.get(in_progress_key)
+    if await redis_service.get(in_progress_key):
+        existing_task_id = await redis_service.get(in_progress_key)
         return {"status": "in_progress", "task_id": existing_task_id}
 
     # Set the task as in progress
-    redis_service.set(in_progress_key, task_id)
+    await redis_service.set(in_progress_key, task_id)
 
     # Set initial task status
-    redis_service.set(
+    await redis_service.set(
         f"task:{task_id}",
         json.dumps(
             {
@@ -61,8 +62,11 @@ def trace_transaction_to_origin(
         ),
     )
 
-    # Queue the task with Celery
-    perform_transaction_origin_trace.delay(txid, include_tx_details, task_id)
+    # Queue the task with Celery; the broker publish (and its connection
+    # retries) is blocking, so keep it off the event loop
+    await run_in_threadpool(
+        perform_transaction_origin_trace.delay, txid, include_tx_details, task_id
+    )
 
     return {
         "status": "pending",
@@ -78,7 +82,7 @@ async def get_trace_task_status(
     redis_service: RedisService = Depends(get_redis_service),
 ):
     """Get the status of a transaction origin trace task."""
-    task_data = redis_service.get(f"task:{task_id}")
+    task_data = await redis_service.get(f"task:{task_id}")
 
     if not task_data:
         raise HTTPException(
@@ -89,7 +93,7 @@ async def get_trace_task_status(
 
     # If task is completed, include the result
     if task_info.get("status") == "completed" and "result_key" in task_info:
-        result = redis_service.get(task_info["result_key"])
+        result = await redis_service.get(task_info["result_key"])
         if result:
             task_info["result"] = (
                 json.loads(result) if isinstance(result, str) else result
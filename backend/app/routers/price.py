@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException
 
 from app.auth.dependencies import get_current_active_user
-from app.utils.mempool_api import mempool_api_call
+from app.utils.mempool_api import mempool_client
 from app.utils.redis_service import RedisService, get_redis_service
 
 router = APIRouter(prefix="/price")
@@ -12,7 +12,7 @@ async def get_current_price(
     current_user: dict = Depends(get_current_active_user),
     redis_service: RedisService = Depends(get_redis_service),
 ):
-    current_price = await mempool_api_call("/api/v1/prices")
+    current_price = await mempool_client.get_prices()
     return current_price
 
 
@@ -22,9 +22,7 @@ async def get_historical_price(
     current_user: dict = Depends(get_current_active_user),
     redis_service: RedisService = Depends(get_redis_service),
 ):
-    price = await mempool_api_call(
-        f"api/v1/historical-price?currency=EUR&timestamp={timestamp}"
-    )
+    price = await mempool_client.get_historical_price(timestamp)
     if not price:
         raise HTTPException(
             status_code=404, detail=f"Price for timestamp {timestamp} not found."
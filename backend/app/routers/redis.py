@@ -16,7 +16,7 @@ async def get_recent_txids(
     Retrieve the most recent 8 transaction IDs stored in Redis.
     """
     try:
-        recent_txids = redis_service.get_recent_list("txid")
+        recent_txids = await redis_service.get_recent_list("txid")
         return recent_txids
 
     except Exception as e:
@@ -32,7 +32,7 @@ async def get_recent_wallets(
     Retrieve the most recent 8 analyzed wallet addresses.
     """
     try:
-        recent_wallets = redis_service.get_recent_list("wallet")
+        recent_wallets = await redis_service.get_recent_list("wallet")
         return recent_wallets
     except Exception as e:
         raise HTTPException(status_code=498, detail=str(e))
@@ -47,7 +47,7 @@ async def empty_redis(
     Empty the Redis cache.
     """
     try:
-        redis_service.empty_redis()
+        await redis_service.empty_redis()
         return {"message": "Redis cache emptied"}
     except Exception as e:
         raise HTTPException(status_code=498, detail=str(e))
@@ -55,11 +55,11 @@ async def empty_redis(
 
 @router.get("/debug/redis-txid")
 async def debug_redis_txid(redis_service: RedisService = Depends(get_redis_service)):
-    return redis_service.redis.lrange("txid", 0, 10)
+    return await redis_service.lrange("txid", 0, 10)
 
 
 @router.get("/related-tx")
 async def get_related_tx(
     txid: str, redis_service: RedisService = Depends(get_redis_service)
 ):
-    return redis_service.get(f"flow-tx-info:{txid}")
+    return await redis_service.get(f"flow-tx-info:{txid}")
@@ -1,19 +1,174 @@
-import json
+import asyncio
+import logging
 from datetime import datetime
+from typing import Dict, List, Optional
 
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
 
 from app.auth.dependencies import get_current_active_user
+from app.config.config import settings
+from app.utils.cache_policy import (
+    TIP,
+    state_for_confirmations,
+    state_for_mempool_tx,
+)
+from app.utils.address_history import address_flow, iter_address_txs
+from app.utils.address_sync import fetch_address_history
+from app.utils.bitcoin_rest import get_transaction_compact
+from app.utils.header_index import get_chain_height, header_index
+from app.utils.immutable_store import immutable_store
 from app.utils.price import get_price_based_on_timestamp
 from app.utils.redis_service import RedisService, get_redis_service
-from app.utils.bitcoin_rpc import bitcoin_rpc_call
+from app.utils.bitcoin_rpc import (
+    BitcoinRPCError,
+    bitcoin_rpc_batch,
+    bitcoin_rpc_call,
+    raise_for_batch_errors,
+)
 from app.utils.format import sats_to_btc
-from app.utils.mempool_api import mempool_api_call
+from app.utils.mempool_api import MempoolAPIError, mempool_client
+from app.utils.serialization import RawJSONResponse, dumps
 from app.utils.wallet_types import identify_bitcoin_wallet_type
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
 
+class BulkAddressRequest(BaseModel):
+    addresses: List[str]
+
+
+class BulkTxRequest(BaseModel):
+    txids: List[str]
+
+
+def _unique(items: List[str]) -> List[str]:
+    """Non-empty items, stripped and de-duplicated, in request order."""
+    return list(dict.fromkeys(item.strip() for item in items if item.strip()))
+
+
+def _check_bulk_size(items: List[str]):
+    if not items:
+        raise HTTPException(status_code=400, detail="No items given.")
+    if len(items) > settings.BULK_LOOKUP_MAX_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.BULK_LOOKUP_MAX_ITEMS} items per request.",
+        )
+
+
+def _bulk_error(error: Exception, item: str, not_found: str) -> str:
+    """Per-item error message of a bulk lookup."""
+    if isinstance(error, MempoolAPIError):
+        if error.status in (400, 404):
+            return not_found
+        return f"Upstream error (HTTP {error.status})."
+    logger.warning(f"Bulk lookup of {item} failed: {error!r}")
+    return str(error) or type(error).__name__
+
+
+async def _load_final_tx(txid: str, tip: int) -> Optional[dict]:
+    """
+    Verbose ``getrawtransaction`` output from the immutable store, with
+    ``confirmations`` brought up to date against ``tip``.
+    """
+    stored = await immutable_store.get("tx", txid)
+    if stored is None:
+        return None
+    tx = stored["tx"]
+    tx["confirmations"] = tip - stored["height"] + 1
+    return tx
+
+
+async def _load_final_txs(txids: List[str], tip: int) -> Dict[str, dict]:
+    """Batch version of ``_load_final_tx``; txids not stored are left out."""
+    found = {}
+    for txid, stored in (await immutable_store.get_many("tx", txids)).items():
+        tx = stored["tx"]
+        tx["confirmations"] = tip - stored["height"] + 1
+        found[txid] = tx
+    return found
+
+
+async def _final_tx_records(txs: List[dict], tip: int) -> List[Optional[dict]]:
+    """
+    Immutable store records of verbose transactions, ``None`` for those that
+    are not final. The stored height is that of the tx's ``blockhash``, from
+    the header index or else one ``getblockheader`` batch. It is never derived
+    from ``tip``, which may lag the node that reported the confirmations.
+    """
+    heights: List[Optional[int]] = []
+    unlocated: Dict[str, List[int]] = {}
+    for index, tx in enumerate(txs):
+        confirmations = tx.get("confirmations")
+        if not immutable_store.is_final(confirmations) or not tx.get("blockhash"):
+            heights.append(None)
+            continue
+        height = header_index.locate(tx["blockhash"], tip - confirmations + 1)
+        heights.append(height)
+        if height is None:
+            unlocated.setdefault(tx["blockhash"], []).append(index)
+
+    if unlocated:
+        headers = await bitcoin_rpc_batch(
+            [("getblockheader", [block_hash]) for block_hash in unlocated]
+        )
+        for indexes, header in zip(unlocated.values(), headers):
+            if isinstance(header, BitcoinRPCError) or not header:
+                # Not stored this time; it will be retried on the next lookup
+                continue
+            for index in indexes:
+                heights[index] = header["height"]
+
+    # Confirmations keep changing, so keep the height and derive them on read
+    return [
+        {
+            "height": height,
+            "tx": {k: v for k, v in tx.items() if k != "confirmations"},
+        }
+        if height is not None
+        else None
+        for tx, height in zip(txs, heights)
+    ]
+
+
+async def _store_final_txs(txs: List[dict], tip: int) -> List[bool]:
+    """Persist the verbose transactions that are buried deep enough."""
+    records = await _final_tx_records(txs, tip)
+    await immutable_store.put_many(
+        "tx",
+        [(tx["txid"], record) for tx, record in zip(txs, records) if record],
+    )
+    return [record is not None for record in records]
+
+
+async def _resolve_txs(txids: List[str], tip: int) -> List[Optional[dict]]:
+    """
+    Verbose transactions for ``txids``, in order: final ones from the
+    immutable store, the rest in a single ``getrawtransaction`` batch.
+    """
+    found = await _load_final_txs(txids, tip)
+    missing = [txid for txid in txids if txid not in found]
+    fetched = raise_for_batch_errors(
+        await bitcoin_rpc_batch([("getrawtransaction", [txid, True]) for txid in missing])
+    )
+    fetched = [tx for tx in fetched if tx]
+    await _store_final_txs(fetched, tip)
+    for tx in fetched:
+        found[tx["txid"]] = tx
+    return [found.get(txid) for txid in txids]
+
+
+def _is_final_mempool_tx(tx: dict, tip: int) -> bool:
+    status = tx.get("status", {})
+    if not status.get("confirmed") or status.get("block_height") is None:
+        return False
+    return immutable_store.is_final(tip - status["block_height"] + 1)
+
+
 @router.get("/node-info", response_model=dict)
 async def get_node_info(
     current_user: dict = Depends(get_current_active_user),
@@ -22,26 +177,70 @@ async def get_node_info(
     """
     Fetch basic information about the Bitcoin node.
     """
-    try:
-        cached_node_info = redis_service.get("node_info")
-        if cached_node_info:
-            if isinstance(cached_node_info, (str, bytes, bytearray)):
-                return json.loads(cached_node_info)
-            else:
-                return cached_node_info
 
+    async def fetch_node_info() -> bytes:
         blockchain_info = await bitcoin_rpc_call("getblockchaininfo")
 
         if not blockchain_info:
             raise HTTPException(status_code=404, detail="Blockchain info not found.")
 
-        redis_service.set("node_info", json.dumps({"blockchain_info": blockchain_info}))
+        return dumps({"blockchain_info": blockchain_info})
 
-        return {"blockchain_info": blockchain_info}
+    try:
+        return RawJSONResponse(
+            await redis_service.get_or_compute("node_info", fetch_node_info, state=TIP)
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _block_time(height: int, known_time: Optional[int]) -> Optional[int]:
+    return known_time if known_time is not None else header_index.time_at(height)
+
+
+def _days_between(
+    from_height: int,
+    from_time: Optional[int],
+    to_height: int,
+    to_time: Optional[int],
+) -> float:
+    """
+    Days between two blocks from their timestamps, assuming 10-minute blocks
+    only when a timestamp is unavailable.
+    """
+    from_time = _block_time(from_height, from_time)
+    to_time = _block_time(to_height, to_time)
+    if from_time is None or to_time is None:
+        return (to_height - from_height) * 10 / (60 * 24)
+    return (to_time - from_time) / 86400
+
+
+async def _latest_blocks_from_index(count: int) -> list:
+    latest_height = header_index.height
+    heights = list(range(latest_height, max(latest_height - count, -1), -1))
+
+    # REST-bootstrapped headers carry no tx count; fill the gaps once
+    unknown = [h for h in heights if header_index.tx_count_at(h) is None]
+    if unknown:
+        headers = raise_for_batch_errors(
+            await bitcoin_rpc_batch(
+                [("getblockheader", [header_index.hash_at(h)]) for h in unknown]
+            )
+        )
+        for height, header in zip(unknown, headers):
+            header_index.set_tx_count(height, header["hash"], header["nTx"])
+
+    return [
+        {
+            "height": height,
+            "hash": header_index.hash_at(height),
+            "time": header_index.time_at(height),
+            "transactions": header_index.tx_count_at(height),
+        }
+        for height in heights
+    ]
+
+
 @router.get("/latest-blocks", response_model=dict)
 async def get_latest_blocks(
     count: int = 7,
@@ -51,17 +250,10 @@ async def get_latest_blocks(
     """
     Fetch the latest blocks.
     """
-    try:
-        # if count changes, we need to update the cache
-        cached_latest_blocks = redis_service.get("latest_blocks")
-        if cached_latest_blocks:
-            if isinstance(cached_latest_blocks, dict):
-                return cached_latest_blocks
-            cached_latest_blocks = json.loads(cached_latest_blocks)
-            if len(cached_latest_blocks["latest_blocks"]) != count:
-                redis_service.delete("latest_blocks")
-            else:
-                return cached_latest_blocks
+
+    async def fetch_latest_blocks() -> bytes:
+        if header_index.synced:
+            return dumps({"latest_blocks": await _latest_blocks_from_index(count)})
 
         # Fetch the latest block height
         blockchain_info = await bitcoin_rpc_call("getblockchaininfo")
@@ -71,27 +263,43 @@ async def get_latest_blocks(
 
         latest_height = blockchain_info["blocks"]
 
-        # Adjust count if it exceeds available blocks
-        if count > latest_height:
-            count = latest_height
+        # Collect details of the latest blocks (at most as many as exist): one
+        # batch for the hashes and one for the headers. The header carries
+        # nTx, so the (multi-MB) block bodies never need to be downloaded just
+        # to count transactions.
+        heights = list(
+            range(latest_height, latest_height - min(count, latest_height), -1)
+        )
+        block_hashes = raise_for_batch_errors(
+            await bitcoin_rpc_batch([("getblockhash", [i]) for i in heights])
+        )
+        block_headers = raise_for_batch_errors(
+            await bitcoin_rpc_batch(
+                [("getblockheader", [block_hash]) for block_hash in block_hashes]
+            )
+        )
 
-        # Collect details of the latest blocks
         blocks = []
-        for i in range(latest_height, latest_height - count, -1):
-            block_hash = await bitcoin_rpc_call("getblockhash", [i])
-            block = await bitcoin_rpc_call("getblock", [block_hash])
+        for i, header in zip(heights, block_headers):
             blocks.append(
                 {
                     "height": i,
-                    "hash": block["hash"],
-                    "time": block["time"],
-                    "transactions": len(block["tx"]),
+                    "hash": header["hash"],
+                    "time": header["time"],
+                    "transactions": header["nTx"],
                 }
             )
 
-        redis_service.set("latest_blocks", json.dumps({"latest_blocks": blocks}))
+        return dumps({"latest_blocks": blocks})
 
-        return {"latest_blocks": blocks}
+    try:
+        # One cache entry per count, recomputed once per block across workers
+        # (the index path still asks the node for tx counts it lacks)
+        return RawJSONResponse(
+            await redis_service.get_or_compute(
+                f"latest_blocks:{count}", fetch_latest_blocks, state=TIP
+            )
+        )
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -108,17 +316,16 @@ async def transaction_forensics(
 
     try:
         cache_key = f"{txid}:{depth}"
-        cached_related_tx = redis_service.get(cache_key)
+        cached_related_tx = await redis_service.get_raw(cache_key)
         flow_cache_key = f"flow-tx-info:{txid}"
 
         if cached_related_tx:
-            # check if its a dict, if not, return the cached value
-            if isinstance(cached_related_tx, dict):
-                return cached_related_tx
-            return json.loads(cached_related_tx)
+            return RawJSONResponse(cached_related_tx)
 
-        # Fetch raw transaction details
-        raw_tx = await bitcoin_rpc_call("getrawtransaction", [txid, True])
+        tip = await get_chain_height()
+
+        # Fetch raw transaction details; only inputs and outputs are needed
+        raw_tx = await _load_final_tx(txid, tip) or await get_transaction_compact(txid)
 
         # Ensure the response is valid
         if not raw_tx or "vin" not in raw_tx or "vout" not in raw_tx:
@@ -134,43 +341,41 @@ async def transaction_forensics(
         # Related transactions
         related_transactions = []
 
-        # Trace previous transactions for inputs
-        for vin in inputs:
-            if "txid" in vin:
-                prev_txid = vin["txid"]
-                prev_tx = await bitcoin_rpc_call("getrawtransaction", [prev_txid, True])
-                if prev_tx:
-                    related_transactions.append({"txid": prev_txid, "details": prev_tx})
-                if len(related_transactions) >= depth:
-                    break
-
-        # Trace outputs for spending transactions
-        for vout in outputs:
-            script_pub_key = vout.get("scriptPubKey", {})
-            addresses = script_pub_key.get("addresses", [])
-            for address in addresses:
-                unspent = await bitcoin_rpc_call("listunspent", [0, 9999999, [address]])
-                for utxo in unspent:
-                    if utxo["txid"] not in [tx["txid"] for tx in related_transactions]:
-                        spent_txid = utxo["txid"]
-                        spent_tx = await bitcoin_rpc_call(
-                            "getrawtransaction", [spent_txid, True]
-                        )
-                        if spent_tx:
-                            related_transactions.append(
-                                {"txid": spent_txid, "details": spent_tx}
-                            )
-                            if len(related_transactions) >= depth:
-                                break
-                if len(related_transactions) >= depth:
-                    break
+        # Trace previous transactions for inputs. Spent outputs are usually
+        # long confirmed, so most come from the immutable store; the rest are
+        # fetched in a single batch.
+        prev_txids = [vin["txid"] for vin in inputs if "txid" in vin][:depth]
+        for prev_txid, prev_tx in zip(prev_txids, await _resolve_txs(prev_txids, tip)):
+            if prev_tx:
+                related_transactions.append({"txid": prev_txid, "details": prev_tx})
+
+        # Trace outputs forward to the transactions spending them. One
+        # outspends call covers every output, whoever owns it, and the
+        # spenders are then resolved in one batch.
+        if len(related_transactions) < depth and outputs:
+            seen_txids = {tx["txid"] for tx in related_transactions}
+            spending_txids = []
+            for outspend in await mempool_client.get_outspends(txid):
+                spending_txid = outspend.get("txid")
+                if outspend.get("spent") and spending_txid not in seen_txids:
+                    seen_txids.add(spending_txid)
+                    spending_txids.append(spending_txid)
+            spending_txids = spending_txids[: depth - len(related_transactions)]
+
+            for spending_txid, spending_tx in zip(
+                spending_txids, await _resolve_txs(spending_txids, tip)
+            ):
+                if spending_tx:
+                    related_transactions.append(
+                        {"txid": spending_txid, "details": spending_tx}
+                    )
 
         # Cache the result for reactflow
         # we need id, label, position (can be 0,0)
         #related_txids = [tx["txid"] for tx in related_transactions]
-        redis_service.set(
+        await redis_service.set(
             flow_cache_key,
-            json.dumps(
+            dumps(
                 {
                     "id": txid,
                     "data": {"label": txid},
@@ -187,9 +392,10 @@ async def transaction_forensics(
             ),
         )
 
-        redis_service.set(
+        # Spending transactions and confirmations change as the chain grows
+        await redis_service.set(
             cache_key,
-            json.dumps({"related_transactions": related_transactions[:depth]}),
+            dumps({"related_transactions": related_transactions[:depth]}),
         )
 
         return {"related_transactions": related_transactions[:depth]}
@@ -210,11 +416,14 @@ async def get_tx_info(
     """
     cache_key = f"tx-info:{txid}"
     try:
-        cached_tx = redis_service.get(cache_key)
+        tip = await get_chain_height()
+        final_tx = await _load_final_tx(txid, tip)
+        if final_tx:
+            return {"transaction": final_tx}
+
+        cached_tx = await redis_service.get_raw(cache_key)
         if cached_tx:
-            if isinstance(cached_tx, dict):
-                return cached_tx
-            return json.loads(cached_tx)
+            return RawJSONResponse(cached_tx)
 
         raw_tx = await bitcoin_rpc_call("getrawtransaction", [txid, True])
 
@@ -223,7 +432,13 @@ async def get_tx_info(
                 status_code=404, detail=f"Transaction {txid} not found."
             )
 
-        redis_service.set(cache_key, json.dumps({"transaction": raw_tx}))
+        (stored,) = await _store_final_txs([raw_tx], tip)
+        if not stored:
+            await redis_service.set(
+                cache_key,
+                dumps({"transaction": raw_tx}),
+                state=state_for_confirmations(raw_tx.get("confirmations")),
+            )
 
         return {"transaction": raw_tx}
 
@@ -231,6 +446,71 @@ async def get_tx_info(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/tx-info/batch", response_model=dict)
+async def get_tx_info_batch(
+    request: BulkTxRequest,
+    current_user: dict = Depends(get_current_active_user),
+    redis_service: RedisService = Depends(get_redis_service),
+):
+    """
+    Batch version of ``/tx-info``, keyed by txid. Transactions are taken from
+    the immutable store and Redis first; the rest is fetched from the node in
+    one JSON-RPC batch. Txids that could not be resolved are listed under
+    ``errors``.
+    """
+    txids = _unique(request.txids)
+    _check_bulk_size(txids)
+
+    try:
+        tip = await get_chain_height()
+        transactions = await _load_final_txs(txids, tip)
+
+        remaining = [txid for txid in txids if txid not in transactions]
+        cached = await redis_service.get_many([f"tx-info:{txid}" for txid in remaining])
+        for txid, entry in zip(remaining, cached):
+            if isinstance(entry, dict) and entry.get("transaction"):
+                transactions[txid] = entry["transaction"]
+
+        missing = [txid for txid in remaining if txid not in transactions]
+        results = await bitcoin_rpc_batch(
+            [("getrawtransaction", [txid, True]) for txid in missing]
+        )
+
+        errors: Dict[str, str] = {}
+        fetched = []
+        for txid, result in zip(missing, results):
+            if isinstance(result, BitcoinRPCError):
+                # -5: No such mempool or blockchain transaction
+                errors[txid] = (
+                    "Transaction not found." if result.code == -5 else result.message
+                )
+                continue
+            if not result:
+                errors[txid] = "Transaction not found."
+                continue
+            transactions[txid] = result
+            fetched.append(result)
+
+        volatile: Dict[str, Dict[str, bytes]] = {}
+        for tx, stored in zip(fetched, await _store_final_txs(fetched, tip)):
+            if not stored:
+                state = state_for_confirmations(tx.get("confirmations"))
+                volatile.setdefault(state, {})[f"tx-info:{tx['txid']}"] = dumps(
+                    {"transaction": tx}
+                )
+
+        for state, mapping in volatile.items():
+            await redis_service.set_many(mapping, state=state)
+
+        return {
+            "transactions": {t: transactions[t] for t in txids if t in transactions},
+            "errors": errors,
+        }
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/mempool/tx/info", response_model=dict)
 async def get_tx_info_mempool(
     txid: str,
@@ -242,31 +522,38 @@ async def get_tx_info_mempool(
     """
     cache_key = f"tx-info-mempool:{txid}"
     try:
-        cached_tx = redis_service.get(cache_key)
+        final_tx = await immutable_store.get("mempool-tx", txid)
+        if final_tx:
+            return {"txid": txid, "transaction": final_tx}
+
+        cached_tx = await redis_service.get_raw(cache_key)
         if cached_tx:
-            if isinstance(cached_tx, dict):
-                return cached_tx
-            return json.loads(cached_tx)
+            return RawJSONResponse(cached_tx)
         # Fetch address transactions
-        tx_info = await mempool_api_call(f"api/tx/{txid}")
+        tx_info = await mempool_client.get_transaction(txid)
 
         if not tx_info:
             raise HTTPException(
                 status_code=404, detail=f"Transaction {txid} not found."
             )
 
-        redis_service.lpush_trim(
-            "txid", json.dumps({"txid": txid, "added": datetime.now().isoformat()})
-        )
-        redis_service.set(
-            cache_key,
-            json.dumps(
-                {
-                    "txid": txid,
-                    "transaction": tx_info,
-                }
-            ),
+        await redis_service.lpush_trim(
+            "txid", dumps({"txid": txid, "added": datetime.now().isoformat()})
         )
+        tip = await get_chain_height()
+        if _is_final_mempool_tx(tx_info, tip):
+            await immutable_store.put("mempool-tx", txid, tx_info)
+        else:
+            await redis_service.set(
+                cache_key,
+                dumps(
+                    {
+                        "txid": txid,
+                        "transaction": tx_info,
+                    }
+                ),
+                state=state_for_mempool_tx(tx_info, tip),
+            )
 
         return {
             "txid": txid,
@@ -277,6 +564,73 @@ async def get_tx_info_mempool(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/mempool/tx/info/batch", response_model=dict)
+async def get_tx_info_mempool_batch(
+    request: BulkTxRequest,
+    current_user: dict = Depends(get_current_active_user),
+    redis_service: RedisService = Depends(get_redis_service),
+):
+    """
+    Batch version of ``/mempool/tx/info``, keyed by txid. Transactions are
+    taken from the immutable store and Redis first; the rest is fetched from
+    mempool concurrently. Txids that could not be resolved are listed under
+    ``errors``.
+    """
+    txids = _unique(request.txids)
+    _check_bulk_size(txids)
+
+    try:
+        transactions = await immutable_store.get_many("mempool-tx", txids)
+
+        remaining = [txid for txid in txids if txid not in transactions]
+        cached = await redis_service.get_many(
+            [f"tx-info-mempool:{txid}" for txid in remaining]
+        )
+        for txid, entry in zip(remaining, cached):
+            if isinstance(entry, dict) and entry.get("transaction"):
+                transactions[txid] = entry["transaction"]
+
+        missing = [txid for txid in remaining if txid not in transactions]
+        errors: Dict[str, str] = {}
+        semaphore = asyncio.Semaphore(settings.BULK_LOOKUP_CONCURRENCY)
+
+        async def fetch(txid: str):
+            async with semaphore:
+                try:
+                    transactions[txid] = await mempool_client.get_transaction(txid)
+                except Exception as e:
+                    errors[txid] = _bulk_error(e, txid, "Transaction not found.")
+
+        await asyncio.gather(*(fetch(txid) for txid in missing))
+
+        tip = await get_chain_height()
+        final_txs = []
+        volatile: Dict[str, Dict[str, bytes]] = {}
+        for txid in missing:
+            tx_info = transactions.get(txid)
+            if tx_info is None:
+                continue
+            if _is_final_mempool_tx(tx_info, tip):
+                final_txs.append((txid, tx_info))
+            else:
+                state = state_for_mempool_tx(tx_info, tip)
+                volatile.setdefault(state, {})[f"tx-info-mempool:{txid}"] = dumps(
+                    {"txid": txid, "transaction": tx_info}
+                )
+
+        await immutable_store.put_many("mempool-tx", final_txs)
+        for state, mapping in volatile.items():
+            await redis_service.set_many(mapping, state=state)
+
+        return {
+            "transactions": {t: transactions[t] for t in txids if t in transactions},
+            "errors": errors,
+        }
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/tx/wallet")
 async def get_tx_wallet(
     txid: str,
@@ -289,13 +643,11 @@ async def get_tx_wallet(
 
     cache_key = f"tx-wallet:{txid}"
     try:
-        cached_wallet = redis_service.get(cache_key)
+        cached_wallet = await redis_service.get_raw(cache_key)
         if cached_wallet:
-            if isinstance(cached_wallet, dict):
-                return cached_wallet
-            return json.loads(cached_wallet)
+            return RawJSONResponse(cached_wallet)
         
-        tx_info = await mempool_api_call(f"api/tx/{txid}")
+        tx_info = await mempool_client.get_transaction(txid)
 
         if not tx_info:
             raise HTTPException(
@@ -313,7 +665,7 @@ async def get_tx_wallet(
         wallet_type = identify_bitcoin_wallet_type(scriptpubkey_address)
         
         # Fetch address balance information
-        address_info = await mempool_api_call(f"api/address/{scriptpubkey_address}")
+        address_info = await mempool_client.get_address(scriptpubkey_address)
         
         # Calculate current balance in satoshis
         chain_balance = address_info["chain_stats"]["funded_txo_sum"] - address_info["chain_stats"]["spent_txo_sum"]
@@ -338,21 +690,21 @@ async def get_tx_wallet(
         }
 
         # Cache the complete response data
-        redis_service.set(
+        await redis_service.set(
             cache_key,
-            json.dumps(response_data),
+            dumps(response_data),
         )
         
         # Store in recent lists
-        redis_service.lpush_trim(
+        await redis_service.lpush_trim(
             "wallet",
-            json.dumps(
+            dumps(
                 {"wallet": scriptpubkey_address, "added": datetime.now().isoformat()}
             ),
         )
-        redis_service.lpush_trim(
+        await redis_service.lpush_trim(
             "wallet_type",
-            json.dumps(
+            dumps(
                 {"wallet_type": wallet_type["type"].value, "added": datetime.now().isoformat()}
             ),
         )
@@ -377,14 +729,12 @@ async def get_coin_age_by_address(
     try:
         # Check cache
         cache_key = f"coin_age_{address}"
-        cached_result = redis_service.get(cache_key)
+        cached_result = await redis_service.get_raw(cache_key)
         if cached_result:
-            if isinstance(cached_result, dict):
-                return cached_result
-            return json.loads(cached_result)
+            return RawJSONResponse(cached_result)
 
         # Fetch all transactions for this address using mempool API
-        txs = await mempool_api_call(f"api/address/{address}/txs")
+        txs = await mempool_client.get_address_txs(address)
 
         if not txs:
             raise HTTPException(
@@ -412,6 +762,7 @@ async def get_coin_age_by_address(
                     utxo_key = f"{tx_id}:{vout_idx}"
                     utxo_map[utxo_key] = {
                         "block_height": block_height,
+                        "block_time": tx["status"].get("block_time"),
                         "value": vout["value"],
                         "txid": tx_id,
                         "vout": vout_idx,
@@ -423,6 +774,7 @@ async def get_coin_age_by_address(
                 continue  # Skip unconfirmed transactions
 
             spent_block_height = tx["status"]["block_height"]
+            spent_block_time = tx["status"].get("block_time")
 
             # Find inputs spending from this address
             for vin in tx.get("vin", []):
@@ -436,9 +788,12 @@ async def get_coin_age_by_address(
 
                         # Calculate the difference in block heights (coin age)
                         blocks_diff = spent_block_height - received_block_height
-                        days_diff = (blocks_diff * 10) / (
-                            60 * 24
-                        )  # Assuming 10-minute blocks
+                        days_diff = _days_between(
+                            received_block_height,
+                            utxo_info["block_time"],
+                            spent_block_height,
+                            spent_block_time,
+                        )
 
                         results.append(
                             {
@@ -460,12 +815,12 @@ async def get_coin_age_by_address(
             "coin_age_details": results,
         }
 
-        redis_service.set(cache_key, json.dumps(response))
+        await redis_service.set(cache_key, dumps(response))
 
         # Record address lookup in recent queries
-        redis_service.lpush_trim(
+        await redis_service.lpush_trim(
             "address_coin_age",
-            json.dumps({"address": address, "added": datetime.now().isoformat()}),
+            dumps({"address": address, "added": datetime.now().isoformat()}),
         )
 
         return response
@@ -486,11 +841,9 @@ async def get_coin_age_by_txid(
     Get the age of coins from a transaction ID.
     """
     try:
-        cached_coin_age = redis_service.get(hashid)
+        cached_coin_age = await redis_service.get_raw(hashid)
         if cached_coin_age:
-            if isinstance(cached_coin_age, dict):
-                return cached_coin_age
-            return json.loads(cached_coin_age)
+            return RawJSONResponse(cached_coin_age)
 
         raw_tx = await bitcoin_rpc_call("getrawtransaction", [hashid, True])
 
@@ -500,8 +853,18 @@ async def get_coin_age_by_txid(
             )
 
         block_hash = raw_tx["blockhash"]
-        block = await bitcoin_rpc_call("getblock", [block_hash])
-        block_time = block["time"]
+        current_block = await get_chain_height()
+        coin_creation_block = None
+        if header_index.synced and raw_tx.get("confirmations"):
+            coin_creation_block = header_index.locate(
+                block_hash, current_block - raw_tx["confirmations"] + 1
+            )
+        if coin_creation_block is None:
+            block = await bitcoin_rpc_call("getblockheader", [block_hash])
+            coin_creation_block = block["height"]
+        block_time = raw_tx.get("blocktime") or header_index.time_at(
+            coin_creation_block
+        )
 
         price = await get_price_based_on_timestamp(block_time)
         if not price:
@@ -509,14 +872,14 @@ async def get_coin_age_by_txid(
                 status_code=404, detail=f"Transaction {hashid} not found."
             )
 
-        current_block = await bitcoin_rpc_call("getblockcount")
-        coin_creation_block = block["height"]
         age_in_blocks = current_block - coin_creation_block
-        age_in_days = (age_in_blocks * 10) / (60 * 24)
+        age_in_days = _days_between(
+            coin_creation_block, block_time, current_block, None
+        )
 
-        redis_service.set(
+        await redis_service.set(
             hashid,
-            json.dumps(
+            dumps(
                 {
                     "hashid": hashid,
                     "coin_creation_block": coin_creation_block,
@@ -527,10 +890,12 @@ async def get_coin_age_by_txid(
                     "price": price,
                 }
             ),
+            # The ages count up to the current block
+            state=TIP,
         )
 
-        redis_service.lpush_trim(
-            "txid", json.dumps({"txid": hashid, "added": datetime.now().isoformat()})
+        await redis_service.lpush_trim(
+            "txid", dumps({"txid": hashid, "added": datetime.now().isoformat()})
         )
 
         return {
@@ -558,155 +923,47 @@ async def get_address_txs_summary(
     """
     cache_key = f"address-txs-summary:{address}"
     try:
-        cached_data = redis_service.get(cache_key)
+        cached_data = await redis_service.get_raw(cache_key)
         if cached_data:
-            if isinstance(cached_data, dict):
-                return cached_data
-            return json.loads(cached_data)
+            return RawJSONResponse(cached_data)
     except Exception as cache_err:
-         print(f"Cache retrieval error: {cache_err}")
+        logger.warning(f"Cache retrieval error for {address}: {cache_err}")
 
-
-    all_address_txs = []
-    last_confirmed_txid = None
-    has_more_confirmed_txs = True
-    page_count = 0 # Debugging
-
-    # --- Fetch Initial Page (Mempool + first 25 confirmed) ---
     try:
-        page_count += 1
-        initial_url = f"api/address/{address}/txs"
-        print(f"Fetching initial page from Mempool API: {initial_url}") # Debugging
-        current_page_txs = await mempool_api_call(initial_url)
-
-        if not current_page_txs:
-            # Address found, but no transactions yet
-            print(f"Address {address} found, but no transactions.") # Debugging
-            result = {
-                "address": address,
-                "total_received_sats": 0,
-                "total_sent_sats": 0,
-                "total_received_btc": 0.0,
-                "total_sent_btc": 0.0,
-                "balance_sats": 0,
-                "balance_btc": 0.0,
-                "tx_count": 0,
-                "transactions": [],
-            }
-            # Optional: Cache this empty result
-            # redis_service.set(cache_key, json.dumps(result))
-            return result
-
-        all_address_txs.extend(current_page_txs)
-        print(f"Fetched {len(current_page_txs)} transactions on initial page.") # Debugging
-
-
-        # Find the last confirmed transaction in the initial page
-        # Iterate backwards to find the one earliest in time within this batch
-        found_last_confirmed = False
-        for tx in reversed(current_page_txs):
-            if tx.get("status", {}).get("confirmed"):
-                last_confirmed_txid = tx["txid"]
-                found_last_confirmed = True
-                break # Found the last confirmed one on this page
-
-        if not found_last_confirmed:
-             print("No confirmed transactions in the initial page. Stopping pagination.") # Debugging
-             has_more_confirmed_txs = False
-
-
-    except HTTPException as http_err:
-         if http_err.status_code == 404:
-              print(f"Address {address} not found by Mempool API.") # Debugging
-              raise HTTPException(status_code=404, detail=f"Address {address} not found.")
-         else:
-              print(f"HTTP error fetching initial page: {http_err}") # Debugging
-              raise http_err
+        history = await fetch_address_history(address, redis_service)
+    except MempoolAPIError as e:
+        if e.status in (400, 404):
+            raise HTTPException(status_code=404, detail=f"Address {address} not found.")
+        raise HTTPException(
+            status_code=500, detail=f"Error fetching transactions: {e}"
+        )
     except Exception as e:
-        print(f"Error fetching initial page: {e}") # Debugging
-        raise HTTPException(status_code=500, detail=f"Error fetching initial transactions: {e}")
-
-
-    # --- Fetch Subsequent Confirmed Transaction Pages ---
-    # Continue fetching only if we found at least one confirmed tx in the initial page
-    while has_more_confirmed_txs and last_confirmed_txid:
-        page_count += 1 # Debugging
-        url = f"api/address/{address}/txs?after_txid={last_confirmed_txid}"
-        print(f"Fetching page {page_count} from Mempool API: {url}") # Debugging
-
-        try:
-            current_page_txs = await mempool_api_call(url)
-
-            if not current_page_txs:
-                # API returned empty list, no more confirmed transactions
-                print(f"Mempool API returned empty list on page {page_count} for after_txid={last_confirmed_txid}. Stopping pagination.") # Debugging
-                has_more_confirmed_txs = False
-                break # End pagination loop
-
-            # Extend the main list with transactions from the current page
-            all_address_txs.extend(current_page_txs)
-            print(f"Fetched {len(current_page_txs)} transactions on page {page_count}.") # Debugging
-
-
-            # Update last_confirmed_txid for the next iteration
-            # In paginated calls with after_txid, the response should only contain
-            # confirmed transactions after the specified txid. So, the last tx in
-            # the returned list should be the one earliest in time in this page.
-            last_confirmed_txid = current_page_txs[-1]["txid"]
-            print(f"Updated last_confirmed_txid for next page: {last_confirmed_txid}") # Debugging
-
-
-            # Optional: Add a safeguard against excessive requests or infinite loops
-            # if page_count > 100 or len(all_address_txs) > 10000: # Adjust limits as needed
-            #     print(f"Pagination stopping due to reaching limit (Page: {page_count}, Total Txs: {len(all_address_txs)})") # Debugging
-            #     has_more_confirmed_txs = False
-            #     break
-
-        except Exception as e:
-            print(f"Error fetching paginated page {page_count} with after_txid={last_confirmed_txid}: {e}") # Debugging
-            # Decide how to handle errors during pagination - continue or stop?
-            # For now, stop pagination on error
-            has_more_confirmed_txs = False
-            # Optionally raise the exception
-            # raise HTTPException(status_code=500, detail=f"Error during pagination: {e}")
-
-
-    print(f"Finished fetching transactions. Total transactions found: {len(all_address_txs)}") # Debugging
-
-
-    # --- Process All Fetched Transactions ---
-    total_received = 0
-    total_sent = 0
-    # The all_address_txs list already contains the full transaction objects
-    # including vin, vout, fee, size, and status.
-    # We just need to iterate through this complete list to calculate totals
-    # from the perspective of the target address.
-
-    # We don't need to rebuild a separate 'transactions' list for the response
-    # as the all_address_txs list already has the structure needed by the frontend.
-    # We also don't need seen_txids if the API and pagination are correct.
-
-    for tx in all_address_txs:
-        received_in_tx = 0
-        sent_in_tx = 0
-
-        # Check inputs (sending)
-        for vin in tx.get("vin", []):
-            prevout = vin.get("prevout", {})
-            if prevout.get("scriptpubkey_address") == address:
-                amount = prevout.get("value", 0)
-                sent_in_tx += amount
-
-        # Check outputs (receiving)
-        for vout in tx.get("vout", []):
-            if vout.get("scriptpubkey_address") == address:
-                amount = vout.get("value", 0)
-                received_in_tx += amount
-
-        # Add to totals
-        total_received += received_in_tx
-        total_sent += sent_in_tx
+        raise HTTPException(
+            status_code=500, detail=f"Error fetching transactions: {e}"
+        )
 
+    tx_count = history.tx_count
+    total_received = history.received
+    total_sent = history.sent
+    logger.info(
+        f"Fetched history of {address} ({tx_count} txs, "
+        f"{'incremental' if history.incremental else 'full'}) in "
+        f"{history.walk.pages} pages ({history.walk.parallel_pages} in parallel)"
+    )
+
+    if not tx_count:
+        # Address found, but no transactions yet
+        return {
+            "address": address,
+            "total_received_sats": 0,
+            "total_sent_sats": 0,
+            "total_received_btc": 0.0,
+            "total_sent_btc": 0.0,
+            "balance_sats": 0,
+            "balance_btc": 0.0,
+            "tx_count": 0,
+            "transactions": [],
+        }
 
     btc_received = await sats_to_btc(total_received)
     btc_sent = await sats_to_btc(total_sent)
@@ -719,17 +976,84 @@ async def get_address_txs_summary(
         "total_sent_btc": btc_sent,
         "balance_sats": total_received - total_sent,
         "balance_btc": (total_received - total_sent) / 100000000,
-        "tx_count": len(all_address_txs), # Count based on the full list from pagination
-        "transactions": all_address_txs, # <--- Pass the full list fetched
+        "tx_count": tx_count,
     }
 
+    # Encode once for both the cache and the response; the synced part of the
+    # history is spliced in still encoded, "transactions" stays the last key
+    body = (
+        dumps(result)[:-1]
+        + b',"transactions":'
+        + history.encode_txs()
+        + b"}"
+    )
     try:
-        redis_service.set(cache_key, json.dumps(result))
+        await redis_service.set(cache_key, body)
     except Exception as cache_err:
-        print(f"Cache setting error for {address}: {cache_err}")
+        logger.warning(f"Cache setting error for {address}: {cache_err}")
+
+    return RawJSONResponse(body)
+
+@router.get("/address/txs/stream")
+async def stream_address_txs(
+    address: str,
+    current_user: dict = Depends(get_current_active_user),
+):
+    """
+    Stream all transactions of an address as NDJSON, one transaction per line
+    (newest first), followed by a ``{"type": "totals", ...}`` record with the
+    same totals as ``/address/txs/summary``.
+    """
+    txs = iter_address_txs(address)
+    # Fetch the first page up front so a bad address still gets a 404
+    try:
+        first_tx = await txs.__anext__()
+    except StopAsyncIteration:
+        first_tx = None
+    except MempoolAPIError as e:
+        if e.status in (400, 404):
+            raise HTTPException(status_code=404, detail=f"Address {address} not found.")
+        raise HTTPException(status_code=500, detail=f"Error fetching transactions: {e}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching transactions: {e}")
+
+    async def ndjson():
+        total_received = total_sent = tx_count = 0
+        try:
+            tx = first_tx
+            while tx is not None:
+                received, sent = address_flow(tx, address)
+                total_received += received
+                total_sent += sent
+                tx_count += 1
+                yield dumps(tx) + b"\n"
+                tx = await txs.__anext__()
+        except StopAsyncIteration:
+            pass
+        except Exception as e:
+            # Headers are already sent; report the failure in-band
+            logger.error(f"Streaming history of {address} failed: {e}")
+            yield dumps({"type": "error", "detail": str(e)}) + b"\n"
+            return
+        finally:
+            await txs.aclose()
+
+        yield dumps(
+            {
+                "type": "totals",
+                "address": address,
+                "total_received_sats": total_received,
+                "total_sent_sats": total_sent,
+                "total_received_btc": await sats_to_btc(total_received),
+                "total_sent_btc": await sats_to_btc(total_sent),
+                "balance_sats": total_received - total_sent,
+                "balance_btc": (total_received - total_sent) / 100000000,
+                "tx_count": tx_count,
+            }
+        ) + b"\n"
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
 
-    print(f"Returning result for {address} with {result['tx_count']} transactions.") # Debugging
-    return result
 
 @router.get("/address/wallet", response_model=dict)
 async def get_basic_wallet_info(
@@ -739,47 +1063,93 @@ async def get_basic_wallet_info(
 ):
     cache_key = f"wallet_info:{address}"
     try:
-        cached_wallet_info = redis_service.get(cache_key)
+        cached_wallet_info = await redis_service.get_raw(cache_key)
         if cached_wallet_info:
-            if isinstance(cached_wallet_info, dict):
-                return cached_wallet_info
-            json.loads(cached_wallet_info)
+            return RawJSONResponse(cached_wallet_info)
 
-        wallet_info = await mempool_api_call(f"api/address/{address}")
+        wallet_info = await mempool_client.get_address(address)
         if not wallet_info:
             raise HTTPException(status_code=404, detail=f"Address {address} not found.")
 
-        chain_stats = wallet_info.get("chain_stats", {})
+        result = await _wallet_info(address, wallet_info)
+        await redis_service.set(cache_key, dumps(result))
+        return result
 
-        # Calculate current balance
-        current_balance_sats = int(str(chain_stats.get("funded_txo_sum"))) - int(
-            str(chain_stats.get("spent_txo_sum"))
-        )
-        current_balance = await sats_to_btc(current_balance_sats)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-        redis_service.set(
-            cache_key,
-            json.dumps(
-                {
-                    "address": address,
-                    "tx_received": chain_stats.get("funded_txo_count"),
-                    "tx_value_received": chain_stats.get("funded_txo_sum"),
-                    "tx_coins_spent": chain_stats.get("spent_txo_count"),
-                    "tx_coins_sum": chain_stats.get("spent_txo_sum"),
-                    "balance_sats": current_balance_sats,
-                    "balance": current_balance,
-                }
-            ),
+
+async def _wallet_info(address: str, wallet_info: dict) -> dict:
+    chain_stats = wallet_info.get("chain_stats", {})
+
+    # Calculate current balance
+    current_balance_sats = int(str(chain_stats.get("funded_txo_sum"))) - int(
+        str(chain_stats.get("spent_txo_sum"))
+    )
+    current_balance = await sats_to_btc(current_balance_sats)
+
+    return {
+        "address": address,
+        "tx_received": chain_stats.get("funded_txo_count"),
+        "tx_value_received": chain_stats.get("funded_txo_sum"),
+        "tx_coins_spent": chain_stats.get("spent_txo_count"),
+        "tx_coins_sum": chain_stats.get("spent_txo_sum"),
+        "balance_sats": current_balance_sats,
+        "balance": current_balance,
+    }
+
+
+@router.post("/address/wallet/bulk", response_model=dict)
+async def get_bulk_wallet_info(
+    request: BulkAddressRequest,
+    current_user: dict = Depends(get_current_active_user),
+    redis_service: RedisService = Depends(get_redis_service),
+):
+    """
+    Wallet info for many addresses at once, keyed by address. Cached entries
+    come from one MGET, the rest is fetched concurrently and written back in
+    one pipeline. Addresses that could not be looked up are listed under
+    ``errors`` instead of failing the whole request.
+    """
+    addresses = _unique(request.addresses)
+    _check_bulk_size(addresses)
+
+    try:
+        cached = await redis_service.get_many([f"wallet_info:{a}" for a in addresses])
+        wallets: Dict[str, dict] = {
+            address: info
+            for address, info in zip(addresses, cached)
+            if isinstance(info, dict)
+        }
+        errors: Dict[str, str] = {}
+        missing = [address for address in addresses if address not in wallets]
+
+        semaphore = asyncio.Semaphore(settings.BULK_LOOKUP_CONCURRENCY)
+
+        async def fetch(address: str):
+            async with semaphore:
+                try:
+                    wallets[address] = await _wallet_info(
+                        address, await mempool_client.get_address(address)
+                    )
+                except Exception as e:
+                    errors[address] = _bulk_error(e, address, "Address not found.")
+
+        await asyncio.gather(*(fetch(address) for address in missing))
+
+        await redis_service.set_many(
+            {
+                f"wallet_info:{address}": dumps(wallets[address])
+                for address in missing
+                if address in wallets
+            }
         )
 
         return {
-            "address": address,
-            "tx_received": chain_stats.get("funded_txo_count"),
-            "tx_value_received": chain_stats.get("funded_txo_sum"),
-            "tx_coins_spent": chain_stats.get("spent_txo_count"),
-            "tx_coins_sum": chain_stats.get("spent_txo_sum"),
-            "balance_sats": current_balance_sats,
-            "balance": current_balance,
+            "wallets": {a: wallets[a] for a in addresses if a in wallets},
+            "errors": errors,
+            "cached": len(addresses) - len(missing),
+            "fetched": len(missing) - len(errors),
         }
 
     except Exception as e:
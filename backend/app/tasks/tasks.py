@@ -1,13 +1,12 @@
 import json
 from datetime import datetime
 
-from app.celery_worker import celery_app
-from app.utils.redis_service import get_redis_service
-from app.utils.bitcoin_rpc import bitcoin_rpc_call
-import asyncio
+from app.celery_worker import celery_app, run_async
+from app.utils.redis_service import get_sync_redis_service
+from app.utils.bitcoin_rpc import bitcoin_rpc_batch
 
 
-redis_service = get_redis_service()
+redis_service = get_sync_redis_service()
 
 
 @celery_app.task(name="trace_transaction_origin")
@@ -35,67 +34,82 @@ def perform_transaction_origin_trace(
         processed_count = 0
 
         while queue:
-            current_txid, depth = queue.pop(0)
-
-            if current_txid in visited_txids:
-                continue
-
-            visited_txids.add(current_txid)
-            processed_count += 1
-
-            # Update progress every 10 transactions
-            if processed_count % 10 == 0:
-                # Calculate an approximate progress (max 90%)
-                progress = min(
-                    90, int(5 + (processed_count / (processed_count + len(queue))) * 85)
-                )
-                update_task_status(
-                    redis_service, task_id, "processing", progress=progress
-                )
-
-            # Get transaction details
+            # Fetch the whole frontier of unvisited transactions in one batch
+            frontier = []
+            for current_txid, depth in queue:
+                if current_txid in visited_txids:
+                    continue
+                visited_txids.add(current_txid)
+                frontier.append((current_txid, depth))
+            queue = []
+
+            # Verbose JSON even when no details are requested: every entry
+            # reports its block time, which the binary REST form lacks
             try:
-                tx = asyncio.run(
-                    bitcoin_rpc_call("getrawtransaction", [current_txid, True])
+                txs = run_async(
+                    bitcoin_rpc_batch(
+                        [
+                            ("getrawtransaction", [current_txid, True])
+                            for current_txid, _ in frontier
+                        ]
+                    )
                 )
             except Exception as e:
-                # Handle case where transaction can't be retrieved
-                trace_path.append(
-                    {
-                        "txid": current_txid,
-                        "depth": depth,
-                        "error": str(e),
-                        "is_coinbase": False,
-                    }
-                )
-                continue
-
-            # Create the trace entry
-            trace_entry = {
-                "txid": current_txid,
-                "depth": depth,
-                "time": tx.get("time"),
-                "blockheight": tx.get("height"),
-                "is_coinbase": False,
-            }
-
-            if include_tx_details:
-                trace_entry["details"] = tx
-
-            inputs = tx.get("vin", [])
-
-            # Check if this is a coinbase transaction
-            if len(inputs) == 1 and "coinbase" in inputs[0]:
-                trace_entry["is_coinbase"] = True
-                origins.append(trace_entry)
-            else:
-                # Add previous transactions to the queue
-                for vin in inputs:
-                    if "txid" in vin:
-                        prev_txid = vin["txid"]
-                        queue.append((prev_txid, depth + 1))
-
-            trace_path.append(trace_entry)
+                txs = [e] * len(frontier)
+
+            for index, ((current_txid, depth), tx) in enumerate(zip(frontier, txs)):
+                processed_count += 1
+
+                # Update progress every 10 transactions
+                if processed_count % 10 == 0:
+                    # Calculate an approximate progress (max 90%)
+                    remaining = len(frontier) - index - 1 + len(queue)
+                    progress = min(
+                        90,
+                        int(5 + (processed_count / (processed_count + remaining)) * 85),
+                    )
+                    update_task_status(
+                        redis_service, task_id, "processing", progress=progress
+                    )
+
+                if isinstance(tx, Exception):
+                    # Handle case where transaction can't be retrieved
+                    trace_path.append(
+                        {
+                            "txid": current_txid,
+                            "depth": depth,
+                            "error": str(tx),
+                            "is_coinbase": False,
+                        }
+                    )
+                    continue
+
+                # Create the trace entry
+                trace_entry = {
+                    "txid": current_txid,
+                    "depth": depth,
+                    "time": tx.get("time"),
+                    "blockheight": tx.get("height"),
+                    "is_coinbase": False,
+                }
+
+                if include_tx_details:
+                    trace_entry["details"] = tx
+
+                inputs = tx.get("vin", [])
+
+                # Check if this is a coinbase transaction
+                if len(inputs) == 1 and "coinbase" in inputs[0]:
+                    trace_entry["is_coinbase"] = True
+                    origins.append(trace_entry)
+                else:
+                    # Add previous transactions to the next frontier
+                    for vin in inputs:
+                        if "txid" in vin:
+                            prev_txid = vin["txid"]
+                            queue.append((prev_txid, depth + 1))
+
+                trace_path.append(trace_entry)
 
         # Construct the result
         result = {
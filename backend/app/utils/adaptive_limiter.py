@@ -0,0 +1,141 @@
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Callable, Deque, Optional
+
+
+class AdaptiveLimiter:
+    """
+    AIMD concurrency limiter for calls to an upstream service.
+
+    The limit grows additively (about +1 per round of ``limit`` successful
+    calls) while recent latency stays within ``latency_tolerance`` of the
+    long-term baseline and the limit is actually being used. Calls that fail
+    with an overload signal (as decided by ``is_overload``, e.g. HTTP 5xx or
+    bitcoind's "Work queue depth exceeded") cut it multiplicatively by
+    ``backoff``. Only calls started after the previous cut may trigger another
+    one, so a burst of errors from the same window backs off once. Callers
+    beyond the limit wait in FIFO order.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        initial: int,
+        min_limit: int,
+        max_limit: int,
+        is_overload: Callable[[BaseException], bool],
+        latency_tolerance: float = 2.0,
+        backoff: float = 0.5,
+    ):
+        self.name = name
+        self.limit = float(max(min_limit, min(initial, max_limit)))
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.is_overload = is_overload
+        self.latency_tolerance = latency_tolerance
+        self.backoff = backoff
+        self.in_flight = 0
+        self.baseline_latency: Optional[float] = None
+        self.recent_latency: Optional[float] = None
+        self.increases = 0
+        self.decreases = 0
+        self.epoch = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self):
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self.in_flight += 1
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # We were granted a slot just as we got cancelled; hand it on
+                self.release()
+            elif waiter in self._waiters:
+                # _wake() may already have popped (and skipped) it
+                self._waiters.remove(waiter)
+            raise
+
+    def release(self):
+        self.in_flight -= 1
+        self._wake()
+
+    def _wake(self):
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    def on_success(self, latency: float):
+        if self.baseline_latency is None:
+            self.baseline_latency = self.recent_latency = latency
+        else:
+            self.recent_latency += 0.2 * (latency - self.recent_latency)
+            self.baseline_latency += 0.01 * (latency - self.baseline_latency)
+            # Let the baseline follow improvements immediately
+            self.baseline_latency = min(self.baseline_latency, self.recent_latency)
+
+        saturated = self.in_flight + 1 >= int(self.limit)
+        latency_flat = (
+            self.recent_latency <= self.baseline_latency * self.latency_tolerance
+        )
+        if saturated and latency_flat and self.limit < self.max_limit:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self.increases += 1
+            self._wake()
+
+    def on_overload(self, epoch: int):
+        if epoch != self.epoch:
+            return
+        self.epoch += 1
+        self.limit = max(self.min_limit, self.limit * self.backoff)
+        self.decreases += 1
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold one unit of concurrency for the duration of an upstream call."""
+        await self.acquire()
+        epoch = self.epoch
+        started = time.monotonic()
+        try:
+            yield
+        except Exception as e:
+            if self.is_overload(e):
+                self.on_overload(epoch)
+            raise
+        else:
+            self.on_success(time.monotonic() - started)
+        finally:
+            self.release()
+
+    def snapshot(self) -> dict:
+        return {
+            "limit": round(self.limit, 2),
+            "min_limit": self.min_limit,
+            "max_limit": self.max_limit,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "baseline_latency_ms": (
+                round(self.baseline_latency * 1000, 2)
+                if self.baseline_latency is not None
+                else None
+            ),
+            "recent_latency_ms": (
+                round(self.recent_latency * 1000, 2)
+                if self.recent_latency is not None
+                else None
+            ),
+            "increases": self.increases,
+            "decreases": self.decreases,
+        }
@@ -0,0 +1,233 @@
+"""
+Paged address history from the mempool (esplora) API.
+
+Esplora returns an address's history newest first: the unconfirmed txs plus
+the newest 25 confirmed ones, then 25 at a time via ``after_txid=<last txid
+seen>``. Every page depends on the previous one, so a 50k-tx address takes
+2,000 round trips. Two things keep that off the request's critical path:
+
+* Pipelining: a producer task issues the next request as soon as a page has
+  been decoded and hands pages to the consumer through a bounded queue, so
+  aggregation overlaps with the network.
+* Parallel mode: confirmed history below a buried tx never changes, so the
+  page boundaries ("anchors") recorded by an earlier walk stay valid. Once the
+  serial walk reaches a tx that is a stored anchor, the remaining pages are
+  fetched concurrently from the stored anchors. The caller checks the result
+  against the address's ``chain_stats.tx_count`` and redoes a plain walk if
+  they disagree.
+"""
+
+import asyncio
+import logging
+from typing import AsyncIterator, List, Optional, Sequence, Tuple
+
+from app.config.config import settings
+from app.utils.mempool_api import MempoolClient, mempool_client
+from app.utils.rate_limiter import BACKGROUND, priority
+
+logger = logging.getLogger(__name__)
+
+# (txid, block height) of the last tx of a confirmed page
+Anchor = Tuple[str, int]
+
+_DONE = object()
+
+
+def _is_confirmed(tx: dict) -> bool:
+    return bool(tx.get("status", {}).get("confirmed"))
+
+
+def address_flow(tx: dict, address: str) -> Tuple[int, int]:
+    """Satoshis (received, sent) by ``address`` in ``tx``."""
+    received = sum(
+        vout.get("value", 0)
+        for vout in tx.get("vout", [])
+        if vout.get("scriptpubkey_address") == address
+    )
+    sent = 0
+    for vin in tx.get("vin", []):
+        prevout = vin.get("prevout") or {}
+        if prevout.get("scriptpubkey_address") == address:
+            sent += prevout.get("value", 0)
+    return received, sent
+
+
+class AddressHistoryWalk:
+    """
+    One pass over an address's history, newest first.
+
+    ``anchors`` are page boundaries from an earlier walk, oldest last; only
+    pass anchors that are buried deep enough not to be reorged. After
+    iterating, ``anchors`` holds the boundaries of this walk for next time and
+    ``complete`` tells whether the number of confirmed txs seen matched
+    ``expected_confirmed`` (when given).
+
+    With ``stop_at``, the walk ends just above that txid (exclusive) and
+    ``reached_stop`` tells whether it was found; used to fetch only what is
+    new on top of a previously synced history.
+
+    Only the first page is fetched at the caller's priority; the rest of a
+    walk, be it a full history or a resync, runs at ``BACKGROUND``.
+    """
+
+    def __init__(
+        self,
+        address: str,
+        anchors: Sequence[Anchor] = (),
+        expected_confirmed: Optional[int] = None,
+        stop_at: Optional[str] = None,
+        client: MempoolClient = mempool_client,
+        prefetch: int = None,
+        parallel_fetches: int = None,
+    ):
+        self.address = address
+        self.client = client
+        self.expected_confirmed = expected_confirmed
+        self.stop_at = stop_at
+        self.reached_stop = False
+        self.prefetch = prefetch or settings.ADDRESS_PAGE_PREFETCH
+        self.parallel_fetches = parallel_fetches or settings.ADDRESS_PARALLEL_FETCHES
+        self._stored_anchors = list(anchors)
+        self._anchor_index = {txid: i for i, (txid, _) in enumerate(anchors)}
+        self.anchors: List[Anchor] = []
+        self.pages = 0
+        self.parallel_pages = 0
+        self.confirmed = 0
+        self.complete = False
+
+    def _record(self, page: List[dict]):
+        self.pages += 1
+        confirmed = [tx for tx in page if _is_confirmed(tx)]
+        self.confirmed += len(confirmed)
+        if confirmed:
+            last = confirmed[-1]
+            self.anchors.append((last["txid"], last["status"].get("block_height")))
+
+    def _find_anchor(self, page: List[dict]) -> Optional[Tuple[int, int]]:
+        """(position in page, index in stored anchors) of the first anchor hit."""
+        for position, tx in enumerate(page):
+            index = self._anchor_index.get(tx["txid"])
+            if index is not None and _is_confirmed(tx):
+                return position, index
+        return None
+
+    def _find_stop(self, page: List[dict]) -> Optional[int]:
+        if self.stop_at is None:
+            return None
+        for position, tx in enumerate(page):
+            if tx["txid"] == self.stop_at:
+                return position
+        return None
+
+    async def _fetch_from_anchors(self, queue: asyncio.Queue, start: int) -> Optional[str]:
+        """
+        Fetch the pages following stored anchors ``start..`` concurrently and
+        return the txid to continue serially from, if any.
+        """
+        anchors = [txid for txid, _ in self._stored_anchors[start:]]
+        for offset in range(0, len(anchors), self.parallel_fetches):
+            window = anchors[offset : offset + self.parallel_fetches]
+            # A burst of requests; let interactive calls in between
+            with priority(BACKGROUND):
+                pages = await asyncio.gather(
+                    *(
+                        self.client.get_address_txs(self.address, after_txid=txid)
+                        for txid in window
+                    )
+                )
+            for i, page in enumerate(pages):
+                following = offset + i + 1
+                expected_last = anchors[following] if following < len(anchors) else None
+                if expected_last is not None and (
+                    not page or page[-1]["txid"] != expected_last
+                ):
+                    # Stored boundaries no longer line up; go on serially
+                    logger.info(
+                        f"Stale page anchors for {self.address}, "
+                        f"continuing serially"
+                    )
+                    if page:
+                        self._record(page)
+                        self.parallel_pages += 1
+                        await queue.put(page)
+                        return page[-1]["txid"]
+                    return None
+                if not page:
+                    return None
+                self._record(page)
+                self.parallel_pages += 1
+                await queue.put(page)
+        return page[-1]["txid"] if anchors else None
+
+    async def _produce(self, queue: asyncio.Queue):
+        try:
+            page = await self.client.get_address_txs(self.address)
+            while page:
+                stop = self._find_stop(page)
+                if stop is not None:
+                    page = page[:stop]
+                    self._record(page)
+                    await queue.put(page)
+                    self.reached_stop = True
+                    break
+
+                hit = self._find_anchor(page)
+                if hit is not None:
+                    position, index = hit
+                    page = page[: position + 1]
+                    self._record(page)
+                    await queue.put(page)
+                    after_txid = await self._fetch_from_anchors(queue, index)
+                else:
+                    self._record(page)
+                    await queue.put(page)
+                    confirmed = [tx for tx in page if _is_confirmed(tx)]
+                    after_txid = confirmed[-1]["txid"] if confirmed else None
+
+                if after_txid is None:
+                    break
+                # Past the first page this is a bulk walk; interactive calls
+                # go first
+                with priority(BACKGROUND):
+                    page = await self.client.get_address_txs(
+                        self.address, after_txid=after_txid
+                    )
+
+            self.complete = (
+                self.expected_confirmed is None
+                or self.confirmed == self.expected_confirmed
+            )
+        except Exception as e:
+            await queue.put(e)
+            return
+        await queue.put(_DONE)
+
+    async def iter_pages(self) -> AsyncIterator[List[dict]]:
+        """Yield pages while the following ones are already being fetched."""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.prefetch)
+        producer = asyncio.create_task(self._produce(queue))
+        try:
+            while True:
+                item = await queue.get()
+                if item is _DONE:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            producer.cancel()
+            try:
+                await producer
+            except asyncio.CancelledError:
+                pass
+
+
+async def iter_address_txs(address: str, **walk_options) -> AsyncIterator[dict]:
+    """
+    Yield every tx of ``address``, newest first, without holding the whole
+    history in memory. ``walk_options`` are passed to ``AddressHistoryWalk``.
+    """
+    walk = AddressHistoryWalk(address, **walk_options)
+    async for page in walk.iter_pages():
+        for tx in page:
+            yield tx
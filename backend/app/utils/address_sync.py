@@ -0,0 +1,350 @@
+"""
+Incremental address history sync.
+
+For every address we have summarised, a small sync state is persisted: the
+newest *final* confirmed txid and its height, running received/sent totals,
+and the final txs themselves (newest first), kept as one compressed, already
+encoded JSON fragment. The tx bodies also go to the immutable store for the
+tx lookup routes. A refresh walks the mempool API only until it reaches the
+stored txid, which for a quiet address means the first page, i.e. one HTTP
+call. Totals are then updated incrementally and the stored fragment is
+spliced into the response as is, without decoding a single stored tx.
+Transactions above the final depth are still fetched on every refresh, so a
+reorg can never leave stale data in the persisted part.
+
+State reads and writes run on a dedicated thread, and the state is only
+rewritten when new txs have become final.
+"""
+
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List, Optional, Tuple
+
+from app.config.config import settings
+from app.utils.address_history import AddressHistoryWalk, address_flow
+from app.utils.header_index import get_chain_height
+from app.utils.immutable_store import immutable_store
+from app.utils.mempool_api import mempool_client
+from app.utils.rate_limiter import BACKGROUND, priority
+from app.utils.redis_service import RedisService
+from app.utils.serialization import dumps
+
+logger = logging.getLogger(__name__)
+
+# The stored fragment is rewritten whenever txs become final, so favour speed
+_COMPRESSION_LEVEL = 1
+
+
+class AddressSyncState:
+    def __init__(
+        self,
+        address: str,
+        txid: Optional[str] = None,
+        height: Optional[int] = None,
+        received: int = 0,
+        sent: int = 0,
+        tx_count: int = 0,
+        txs_json: bytes = b"",
+    ):
+        self.address = address
+        # Newest final confirmed tx; everything from it down is persisted
+        self.txid = txid
+        self.height = height
+        self.received = received
+        self.sent = sent
+        self.tx_count = tx_count
+        # The persisted txs as comma-separated JSON array elements
+        self.txs_json = txs_json
+
+
+class AddressSyncStore:
+    """Per-address sync state in a SQLite file, one row per address."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    async def _run(self, func: Callable[..., Any], *args) -> Any:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="address-sync"
+            )
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor, func, *args
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            # Previous layout (txids only); those states are rebuilt on demand
+            conn.execute("DROP TABLE IF EXISTS address_sync")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS address_sync_state ("
+                " address TEXT PRIMARY KEY,"
+                " txid TEXT,"
+                " height INTEGER,"
+                " received INTEGER NOT NULL,"
+                " sent INTEGER NOT NULL,"
+                " tx_count INTEGER NOT NULL,"
+                " txs_json BLOB NOT NULL,"
+                " updated_at REAL NOT NULL"
+                ")"
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    async def load(self, address: str) -> Optional[AddressSyncState]:
+        return await self._run(self._load, address)
+
+    def _load(self, address: str) -> Optional[AddressSyncState]:
+        try:
+            with self._lock:
+                row = (
+                    self._connect()
+                    .execute(
+                        "SELECT txid, height, received, sent, tx_count, txs_json"
+                        " FROM address_sync_state WHERE address = ?",
+                        (address,),
+                    )
+                    .fetchone()
+                )
+        except sqlite3.Error as e:
+            logger.error(f"Address sync state read failed for {address}: {e}")
+            return None
+        if row is None:
+            return None
+        txid, height, received, sent, tx_count, blob = row
+        txs_json = zlib.decompress(blob) if blob else b""
+        return AddressSyncState(
+            address, txid, height, received, sent, tx_count, txs_json
+        )
+
+    async def save(self, state: AddressSyncState) -> None:
+        await self._run(self._save, state)
+
+    def _save(self, state: AddressSyncState) -> None:
+        blob = zlib.compress(state.txs_json, _COMPRESSION_LEVEL)
+        try:
+            with self._lock:
+                conn = self._connect()
+                conn.execute(
+                    "INSERT OR REPLACE INTO address_sync_state"
+                    " (address, txid, height, received, sent, tx_count, txs_json,"
+                    " updated_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        state.address,
+                        state.txid,
+                        state.height,
+                        state.received,
+                        state.sent,
+                        state.tx_count,
+                        blob,
+                        time.time(),
+                    ),
+                )
+                conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Address sync state write failed for {state.address}: {e}")
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+address_sync_store = AddressSyncStore(settings.ADDRESS_SYNC_PATH)
+
+
+class AddressHistory:
+    """
+    Full history of an address, newest first, with its totals: the ``txs``
+    fetched by this refresh, followed by ``stored_count`` persisted txs that
+    stay encoded (``stored_json``).
+    """
+
+    def __init__(
+        self,
+        txs: List[dict],
+        stored_json: bytes,
+        stored_count: int,
+        received: int,
+        sent: int,
+        walk: AddressHistoryWalk,
+        incremental: bool,
+    ):
+        self.txs = txs
+        self.stored_json = stored_json
+        self.stored_count = stored_count
+        self.received = received
+        self.sent = sent
+        self.walk = walk
+        self.incremental = incremental
+
+    @property
+    def tx_count(self) -> int:
+        return len(self.txs) + self.stored_count
+
+    def encode_txs(self) -> bytes:
+        """The whole history as a JSON array."""
+        parts = [dumps(self.txs)[1:-1]] if self.txs else []
+        if self.stored_json:
+            parts.append(self.stored_json)
+        return b"[" + b",".join(parts) + b"]"
+
+
+def _is_final(tx: dict, final_height: int) -> bool:
+    status = tx.get("status", {})
+    return (
+        bool(status.get("confirmed"))
+        and status.get("block_height") is not None
+        and status["block_height"] <= final_height
+    )
+
+
+def _totals(txs: List[dict], address: str) -> Tuple[int, int]:
+    received = sent = 0
+    for tx in txs:
+        tx_received, tx_sent = address_flow(tx, address)
+        received += tx_received
+        sent += tx_sent
+    return received, sent
+
+
+async def _collect(walk: AddressHistoryWalk) -> Tuple[List[dict], int, int]:
+    """Gather a walk's txs, totalling them while later pages are in flight."""
+    txs = []
+    received = sent = 0
+    async for page in walk.iter_pages():
+        txs.extend(page)
+        page_received, page_sent = _totals(page, walk.address)
+        received += page_received
+        sent += page_sent
+    return txs, received, sent
+
+
+async def _persist(
+    state: AddressSyncState,
+    new_txs: List[dict],
+    final_height: int,
+    always_save: bool = False,
+) -> None:
+    """
+    Move the final txs among ``new_txs`` (which sit directly above
+    ``state.txid``) into the persisted state. The state is only written when
+    some became final, or with ``always_save``.
+    """
+    # History is newest first, so the final txs are a suffix of new_txs
+    split = len(new_txs)
+    while split > 0 and _is_final(new_txs[split - 1], final_height):
+        split -= 1
+    final_txs = new_txs[split:]
+    if not final_txs:
+        if always_save:
+            await address_sync_store.save(state)
+        return
+
+    await immutable_store.put_many(
+        "mempool-tx", ((tx["txid"], tx) for tx in final_txs)
+    )
+    received, sent = _totals(final_txs, state.address)
+    state.received += received
+    state.sent += sent
+    encoded = dumps(final_txs)[1:-1]
+    state.txs_json = encoded + b"," + state.txs_json if state.txs_json else encoded
+    state.tx_count += len(final_txs)
+    state.txid = final_txs[0]["txid"]
+    state.height = final_txs[0]["status"]["block_height"]
+    await address_sync_store.save(state)
+
+
+async def _full_walk(
+    address: str, redis_service: RedisService, final_height: int
+) -> Tuple[List[dict], int, int, AddressHistoryWalk]:
+    # Thousands of pages for a large address; interactive calls go first
+    with priority(BACKGROUND):
+        anchors_key = f"address-page-anchors:{address}"
+        anchors = []
+        expected_confirmed = None
+        if settings.ADDRESS_PARALLEL_PAGES:
+            # Page anchors from the last walk are only reused when buried deep
+            # enough; chain_stats tells us whether the result is complete
+            address_info = await mempool_client.get_address(address)
+            expected_confirmed = address_info["chain_stats"]["tx_count"]
+            anchors = [
+                (txid, height)
+                for txid, height in await redis_service.get(anchors_key) or []
+                if height is not None and height <= final_height
+            ]
+
+        walk = AddressHistoryWalk(address, anchors, expected_confirmed)
+        txs, received, sent = await _collect(walk)
+        if anchors and not walk.complete:
+            logger.info(
+                f"Parallel history of {address} has {walk.confirmed} confirmed "
+                f"txs, expected {expected_confirmed}; walking serially"
+            )
+            walk = AddressHistoryWalk(address)
+            txs, received, sent = await _collect(walk)
+
+        await redis_service.set(anchors_key, dumps(walk.anchors))
+        return txs, received, sent, walk
+
+
+async def fetch_address_history(
+    address: str, redis_service: RedisService
+) -> AddressHistory:
+    """
+    Return the full history of ``address``, fetching only what is new since
+    the last sync when a sync state exists.
+    """
+    final_height = await get_chain_height() - settings.IMMUTABLE_MIN_CONFIRMATIONS + 1
+    state = await address_sync_store.load(address)
+
+    if state is not None and state.txid:
+        walk = AddressHistoryWalk(address, stop_at=state.txid)
+        new_txs, received, sent = await _collect(walk)
+        if walk.reached_stop:
+            # Taken before _persist() moves the newly final txs into the state
+            history = AddressHistory(
+                new_txs,
+                state.txs_json,
+                state.tx_count,
+                state.received + received,
+                state.sent + sent,
+                walk,
+                incremental=True,
+            )
+            await _persist(state, new_txs, final_height)
+            return history
+        # The synced tx is gone from the history; the walk went all the way
+        # down (past its first page at background priority, like a full
+        # walk), so it already is a full history
+        logger.warning(f"Sync point of {address} not found, resyncing")
+        txs = new_txs
+    else:
+        txs, received, sent, walk = await _full_walk(
+            address, redis_service, final_height
+        )
+
+    # Rebuild the state from scratch, replacing any stale one
+    await _persist(AddressSyncState(address), txs, final_height, always_save=True)
+    return AddressHistory(txs, b"", 0, received, sent, walk, incremental=False)
@@ -0,0 +1,127 @@
+"""
+Binary block/transaction fetching through bitcoind's REST interface.
+
+``/rest/tx/<txid>.bin`` and ``/rest/block/<hash>.bin`` return the raw
+consensus serialization, which is several times smaller than verbose JSON and
+cheap to parse. Transactions are turned into compact dicts that keep the keys
+of ``getrawtransaction`` verbose output that our callers read (``txid``,
+``vin``, ``vout``), so the JSON path can be used interchangeably as fallback.
+Block-level context (``blockhash``, ``time``, ``confirmations``) is not part of
+the raw serialization and is therefore absent from REST results; callers that
+report it (such as the origin trace) stay on verbose JSON-RPC.
+"""
+
+import logging
+from io import BytesIO
+from typing import Optional
+
+import bitcoin
+from bitcoin.core import CBlockHeader, CTransaction, b2lx
+from bitcoin.core.serialize import VarIntSerializer
+from bitcoin.wallet import CBitcoinAddress, CBitcoinAddressError
+
+from app.config.config import settings
+from app.utils.bitcoin_rpc import bitcoin_rpc_call, rpc_client
+
+logger = logging.getLogger(__name__)
+
+bitcoin.SelectParams(settings.BITCOIN_NETWORK)
+
+
+def _script_address(script_pub_key) -> Optional[str]:
+    try:
+        return str(CBitcoinAddress.from_scriptPubKey(script_pub_key))
+    except (CBitcoinAddressError, ValueError):
+        # Non-standard, OP_RETURN and taproot outputs have no decodable address
+        return None
+
+
+def compact_transaction(tx: CTransaction) -> dict:
+    """Convert a deserialized transaction into the compact dict form."""
+    vin = []
+    for tx_in in tx.vin:
+        if tx_in.prevout.is_null():
+            vin.append(
+                {"coinbase": tx_in.scriptSig.hex(), "sequence": tx_in.nSequence}
+            )
+        else:
+            vin.append(
+                {
+                    "txid": b2lx(tx_in.prevout.hash),
+                    "vout": tx_in.prevout.n,
+                    "sequence": tx_in.nSequence,
+                }
+            )
+
+    vout = []
+    for n, tx_out in enumerate(tx.vout):
+        script_pub_key = {"hex": tx_out.scriptPubKey.hex()}
+        address = _script_address(tx_out.scriptPubKey)
+        if address:
+            script_pub_key["address"] = address
+        vout.append(
+            {
+                "value": tx_out.nValue / 100_000_000,
+                "n": n,
+                "scriptPubKey": script_pub_key,
+            }
+        )
+
+    return {
+        "txid": b2lx(tx.GetTxid()),
+        "version": tx.nVersion,
+        "locktime": tx.nLockTime,
+        "vin": vin,
+        "vout": vout,
+    }
+
+
+def deserialize_transaction(raw: bytes) -> dict:
+    return compact_transaction(CTransaction.deserialize(raw))
+
+
+def deserialize_block(raw: bytes) -> dict:
+    """
+    Parse a raw block into its header fields and compact transactions.
+
+    Transactions are read straight off the stream instead of through
+    ``CBlock`` so python-bitcoinlib does not rebuild the merkle tree.
+    """
+    stream = BytesIO(raw)
+    header = CBlockHeader.stream_deserialize(stream)
+    tx_count = VarIntSerializer.stream_deserialize(stream)
+    txs = [
+        compact_transaction(CTransaction.stream_deserialize(stream))
+        for _ in range(tx_count)
+    ]
+    return {
+        "hash": b2lx(header.GetHash()),
+        "previousblockhash": b2lx(header.hashPrevBlock),
+        "time": header.nTime,
+        "nTx": tx_count,
+        "tx": txs,
+    }
+
+
+async def fetch_transaction_bin(txid: str) -> dict:
+    raw = await rpc_client.rest_get(f"/rest/tx/{txid}.bin")
+    return deserialize_transaction(raw)
+
+
+async def fetch_block_bin(block_hash: str) -> dict:
+    raw = await rpc_client.rest_get(f"/rest/block/{block_hash}.bin")
+    return deserialize_block(raw)
+
+
+async def get_transaction_compact(txid: str) -> dict:
+    """
+    Fetch a transaction over REST when enabled, falling back to verbose
+    ``getrawtransaction`` JSON.
+    """
+    if settings.RPC_USE_REST:
+        try:
+            return await fetch_transaction_bin(txid)
+        except Exception as e:
+            logger.debug(f"REST fetch of tx {txid} failed, using JSON-RPC: {e}")
+    return await bitcoin_rpc_call("getrawtransaction", [txid, True])
+
@@ -1,25 +1,585 @@
-from app.config.config import settings
+import asyncio
+import itertools
+import json
+import logging
+import time
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
 import aiohttp
+import ijson
+
+from app.config.config import settings
+from app.utils.adaptive_limiter import AdaptiveLimiter
+from app.utils.metrics import (
+    registry,
+    template_path,
+    track_upstream,
+    upstream_coalesced_calls,
+    upstream_concurrency_limit,
+    upstream_queue_depth,
+)
+from app.utils.rpc_pool import RPCBackend, RPCBackendPool
+from app.utils.serialization import dumps, loads
+from app.utils.single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# Read-only calls whose result is the same for every concurrent caller and can
+# therefore be shared. Wallet calls such as getnewaddress must never be merged.
+COALESCED_METHODS = {
+    "getbestblockhash",
+    "getblock",
+    "getblockchaininfo",
+    "getblockcount",
+    "getblockhash",
+    "getblockheader",
+    "getmempoolentry",
+    "getrawtransaction",
+    "gettxout",
+    "listunspent",
+}
+
+
+class BitcoinRPCError(Exception):
+    """Raised when bitcoind rejects a call or answers with a JSON-RPC error."""
+
+    def __init__(
+        self,
+        message: str,
+        code: Optional[int] = None,
+        method: Optional[str] = None,
+        status: Optional[int] = None,
+    ):
+        super().__init__(message)
+        self.message = message
+        self.code = code
+        self.method = method
+        self.status = status
+
+
+class BitcoinRPCConnectionError(BitcoinRPCError):
+    """Raised when the node cannot be reached or drops the connection."""
+
+
+class BitcoinRPCTimeoutError(BitcoinRPCError):
+    """Raised when the node does not answer within the call timeout."""
+
+
+class BitcoinRPCOverloadError(BitcoinRPCError):
+    """Raised when the node sheds load, e.g. "Work queue depth exceeded"."""
+
+
+# Statuses bitcoind (or a proxy in front of it) uses when it is out of capacity
+OVERLOAD_STATUSES = {429, 502, 503, 504}
+
+
+def is_rpc_overload(error: BaseException) -> bool:
+    return isinstance(error, (BitcoinRPCOverloadError, asyncio.TimeoutError))
+
+
+class BitcoinRPCClient:
+    """
+    Long-lived JSON-RPC client for bitcoind.
+
+    A single aiohttp session is shared by every call so TCP connections, DNS
+    lookups and auth headers are reused across requests. Calls are routed
+    across the configured backends by an ``RPCBackendPool``. The session is
+    opened by the FastAPI lifespan (or the Celery worker) and created lazily
+    when a call happens outside of either.
+    """
+
+    def __init__(
+        self,
+        urls: List[str] = None,
+        user: str = None,
+        password: str = None,
+        wallet_name: str = None,
+        max_connections: int = None,
+        timeout: float = None,
+    ):
+        urls = urls or settings.RPC_BACKEND_URLS
+        wallet_name = settings.WALLET_NAME if wallet_name is None else wallet_name
+        wallet_path = f"/wallet/{wallet_name}" if wallet_name else ""
+
+        self.pool = RPCBackendPool(
+            [
+                RPCBackend.from_url(
+                    url,
+                    user or settings.RPC_USER,
+                    password or settings.RPC_PASSWORD,
+                    wallet_path,
+                    limiter=AdaptiveLimiter(
+                        f"bitcoin_rpc:{url}",
+                        initial=settings.RPC_CONCURRENCY_INITIAL,
+                        min_limit=settings.RPC_CONCURRENCY_MIN,
+                        max_limit=settings.RPC_CONCURRENCY_MAX,
+                        is_overload=is_rpc_overload,
+                    ),
+                )
+                for url in urls
+            ],
+            routing=settings.RPC_ROUTING,
+            max_block_lag=settings.RPC_MAX_BLOCK_LAG,
+        )
+        self.max_connections = max_connections or settings.RPC_MAX_CONNECTIONS
+        self.timeout = timeout or settings.RPC_TIMEOUT
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._health_task: Optional[asyncio.Task] = None
+        self._ids = itertools.count()
+        self.single_flight = SingleFlight(settings.SINGLE_FLIGHT_MAX_KEYS)
+
+    async def start(self):
+        """Open the pooled HTTP session and start backend health checks."""
+        if self._session is not None and not self._session.closed:
+            return
+
+        connector = aiohttp.TCPConnector(
+            limit=self.max_connections * len(self.pool.backends),
+            limit_per_host=self.max_connections,
+            keepalive_timeout=settings.RPC_KEEPALIVE_TIMEOUT,
+        )
+        self._session = aiohttp.ClientSession(
+            connector=connector,
+            headers={"content-type": "application/json"},
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+        )
+        if len(self.pool.backends) > 1:
+            self._health_task = asyncio.ensure_future(
+                self.pool.run_health_checks(
+                    self._probe, settings.RPC_HEALTH_CHECK_INTERVAL
+                )
+            )
+        logger.info(
+            f"Bitcoin RPC client started ({len(self.pool.backends)} backends, "
+            f"{self.max_connections} connections max each)"
+        )
+
+    async def close(self):
+        """Stop health checks and close the pooled HTTP session."""
+        if self._health_task is not None:
+            self._health_task.cancel()
+            try:
+                await self._health_task
+            except asyncio.CancelledError:
+                pass
+            self._health_task = None
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+            logger.info("Bitcoin RPC client closed")
+        self._session = None
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            await self.start()
+        return self._session
+
+    async def _probe(self, backend: RPCBackend) -> dict:
+        payload = {
+            "method": "getblockchaininfo",
+            "params": [],
+            "jsonrpc": "2.0",
+            "id": next(self._ids),
+        }
+        status, body, text = await self._post_to(
+            backend, payload, settings.RPC_HEALTH_CHECK_TIMEOUT
+        )
+        return self._parse_response("getblockchaininfo", status, body, text)
+
+    async def _post_to(
+        self, backend: RPCBackend, payload: Any, timeout: float = None
+    ) -> Tuple[int, Any, str]:
+        request_timeout = (
+            aiohttp.ClientTimeout(total=timeout) if timeout is not None else None
+        )
+        session = await self._get_session()
+        operation = payload["method"] if isinstance(payload, dict) else "batch"
+        async with track_upstream("bitcoin_rpc", operation) as call:
+            async with session.post(
+                backend.url, data=dumps(payload), auth=backend.auth, timeout=request_timeout
+            ) as response:
+                raw = await response.read()
+                call.response_bytes = len(raw)
+                try:
+                    body = loads(raw)
+                except ValueError:
+                    body = None
+                # Only used in error messages
+                text = raw[:500].decode(errors="replace")
+                if response.status in OVERLOAD_STATUSES and body is None:
+                    raise BitcoinRPCOverloadError(
+                        f"Bitcoin RPC overloaded: HTTP {response.status} {text}",
+                        status=response.status,
+                    )
+                error = body.get("error") if isinstance(body, dict) else None
+                if error:
+                    call.error = f"rpc_{error.get('code')}"
+                elif response.status != 200:
+                    call.error = f"http_{response.status}"
+                return response.status, body, text
+
+    async def _get_from(
+        self, backend: RPCBackend, path: str, timeout: float = None
+    ) -> Tuple[int, bytes]:
+        request_timeout = (
+            aiohttp.ClientTimeout(total=timeout) if timeout is not None else None
+        )
+        session = await self._get_session()
+        async with track_upstream("bitcoin_rest", template_path(path)) as call:
+            async with session.get(
+                f"{backend.base_url}{path}", timeout=request_timeout
+            ) as response:
+                body = await response.read()
+                call.response_bytes = len(body)
+                if response.status in OVERLOAD_STATUSES:
+                    raise BitcoinRPCOverloadError(
+                        f"Bitcoin REST overloaded: HTTP {response.status}",
+                        method="rest",
+                        status=response.status,
+                    )
+                if response.status != 200:
+                    call.error = f"http_{response.status}"
+                return response.status, body
+
+    async def _routed(
+        self,
+        method: str,
+        send: Callable[[RPCBackend], Awaitable[Any]],
+        retry: bool = False,
+    ) -> Any:
+        """
+        Run ``send`` against the best backend, within that backend's adaptive
+        concurrency limit. Connection failures and timeouts eject the backend
+        until its next successful health probe; when ``retry`` is set the
+        request is repeated once on another backend, as it is when the node
+        reports being overloaded.
+        """
+        backend = self.pool.choose()
+        attempts = 2 if retry and len(self.pool.backends) > 1 else 1
+
+        for attempt in range(attempts):
+            backend.outstanding += 1
+            started = time.monotonic()
+            try:
+                async with backend.limiter.slot():
+                    result = await send(backend)
+            except BitcoinRPCOverloadError as e:
+                e.method = method
+                if attempt + 1 < attempts:
+                    backend = self.pool.choose(exclude=backend)
+                    continue
+                raise
+            except (asyncio.TimeoutError, aiohttp.ClientConnectionError) as e:
+                backend.mark_down(str(e) or type(e).__name__)
+                if attempt + 1 < attempts:
+                    backend = self.pool.choose(exclude=backend)
+                    continue
+                if isinstance(e, asyncio.TimeoutError):
+                    raise BitcoinRPCTimeoutError(
+                        f"Bitcoin RPC call {method} timed out", method=method
+                    ) from e
+                raise BitcoinRPCConnectionError(
+                    f"Bitcoin RPC connection error: {e}", method=method
+                ) from e
+            finally:
+                backend.outstanding -= 1
+            backend.record_latency(time.monotonic() - started)
+            return result
+
+    async def _post(
+        self, method: str, payload: Any, timeout: float = None, retry: bool = False
+    ) -> Tuple[int, Any, str]:
+        return await self._routed(
+            method, lambda backend: self._post_to(backend, payload, timeout), retry
+        )
+
+    async def rest_get(self, path: str, timeout: float = None) -> bytes:
+        """
+        GET a bitcoind REST endpoint (``-rest=1``) such as
+        ``/rest/tx/<txid>.bin`` and return the raw body.
+        """
+        status, body = await self._routed(
+            "rest", lambda backend: self._get_from(backend, path, timeout), retry=True
+        )
+        if status != 200:
+            raise BitcoinRPCError(
+                f"Bitcoin REST error: HTTP {status} {body[:200].decode(errors='replace')}",
+                method="rest",
+                status=status,
+            )
+        return body
+
+    async def call(self, method: str, params=None, timeout: float = None) -> Any:
+        """
+        Send a single JSON-RPC call and return its ``result``.
+
+        Identical read-only calls that are already in flight are coalesced and
+        share one upstream request.
+        """
+        if params is None:
+            params = []
+
+        if method not in COALESCED_METHODS:
+            return await self._call(method, params, timeout)
+
+        key = (method, json.dumps(params, sort_keys=True))
+        return await self.single_flight.do(
+            key, lambda: self._call(method, params, timeout)
+        )
+
+    async def _call(self, method: str, params: list, timeout: float = None) -> Any:
+        payload = {
+            "method": method,
+            "params": params,
+            "jsonrpc": "2.0",
+            "id": next(self._ids),
+        }
+        status, body, text = await self._post(
+            method, payload, timeout, retry=method in COALESCED_METHODS
+        )
+        return self._parse_response(method, status, body, text)
+
+    @asynccontextmanager
+    async def stream(
+        self, method: str, params: list, item_path: str, timeout: float = None
+    ) -> AsyncIterator[AsyncIterator[Any]]:
+        """
+        Send a JSON-RPC call and iterate over the elements of the array found
+        at ``item_path`` inside its ``result`` (e.g. ``"tx"`` for
+        ``getblock``) while the body is still being received. Only one element
+        is held in memory at a time instead of the whole document::
+
+            async with rpc_client.stream("getblock", [block_hash, 2], "tx") as txs:
+                async for tx in txs:
+                    ...
+
+        The backend's concurrency slot and connection are held until the
+        ``async with`` block exits, so breaking out of the loop early releases
+        them straight away. ``timeout`` bounds each wait on the node
+        (connecting, every read), not the consumer-paced whole call.
+        """
+        payload = {
+            "method": method,
+            "params": params,
+            # Legacy JSON-RPC 1.0 framing makes bitcoind report errors with a
+            # non-200 status, which we can check before streaming the body.
+            "jsonrpc": "1.0",
+            "id": next(self._ids),
+        }
+        # A total timeout would also run while the consumer works (and hits
+        # a body read as a bare cancellation), so bound each wait on the node
+        timeout = timeout or self.timeout
+        request_timeout = aiohttp.ClientTimeout(
+            total=None, sock_connect=timeout, sock_read=timeout
+        )
+        session = await self._get_session()
+        backend = self.pool.choose()
+        acquired = False
+        try:
+            backend.outstanding += 1
+            # The slot is held while the consumer iterates, so it is released
+            # by hand, and only the time to headers is fed back as latency.
+            await backend.limiter.acquire()
+            acquired = True
+            epoch = backend.limiter.epoch
+            started = time.monotonic()
+            async with AsyncExitStack() as stack:
+                try:
+                    async with track_upstream("bitcoin_rpc", f"{method}:stream"):
+                        response = await stack.enter_async_context(
+                            session.post(
+                                backend.url,
+                                data=dumps(payload),
+                                auth=backend.auth,
+                                timeout=request_timeout,
+                            )
+                        )
+                        if response.status != 200:
+                            text = await response.text()
+                            if response.status in OVERLOAD_STATUSES:
+                                backend.limiter.on_overload(epoch)
+                                raise BitcoinRPCOverloadError(
+                                    f"Bitcoin RPC overloaded: "
+                                    f"HTTP {response.status} {text}",
+                                    method=method,
+                                    status=response.status,
+                                )
+                            try:
+                                body = loads(text)
+                            except ValueError:
+                                body = None
+                            self._parse_response(method, response.status, body, text)
+                except (asyncio.TimeoutError, aiohttp.ClientConnectionError) as e:
+                    raise self._stream_failure(backend, method, epoch, e) from e
+                backend.record_latency(time.monotonic() - started)
+
+                yield self._stream_items(
+                    backend,
+                    method,
+                    epoch,
+                    ijson.items_async(
+                        response.content, f"result.{item_path}.item", use_float=True
+                    ),
+                )
+        finally:
+            if acquired:
+                backend.limiter.release()
+            backend.outstanding -= 1
+
+    async def _stream_items(
+        self, backend: RPCBackend, method: str, epoch: int, items: AsyncIterator[Any]
+    ) -> AsyncIterator[Any]:
+        # Only failures of the body read are the node's; errors raised by the
+        # consumer between items never pass through here
+        try:
+            async for item in items:
+                yield item
+        except (asyncio.TimeoutError, aiohttp.ClientConnectionError) as e:
+            raise self._stream_failure(backend, method, epoch, e) from e
+
+    @staticmethod
+    def _stream_failure(
+        backend: RPCBackend, method: str, epoch: int, error: Exception
+    ) -> BitcoinRPCError:
+        """Eject ``backend`` after ``error`` and return the error to raise."""
+        backend.mark_down(str(error) or type(error).__name__)
+        if isinstance(error, asyncio.TimeoutError):
+            backend.limiter.on_overload(epoch)
+            return BitcoinRPCTimeoutError(
+                f"Bitcoin RPC call {method} timed out", method=method
+            )
+        return BitcoinRPCConnectionError(
+            f"Bitcoin RPC connection error: {error}",
+            method=method,
+        )
+
+    async def batch(
+        self, calls: Sequence[Tuple[str, list]], timeout: float = None
+    ) -> List[Any]:
+        """
+        Send several JSON-RPC calls as one array per POST.
+
+        Results come back in the order of ``calls``. A call that failed on the
+        node is returned as a ``BitcoinRPCError`` instance in its slot instead
+        of raising, so one bad item does not sink the rest of the batch.
+        Transport failures still raise for the whole batch.
+        """
+        calls = list(calls)
+        if not calls:
+            return []
+
+        chunk_size = settings.RPC_BATCH_SIZE
+        chunks = [calls[i : i + chunk_size] for i in range(0, len(calls), chunk_size)]
+        results = await asyncio.gather(
+            *(self._batch_chunk(chunk, timeout) for chunk in chunks)
+        )
+        return [item for chunk_results in results for item in chunk_results]
+
+    async def _batch_chunk(
+        self, calls: List[Tuple[str, list]], timeout: float = None
+    ) -> List[Any]:
+        ids = [next(self._ids) for _ in calls]
+        payload = [
+            {
+                "method": method,
+                "params": params if params is not None else [],
+                "jsonrpc": "2.0",
+                "id": call_id,
+            }
+            for call_id, (method, params) in zip(ids, calls)
+        ]
+        read_only = all(method in COALESCED_METHODS for method, _ in calls)
+        status, body, text = await self._post("batch", payload, timeout, retry=read_only)
+        if not isinstance(body, list):
+            raise BitcoinRPCError(
+                f"Bitcoin RPC batch error: HTTP {status} {text}",
+                method="batch",
+                status=status,
+            )
+
+        by_id = {item.get("id"): item for item in body if isinstance(item, dict)}
+        results = []
+        for call_id, (method, _) in zip(ids, calls):
+            item = by_id.get(call_id)
+            if item is None:
+                results.append(
+                    BitcoinRPCError(
+                        "Bitcoin RPC error: missing response in batch", method=method
+                    )
+                )
+            elif item.get("error"):
+                error = item["error"]
+                results.append(
+                    BitcoinRPCError(
+                        f"Bitcoin RPC error: {error.get('message')}",
+                        code=error.get("code"),
+                        method=method,
+                    )
+                )
+            else:
+                results.append(item.get("result"))
+        return results
+
+    @staticmethod
+    def _parse_response(method: str, status: int, body: Any, text: str) -> Any:
+        # bitcoind reports RPC errors as a JSON error object, usually with a
+        # non-200 status (500 for most errors, 404 for unknown methods).
+        error = body.get("error") if isinstance(body, dict) else None
+        if error:
+            raise BitcoinRPCError(
+                f"Bitcoin RPC error: {error.get('message')}",
+                code=error.get("code"),
+                method=method,
+                status=status,
+            )
+
+        if status != 200 or not isinstance(body, dict):
+            raise BitcoinRPCError(
+                f"Bitcoin RPC error: HTTP {status} {text}",
+                method=method,
+                status=status,
+            )
+
+        return body["result"]
+
+
+rpc_client = BitcoinRPCClient()
+
+
+@registry.on_collect
+def _collect_rpc_gauges():
+    for backend in rpc_client.pool.backends:
+        upstream_concurrency_limit.set(
+            "bitcoin_rpc", backend.name, value=backend.limiter.limit
+        )
+        upstream_queue_depth.set(
+            "bitcoin_rpc", backend.name, value=backend.limiter.queued
+        )
+    upstream_coalesced_calls.set(
+        "bitcoin_rpc", value=rpc_client.single_flight.coalesced
+    )
+
 
+async def bitcoin_rpc_call(method: str, params=None, timeout: float = None):
+    return await rpc_client.call(method, params, timeout=timeout)
 
-async def bitcoin_rpc_call(method: str, params=None):
-    if params is None:
-        params = []
 
-    wallet_path = f"/wallet/{settings.WALLET_NAME}" if settings.WALLET_NAME else ""
-    url = f"http://{settings.RPC_USER}:{settings.RPC_PASSWORD}@{settings.RPC_HOST}:{settings.RPC_PORT}{wallet_path}"
-    headers = {"content-type": "application/json"}
-    payload = {
-        "method": method,
-        "params": params,
-        "jsonrpc": "2.0",
-        "id": 0,
-    }
+async def bitcoin_rpc_batch(calls: Sequence[Tuple[str, list]], timeout: float = None):
+    return await rpc_client.batch(calls, timeout=timeout)
 
-    async with aiohttp.ClientSession() as session:
-        async with session.post(url, json=payload, headers=headers) as response:
-            if response.status != 200:
-                raise Exception(f"Bitcoin RPC error: {await response.text()}")
 
-            result = await response.json()
-            return result["result"]
+def raise_for_batch_errors(results: List[Any]) -> List[Any]:
+    """Raise the first per-item error of a batch, otherwise return the results."""
+    for result in results:
+        if isinstance(result, BitcoinRPCError):
+            raise result
+    return results
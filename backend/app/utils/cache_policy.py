@@ -0,0 +1,108 @@
+"""
+Expiry policy for everything written to Redis.
+
+Callers do not pick TTLs. They say what a value is: its namespace (the key
+prefix before the first ``:``) and, for chain data, its state:
+
+* ``UNCONFIRMED``: mempool data, replaced or confirmed at any moment
+* ``CONFIRMED``: in a block but shallow enough to be reorged
+* ``FINAL``: buried under ``IMMUTABLE_MIN_CONFIRMATIONS``; never changes
+* ``TIP``: derived from the chain tip (node info, latest blocks,
+  confirmation counts); valid until the next block
+* ``VOLATILE``: anything else that drifts over time (balances, summaries)
+
+Namespaces with a lifetime of their own (task status, page anchors) are
+configured in ``CACHE_NAMESPACE_TTLS`` and take precedence over the state.
+``TIP`` keys are additionally tracked in a Redis set and deleted as soon as
+the header index sees a new block, by the first worker to see it, with
+``CACHE_TTL_TIP`` as a backstop.
+"""
+
+import logging
+from typing import Dict, Optional
+
+from app.config.config import settings
+from app.utils.immutable_store import immutable_store
+
+logger = logging.getLogger(__name__)
+
+UNCONFIRMED = "unconfirmed"
+CONFIRMED = "confirmed"
+FINAL = "final"
+TIP = "tip"
+VOLATILE = "volatile"
+
+# Redis set of the keys to delete on the next block
+TIP_KEYS = "cache-policy:tip-keys"
+# Prefix of the per-block claim of the worker that deletes them
+TIP_EXPIRED = "cache-policy:tip-expired"
+
+
+def parse_ttls(spec: str) -> Dict[str, float]:
+    """``"node_info=5,tx-info=30"`` -> ``{"node_info": 5.0, "tx-info": 30.0}``"""
+    ttls = {}
+    for item in spec.split(","):
+        if item.strip():
+            namespace, _, ttl = item.partition("=")
+            ttls[namespace.strip()] = float(ttl)
+    return ttls
+
+
+def namespace_of(key: str) -> str:
+    return key.split(":", 1)[0]
+
+
+def state_for_confirmations(confirmations: Optional[int]) -> str:
+    """State of a verbose ``getrawtransaction`` result."""
+    if not confirmations:
+        return UNCONFIRMED
+    if immutable_store.is_final(confirmations):
+        return FINAL
+    # The payload carries a confirmation count, which changes every block
+    return TIP
+
+
+def state_for_mempool_tx(tx: dict, tip: Optional[int]) -> str:
+    """State of an esplora transaction, judged by its ``status``."""
+    status = tx.get("status", {})
+    if not status.get("confirmed") or status.get("block_height") is None:
+        return UNCONFIRMED
+    if tip is not None and immutable_store.is_final(tip - status["block_height"] + 1):
+        return FINAL
+    return CONFIRMED
+
+
+class CachePolicy:
+    def __init__(self, state_ttls: Dict[str, int], namespace_ttls: Dict[str, float]):
+        self.state_ttls = state_ttls
+        self.namespace_ttls = namespace_ttls
+
+    def expiry(
+        self, key: str, state: str = VOLATILE, expiry: Optional[int] = None
+    ) -> Optional[int]:
+        """
+        Seconds until ``key`` expires, ``None`` for no expiry. An explicit
+        ``expiry`` is only for values with an external lifetime, such as
+        access tokens.
+        """
+        if expiry is not None:
+            return expiry
+        ttl = self.namespace_ttls.get(namespace_of(key))
+        if ttl is None:
+            ttl = self.state_ttls[state]
+        return int(ttl) if ttl > 0 else None
+
+    def stats(self) -> dict:
+        return {"states": self.state_ttls, "namespaces": self.namespace_ttls}
+
+
+cache_policy = CachePolicy(
+    {
+        UNCONFIRMED: settings.CACHE_TTL_UNCONFIRMED,
+        CONFIRMED: settings.CACHE_TTL_CONFIRMED,
+        FINAL: settings.CACHE_TTL_FINAL,
+        TIP: settings.CACHE_TTL_TIP,
+        VOLATILE: settings.VOLATILE_CACHE_TTL,
+    },
+    parse_ttls(settings.CACHE_NAMESPACE_TTLS),
+)
@@ -0,0 +1,256 @@
+"""
+In-process index of the best header chain.
+
+Block hash, timestamp and transaction count are kept in flat arrays indexed
+by height (about 40 bytes per block, ~35 MB for mainnet), so height -> hash /
+time / nTx lookups are O(1) and never leave the process. The index is
+bootstrapped from genesis in the background, through bitcoind's REST
+``/rest/headers`` endpoint when ``RPC_USE_REST`` is on (80 bytes per header,
+2000 per request) or else through batched ``getblockhash``/``getblockheader``
+calls. It then follows the node by polling ``getbestblockhash``: new blocks are
+appended and, on a reorg, everything above the fork point is rolled back and
+refetched.
+
+Heights that are not indexed yet (during bootstrap) return ``None`` and callers
+fall back to RPC. Every API worker keeps its own index.
+"""
+
+import asyncio
+import hashlib
+import logging
+from array import array
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+from app.config.config import settings
+from app.utils.bitcoin_rpc import (
+    bitcoin_rpc_batch,
+    bitcoin_rpc_call,
+    raise_for_batch_errors,
+    rpc_client,
+)
+
+logger = logging.getLogger(__name__)
+
+HEADER_SIZE = 80
+REST_HEADERS_PER_REQUEST = 2000
+# Heights compared per round trip while looking for a fork point
+FORK_SEARCH_STEP = 16
+
+
+def _parse_headers(raw: bytes) -> List[Tuple[str, str, int]]:
+    """Split raw REST headers into (hash, previous hash, time) tuples."""
+    headers = []
+    for offset in range(0, len(raw) - HEADER_SIZE + 1, HEADER_SIZE):
+        header = raw[offset : offset + HEADER_SIZE]
+        block_hash = hashlib.sha256(hashlib.sha256(header).digest()).digest()
+        headers.append(
+            (
+                block_hash[::-1].hex(),
+                header[4:36][::-1].hex(),
+                int.from_bytes(header[68:72], "little"),
+            )
+        )
+    return headers
+
+
+class HeaderIndex:
+    def __init__(self):
+        self._hashes = bytearray()
+        self._times = array("I")
+        # 0 means unknown: REST headers do not carry the transaction count
+        self._tx_counts = array("I")
+        # True once the index has caught up with the node at least once
+        self.synced = False
+        self.reorgs = 0
+        self._tip_listeners: List[Callable[[int, str], Awaitable[None]]] = []
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def height(self) -> Optional[int]:
+        """Height of the indexed tip, ``None`` while the index is empty."""
+        return len(self._times) - 1 if self._times else None
+
+    def _covers(self, height: int) -> bool:
+        return 0 <= height < len(self._times)
+
+    def hash_at(self, height: int) -> Optional[str]:
+        if not self._covers(height):
+            return None
+        return self._hashes[height * 32 : height * 32 + 32].hex()
+
+    def time_at(self, height: int) -> Optional[int]:
+        return self._times[height] if self._covers(height) else None
+
+    def tx_count_at(self, height: int) -> Optional[int]:
+        if not self._covers(height):
+            return None
+        return self._tx_counts[height] or None
+
+    def set_tx_count(self, height: int, block_hash: str, tx_count: int):
+        """Record a transaction count learned elsewhere, e.g. from getblockheader."""
+        if self.hash_at(height) == block_hash:
+            self._tx_counts[height] = tx_count
+
+    def locate(self, block_hash: str, height_hint: int) -> Optional[int]:
+        """
+        Height of ``block_hash``, checked around ``height_hint`` (e.g. derived
+        from a transaction's confirmations, which may be off by a block if the
+        node has moved on since).
+        """
+        for height in (height_hint, height_hint - 1, height_hint + 1):
+            if self.hash_at(height) == block_hash:
+                return height
+        return None
+
+    def _append(self, block_hash: str, time: int, tx_count: int):
+        self._hashes += bytes.fromhex(block_hash)
+        self._times.append(time)
+        self._tx_counts.append(tx_count)
+
+    def _truncate(self, height: int):
+        """Drop every header above ``height``."""
+        del self._hashes[(height + 1) * 32 :]
+        del self._times[height + 1 :]
+        del self._tx_counts[height + 1 :]
+
+    async def _find_fork(self, node_height: int) -> int:
+        """Highest height at which our hash still matches the node's."""
+        top = min(self.height, node_height)
+        while top >= 0:
+            bottom = max(0, top - FORK_SEARCH_STEP + 1)
+            heights = list(range(top, bottom - 1, -1))
+            node_hashes = raise_for_batch_errors(
+                await bitcoin_rpc_batch([("getblockhash", [h]) for h in heights])
+            )
+            for height, node_hash in zip(heights, node_hashes):
+                if self.hash_at(height) == node_hash:
+                    return height
+            top = bottom - 1
+        return -1
+
+    async def _extend_rpc(self, node_height: int):
+        start = len(self._times)
+        while start <= node_height:
+            end = min(node_height, start + settings.RPC_BATCH_SIZE - 1)
+            heights = range(start, end + 1)
+            hashes = raise_for_batch_errors(
+                await bitcoin_rpc_batch([("getblockhash", [h]) for h in heights])
+            )
+            headers = raise_for_batch_errors(
+                await bitcoin_rpc_batch([("getblockheader", [h]) for h in hashes])
+            )
+            for header in headers:
+                if self._times and header["previousblockhash"] != self.hash_at(
+                    self.height
+                ):
+                    # The chain moved under us; the next sync finds the fork
+                    return
+                self._append(header["hash"], header["time"], header["nTx"])
+            start = end + 1
+
+    async def _extend_rest(self, node_height: int):
+        if self._times:
+            # Headers are returned starting with the given block, so ask from
+            # our tip and skip it
+            start_hash = self.hash_at(self.height)
+        else:
+            start_hash = await bitcoin_rpc_call("getblockhash", [0])
+        while self.height is None or self.height < node_height:
+            raw = await rpc_client.rest_get(
+                f"/rest/headers/{start_hash}.bin?count={REST_HEADERS_PER_REQUEST}"
+            )
+            headers = _parse_headers(raw)
+            if self._times:
+                headers = headers[1:]
+            if not headers:
+                return
+            for block_hash, previous_hash, time in headers:
+                if self._times and previous_hash != self.hash_at(self.height):
+                    return
+                self._append(block_hash, time, 0)
+            start_hash = self.hash_at(self.height)
+
+    def on_new_tip(self, callback: Callable[[int, str], Awaitable[None]]):
+        """Await ``callback(height, block_hash)`` whenever the synced tip changes."""
+        self._tip_listeners.append(callback)
+
+    async def _notify_new_tip(self):
+        height = self.height
+        block_hash = self.hash_at(height)
+        for callback in self._tip_listeners:
+            try:
+                await callback(height, block_hash)
+            except Exception as e:
+                logger.error(f"New tip listener failed at height {height}: {e}")
+
+    async def sync(self):
+        """Bring the index up to the node's best chain."""
+        best_hash = await bitcoin_rpc_call("getbestblockhash")
+        if self._times and best_hash == self.hash_at(self.height):
+            return
+
+        node_height = await bitcoin_rpc_call("getblockcount")
+        if self._times:
+            fork = await self._find_fork(node_height)
+            # A node that is merely behind us (fork == node_height) is no reorg
+            if fork < min(self.height, node_height):
+                logger.warning(
+                    f"Header index reorg: rolling back {self.height - fork} "
+                    f"block(s) above height {fork}"
+                )
+                self.reorgs += 1
+                self._truncate(fork)
+
+        if settings.RPC_USE_REST:
+            try:
+                await self._extend_rest(node_height)
+            except Exception as e:
+                logger.warning(f"REST header fetch failed, using JSON-RPC: {e}")
+        await self._extend_rpc(node_height)
+        if self.height is not None and self.height >= node_height:
+            if not self.synced:
+                logger.info(f"Header index synced to height {self.height}")
+            self.synced = True
+            await self._notify_new_tip()
+
+    async def run(self, interval: float):
+        while True:
+            try:
+                await self.sync()
+            except Exception as e:
+                logger.error(f"Header index sync failed: {e}")
+            await asyncio.sleep(interval)
+
+    def start(self, interval: float):
+        if self._task is None:
+            self._task = asyncio.create_task(self.run(interval))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "synced": self.synced,
+            "height": self.height,
+            "tip": self.hash_at(self.height) if self._times else None,
+            "reorgs": self.reorgs,
+            "memory_bytes": len(self._hashes)
+            + self._times.itemsize * len(self._times)
+            + self._tx_counts.itemsize * len(self._tx_counts),
+        }
+
+
+header_index = HeaderIndex()
+
+
+async def get_chain_height() -> int:
+    """Current best height, from the index once it has caught up."""
+    if header_index.synced:
+        return header_index.height
+    return await bitcoin_rpc_call("getblockcount")
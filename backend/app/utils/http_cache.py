@@ -0,0 +1,83 @@
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+
+class CachedResponse:
+    def __init__(
+        self,
+        data: Any,
+        size: int,
+        etag: Optional[str],
+        last_modified: Optional[str],
+    ):
+        self.data = data
+        self.size = size
+        self.etag = etag
+        self.last_modified = last_modified
+
+
+class RevalidationCache:
+    """
+    Bounded LRU of decoded response bodies and their validators.
+
+    Only responses carrying an ``ETag`` or ``Last-Modified`` header are kept.
+    The next request for the same path sends them back as ``If-None-Match`` /
+    ``If-Modified-Since``, so an unchanged resource costs a 304 with no body
+    to transfer or decode. The budget is counted in raw body bytes.
+    """
+
+    def __init__(self, max_bytes: int, max_entry_bytes: int):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.bytes = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def conditional_headers(self, entry: Optional[CachedResponse]) -> Dict[str, str]:
+        headers = {}
+        if entry is not None:
+            if entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+        return headers
+
+    def put(
+        self,
+        key: str,
+        data: Any,
+        size: int,
+        etag: Optional[str],
+        last_modified: Optional[str],
+    ):
+        self.discard(key)
+        if not (etag or last_modified) or size > self.max_entry_bytes:
+            return
+        self._entries[key] = CachedResponse(data, size, etag, last_modified)
+        self.bytes += size
+        while self.bytes > self.max_bytes and self._entries:
+            _, evicted = self._entries.popitem(last=False)
+            self.bytes -= evicted.size
+            self.evictions += 1
+
+    def discard(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry.size
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,173 @@
+"""
+Local on-disk store for chain data that can no longer change.
+
+Transactions and blocks buried under ``IMMUTABLE_MIN_CONFIRMATIONS`` blocks
+are, for our purposes, final: a reorg that deep is not something we try to
+survive. Such objects are kept in an embedded SQLite file keyed by txid or
+block hash, as zlib-compressed JSON, so they never have to be fetched from
+upstream again and do not take up Redis memory. Redis keeps only volatile data
+(unconfirmed or shallow transactions, tip-dependent results) with a TTL.
+"""
+
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from app.config.config import settings
+from app.utils.serialization import dumps, loads
+
+logger = logging.getLogger(__name__)
+
+# Stays well below SQLite's limit on bound parameters per statement
+_LOOKUP_CHUNK = 500
+# Threads doing the SQLite, zlib and JSON work. Queries are serialized by the
+# connection lock; decompression and parsing run in parallel.
+_WORKERS = 4
+
+
+class ImmutableStore:
+    """
+    Namespaced key/value store backed by a single SQLite file.
+
+    The public methods are coroutines: disk reads, (de)compression and JSON
+    work for a batch of large transactions run on a small thread pool, off
+    the event loop. The connection is opened lazily and shared between those
+    threads behind a lock.
+    """
+
+    def __init__(self, path: str, min_confirmations: int, compression_level: int = 6):
+        self.path = path
+        self.min_confirmations = min_confirmations
+        self.compression_level = compression_level
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    async def _run(self, func: Callable[..., Any], *args) -> Any:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=_WORKERS, thread_name_prefix="immutable-store"
+            )
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor, func, *args
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS objects ("
+                " namespace TEXT NOT NULL,"
+                " key TEXT NOT NULL,"
+                " value BLOB NOT NULL,"
+                " PRIMARY KEY (namespace, key)"
+                ") WITHOUT ROWID"
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def is_final(self, confirmations: Optional[int]) -> bool:
+        return confirmations is not None and confirmations >= self.min_confirmations
+
+    async def get(self, namespace: str, key: str) -> Optional[object]:
+        return (await self.get_many(namespace, [key])).get(key)
+
+    async def get_many(self, namespace: str, keys: List[str]) -> Dict[str, object]:
+        """Look up several keys at once; missing keys are left out."""
+        if not keys:
+            return {}
+        return await self._run(self._get_many, namespace, keys)
+
+    def _get_many(self, namespace: str, keys: List[str]) -> Dict[str, object]:
+        found: Dict[str, object] = {}
+        try:
+            with self._lock:
+                conn = self._connect()
+                for offset in range(0, len(keys), _LOOKUP_CHUNK):
+                    chunk = keys[offset : offset + _LOOKUP_CHUNK]
+                    rows = conn.execute(
+                        "SELECT key, value FROM objects WHERE namespace = ?"
+                        f" AND key IN ({','.join('?' * len(chunk))})",
+                        (namespace, *chunk),
+                    ).fetchall()
+                    for key, value in rows:
+                        found[key] = value
+                self.hits += len(found)
+                self.misses += len(keys) - len(found)
+        except sqlite3.Error as e:
+            logger.error(f"Immutable store read failed for {namespace}: {e}")
+            return {}
+
+        return {key: loads(zlib.decompress(value)) for key, value in found.items()}
+
+    async def put(self, namespace: str, key: str, value: object) -> None:
+        await self.put_many(namespace, [(key, value)])
+
+    async def put_many(
+        self, namespace: str, items: Iterable[Tuple[str, object]]
+    ) -> None:
+        items = list(items)
+        if items:
+            await self._run(self._put_many, namespace, items)
+
+    def _put_many(self, namespace: str, items: List[Tuple[str, object]]) -> None:
+        rows = [
+            (
+                namespace,
+                key,
+                zlib.compress(dumps(value), self.compression_level),
+            )
+            for key, value in items
+        ]
+        if not rows:
+            return
+        try:
+            with self._lock:
+                conn = self._connect()
+                # Content never changes, so an existing row is already correct
+                cursor = conn.executemany(
+                    "INSERT OR IGNORE INTO objects (namespace, key, value)"
+                    " VALUES (?, ?, ?)",
+                    rows,
+                )
+                conn.commit()
+                self.writes += cursor.rowcount
+        except sqlite3.Error as e:
+            logger.error(f"Immutable store write failed for {namespace}: {e}")
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def stats(self) -> dict:
+        return {
+            "path": self.path,
+            "min_confirmations": self.min_confirmations,
+            "hits": self.hits,
+            "misses": self.misses,
+            "writes": self.writes,
+        }
+
+
+immutable_store = ImmutableStore(
+    settings.IMMUTABLE_STORE_PATH, settings.IMMUTABLE_MIN_CONFIRMATIONS
+)
@@ -0,0 +1,209 @@
+"""
+In-process L1 tier in front of Redis.
+
+Hot keys (``node_info``, ``latest_blocks``, popular ``tx-info:*`` payloads,
+token checks) are read on almost every request. ``RedisService`` keeps the
+raw bytes of such keys in a bounded per-process LRU, so a repeat lookup costs
+neither a Redis round trip nor a copy off the socket. Absent keys are cached
+too, which is what makes the token denylist check cheap.
+
+Only namespaces (the key prefix before the first ``:``) listed in
+``L1_CACHE_TTLS`` are cached, each with its own TTL. Every write through
+``RedisService`` to such a key publishes an invalidation on a Redis pub/sub
+channel in the same pipeline, and each worker drops the key when the message
+arrives. While the subscription is down the tier is bypassed and emptied, as
+messages may have been missed.
+"""
+
+import asyncio
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+
+from app.config.config import settings
+from app.utils.cache_policy import namespace_of, parse_ttls
+from app.utils.metrics import (
+    l1_cache_bytes,
+    l1_cache_evictions,
+    l1_cache_invalidations,
+    l1_cache_requests,
+    registry,
+)
+from app.utils.serialization import dumps, loads
+
+logger = logging.getLogger(__name__)
+
+# Rough per-entry bookkeeping cost on top of key and value bytes
+_ENTRY_OVERHEAD = 100
+# Stored for keys that do not exist in Redis
+_ABSENT = b""
+
+
+class L1Cache:
+    def __init__(
+        self,
+        max_bytes: int,
+        max_entry_bytes: int,
+        ttls: Dict[str, float],
+        channel: str,
+    ):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.ttls = ttls
+        self.channel = channel
+        self.instance_id = uuid.uuid4().hex
+        self.bytes = 0
+        # Bumped on every invalidation; a value read from Redis is only
+        # stored if no invalidation happened while it was being read
+        self.generation = 0
+        # Only serve entries while invalidations are being received
+        self.coherent = False
+        self._entries: "OrderedDict[str, Tuple[bytes, float, int]]" = OrderedDict()
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def cacheable(self, key: str) -> bool:
+        return namespace_of(key) in self.ttls
+
+    def get(self, key: str) -> Tuple[bool, Optional[bytes]]:
+        """``(found, value)``; a found key with value ``None`` is known absent."""
+        if not self.coherent or not self.cacheable(key):
+            return False, None
+        namespace = namespace_of(key)
+        entry = self._entries.get(key)
+        if entry is not None and entry[1] <= time.monotonic():
+            self._remove(key)
+            entry = None
+        if entry is None:
+            l1_cache_requests.inc(namespace, "miss")
+            return False, None
+        self._entries.move_to_end(key)
+        l1_cache_requests.inc(namespace, "hit")
+        return True, entry[0] or None
+
+    def put(self, key: str, value: Optional[bytes], generation: int):
+        if (
+            not self.coherent
+            or generation != self.generation
+            or not self.cacheable(key)
+        ):
+            return
+        value = value or _ABSENT
+        size = len(key) + len(value) + _ENTRY_OVERHEAD
+        if size > self.max_entry_bytes:
+            return
+        self._remove(key)
+        expires = time.monotonic() + self.ttls[namespace_of(key)]
+        self._entries[key] = (value, expires, size)
+        self.bytes += size
+        while self.bytes > self.max_bytes and self._entries:
+            _, (_, _, evicted) = self._entries.popitem(last=False)
+            self.bytes -= evicted
+            l1_cache_evictions.inc()
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry[2]
+
+    def invalidate(self, keys: Optional[Iterable[str]], origin: str = "local"):
+        """Drop ``keys`` (or everything, for ``None``) from this process."""
+        self.generation += 1
+        l1_cache_invalidations.inc(origin)
+        if keys is None:
+            self._entries.clear()
+            self.bytes = 0
+            return
+        for key in keys:
+            self._remove(key)
+
+    def invalidation_message(self, keys: Optional[Iterable[str]]) -> Optional[bytes]:
+        """
+        Pub/sub payload invalidating ``keys`` (``None`` for a flush) in the
+        other workers, or ``None`` when none of them can be cached.
+        """
+        if keys is not None:
+            keys = [key for key in keys if self.cacheable(key)]
+            if not keys:
+                return None
+        return dumps({"origin": self.instance_id, "keys": keys})
+
+    def _on_message(self, data: bytes):
+        try:
+            message = loads(data)
+        except ValueError:
+            logger.warning(f"Ignoring malformed L1 invalidation: {data[:100]!r}")
+            return
+        # Our own writes were already applied locally
+        if message.get("origin") != self.instance_id:
+            self.invalidate(message.get("keys"), origin="pubsub")
+
+    async def _listen(self, redis):
+        backoff = 1.0
+        while True:
+            pubsub = redis.pubsub()
+            try:
+                await pubsub.subscribe(self.channel)
+                async for message in pubsub.listen():
+                    if message["type"] == "subscribe":
+                        self.coherent = True
+                        backoff = 1.0
+                        logger.info(f"L1 cache subscribed to {self.channel}")
+                    elif message["type"] == "message":
+                        self._on_message(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(
+                    f"L1 cache invalidation channel lost, bypassing L1 "
+                    f"(retrying in {backoff:.0f}s): {e}"
+                )
+            finally:
+                self.coherent = False
+                self.invalidate(None, origin="resubscribe")
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 30.0)
+
+    def start(self, redis):
+        """Follow invalidations from the other workers; no-op without TTLs."""
+        if self.ttls and self.max_bytes > 0 and self._task is None:
+            self._task = asyncio.create_task(self._listen(redis))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "coherent": self.coherent,
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "namespaces": self.ttls,
+        }
+
+
+l1_cache = L1Cache(
+    settings.L1_CACHE_BYTES,
+    settings.L1_CACHE_MAX_ENTRY_BYTES,
+    parse_ttls(settings.L1_CACHE_TTLS),
+    settings.L1_CACHE_CHANNEL,
+)
+
+
+@registry.on_collect
+def _collect_l1_gauges():
+    l1_cache_bytes.set(value=l1_cache.bytes)
@@ -1,19 +1,252 @@
-from app.config.config import settings
+import asyncio
+import logging
+import random
+from typing import Any, List, Optional
+
 import aiohttp
 
+from app.config.config import settings
+from app.utils.adaptive_limiter import AdaptiveLimiter
+from app.utils.http_cache import RevalidationCache
+from app.utils.metrics import (
+    http_cache_bytes,
+    http_cache_requests,
+    rate_limit_queue_depth,
+    registry,
+    template_path,
+    track_upstream,
+    upstream_coalesced_calls,
+    upstream_concurrency_limit,
+    upstream_queue_depth,
+)
+from app.utils.rate_limiter import PRIORITIES, PriorityRateLimiter
+from app.utils.serialization import loads
+from app.utils.single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# Statuses worth retrying: the server is busy or a proxy lost the upstream
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class MempoolAPIError(Exception):
+    """Raised when the mempool REST API answers with a non-200 status."""
+
+    def __init__(self, message: str, status: int = None):
+        super().__init__(message)
+        self.status = status
+
+
+def is_mempool_overload(error: BaseException) -> bool:
+    if isinstance(error, asyncio.TimeoutError):
+        return True
+    return isinstance(error, MempoolAPIError) and error.status in RETRY_STATUSES
+
+
+def _is_retryable(error: BaseException) -> bool:
+    if isinstance(error, MempoolAPIError):
+        return error.status in RETRY_STATUSES
+    return isinstance(error, (aiohttp.ClientError, asyncio.TimeoutError))
+
+
+class MempoolClient:
+    """
+    Pooled client for the mempool (esplora) REST API.
+
+    One keep-alive session is shared by every caller. Identical GETs that are
+    already in flight are coalesced, concurrency is bounded by an adaptive
+    limiter, and GETs that fail with a transient error are retried with
+    jittered exponential backoff. Responses with validators are kept in a
+    revalidation cache and re-requested conditionally. Every request takes a
+    token from a rate limiter that serves interactive callers before
+    background ones (see ``app.utils.rate_limiter.priority``).
+
+    Results may be shared between callers and must not be mutated.
+    """
+
+    def __init__(
+        self,
+        base_url: str = None,
+        max_connections: int = None,
+        timeout: float = None,
+        retries: int = None,
+        retry_backoff: float = None,
+    ):
+        self.base_url = (
+            base_url or f"http://{settings.UMBREL_HOST}:{settings.UMBREL_PORT}"
+        ).rstrip("/")
+        self.max_connections = max_connections or settings.MEMPOOL_MAX_CONNECTIONS
+        self.timeout = timeout or settings.MEMPOOL_TIMEOUT
+        self.retries = settings.MEMPOOL_RETRIES if retries is None else retries
+        self.retry_backoff = retry_backoff or settings.MEMPOOL_RETRY_BACKOFF
+        self.single_flight = SingleFlight(settings.SINGLE_FLIGHT_MAX_KEYS)
+        self.limiter = AdaptiveLimiter(
+            "mempool",
+            initial=settings.MEMPOOL_CONCURRENCY_INITIAL,
+            min_limit=settings.MEMPOOL_CONCURRENCY_MIN,
+            max_limit=settings.MEMPOOL_CONCURRENCY_MAX,
+            is_overload=is_mempool_overload,
+        )
+        self.rate_limiter = PriorityRateLimiter(
+            "mempool", settings.MEMPOOL_RATE_LIMIT, settings.MEMPOOL_RATE_BURST
+        )
+        self.cache = RevalidationCache(
+            settings.MEMPOOL_HTTP_CACHE_BYTES,
+            settings.MEMPOOL_HTTP_CACHE_MAX_ENTRY_BYTES,
+        )
+        self.retried = 0
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def start(self):
+        """Open the pooled HTTP session."""
+        if self._session is not None and not self._session.closed:
+            return
+
+        connector = aiohttp.TCPConnector(
+            limit=self.max_connections,
+            keepalive_timeout=settings.RPC_KEEPALIVE_TIMEOUT,
+        )
+        self._session = aiohttp.ClientSession(
+            connector=connector,
+            headers={"accept": "application/json"},
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+        )
+        logger.info(
+            f"Mempool client started ({self.base_url}, "
+            f"{self.max_connections} connections max)"
+        )
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            await self.start()
+        return self._session
+
+    async def get(self, path: str) -> Any:
+        """
+        GET ``path`` (e.g. ``api/tx/<txid>``) and return the decoded JSON.
+        Concurrent requests for the same path share one upstream request.
+        """
+        path = path.lstrip("/")
+        return await self.single_flight.do(path, lambda: self._get_with_retry(path))
+
+    async def _get_with_retry(self, path: str) -> Any:
+        attempt = 0
+        while True:
+            try:
+                return await self._get(path)
+            except Exception as e:
+                if attempt >= self.retries or not _is_retryable(e):
+                    raise
+                # Full jitter keeps retries from many callers from lining up
+                delay = random.uniform(0, self.retry_backoff * 2**attempt)
+                attempt += 1
+                self.retried += 1
+                logger.debug(
+                    f"Retrying mempool GET {path} in {delay:.2f}s "
+                    f"(attempt {attempt}/{self.retries}): {e!r}"
+                )
+                await asyncio.sleep(delay)
+
+    async def _get(self, path: str) -> Any:
+        session = await self._get_session()
+        await self.rate_limiter.acquire()
+        cached = self.cache.get(path)
+        async with self.limiter.slot(), track_upstream(
+            "mempool", template_path(path)
+        ) as call:
+            async with session.get(
+                f"{self.base_url}/{path}",
+                headers=self.cache.conditional_headers(cached),
+            ) as response:
+                if response.status == 304 and cached is not None:
+                    http_cache_requests.inc("mempool", "not_modified")
+                    call.response_bytes = 0
+                    return cached.data
+
+                body = await response.read()
+                call.response_bytes = len(body)
+                if response.status != 200:
+                    call.error = f"http_{response.status}"
+                    raise MempoolAPIError(
+                        f"Mempool REST API error: HTTP {response.status} "
+                        f"{body[:200].decode(errors='replace')}",
+                        status=response.status,
+                    )
+                data = loads(body)
+                http_cache_requests.inc(
+                    "mempool", "modified" if cached is not None else "miss"
+                )
+                self.cache.put(
+                    path,
+                    data,
+                    len(body),
+                    response.headers.get("ETag"),
+                    response.headers.get("Last-Modified"),
+                )
+                return data
+
+    async def get_transaction(self, txid: str) -> dict:
+        return await self.get(f"api/tx/{txid}")
+
+    async def get_outspends(self, txid: str) -> List[dict]:
+        """
+        Spending status of every output of ``txid``, in output order:
+        ``{"spent": bool, "txid": ..., "vin": ..., "status": {...}}``.
+        """
+        return await self.get(f"api/tx/{txid}/outspends")
+
+    async def get_address(self, address: str) -> dict:
+        return await self.get(f"api/address/{address}")
+
+    async def get_address_txs(
+        self, address: str, after_txid: Optional[str] = None
+    ) -> List[dict]:
+        """
+        One page of an address's history: mempool txs plus the newest 25
+        confirmed ones, or the 25 confirmed txs following ``after_txid``.
+        """
+        path = f"api/address/{address}/txs"
+        if after_txid:
+            path += f"?after_txid={after_txid}"
+        return await self.get(path)
+
+    async def get_prices(self) -> dict:
+        return await self.get("api/v1/prices")
+
+    async def get_historical_price(self, timestamp: int, currency: str = "EUR") -> dict:
+        return await self.get(
+            f"api/v1/historical-price?currency={currency}&timestamp={timestamp}"
+        )
+
+    def stats(self) -> dict:
+        return {
+            "concurrency": self.limiter.snapshot(),
+            "coalescing": self.single_flight.stats(),
+            "retried": self.retried,
+            "rate_limit": self.rate_limiter.snapshot(),
+            "http_cache": self.cache.stats(),
+        }
 
-async def mempool_api_call(method: str, params=None):
-    if params is None:
-        params = []
 
-    url = f"http://{settings.UMBREL_HOST}:{settings.UMBREL_PORT}/{method}"
-    headers = {"content-type": "application/json"}
+mempool_client = MempoolClient()
 
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url, headers=headers) as response:
-            if response.status != 200:
-                raise Exception(f"Mempool REST API error: {await response.text()}")
 
-            data = await response.json()
-            print(data)
-            return data
+@registry.on_collect
+def _collect_mempool_gauges():
+    upstream_concurrency_limit.set(
+        "mempool", "mempool", value=mempool_client.limiter.limit
+    )
+    upstream_queue_depth.set("mempool", "mempool", value=mempool_client.limiter.queued)
+    upstream_coalesced_calls.set(
+        "mempool", value=mempool_client.single_flight.coalesced
+    )
+    http_cache_bytes.set("mempool", value=mempool_client.cache.bytes)
+    for level in PRIORITIES:
+        rate_limit_queue_depth.set(
+            "mempool", level, value=mempool_client.rate_limiter.queued(level)
+        )
@@ -0,0 +1,303 @@
+"""
+Minimal in-process metrics rendered in the Prometheus text format.
+
+Metrics are per process; with several workers each one serves its own
+numbers on ``/metrics``.
+"""
+
+import re
+import time
+from bisect import bisect_left
+from contextlib import asynccontextmanager
+from typing import Callable, Dict, List, Tuple
+
+LabelValues = Tuple[str, ...]
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.values: Dict[LabelValues, float] = {}
+
+    def inc(self, *label_values, amount: float = 1):
+        self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        for values, value in self.values.items():
+            lines.append(f"{self.name}{_format_labels(self.labels, values)} {value}")
+        return lines
+
+
+class Gauge(Counter):
+    def set(self, *label_values, value: float):
+        self.values[label_values] = value
+
+    def dec(self, *label_values, amount: float = 1):
+        self.inc(*label_values, amount=-amount)
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        lines[1] = f"# TYPE {self.name} gauge"
+        return lines
+
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labels: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = LATENCY_BUCKETS,
+    ):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = buckets
+        # label values -> (per-bucket counts incl. +Inf, sum)
+        self.values: Dict[LabelValues, Tuple[List[int], float]] = {}
+
+    def observe(self, *label_values, value: float):
+        counts, total = self.values.get(label_values, ([0] * (len(self.buckets) + 1), 0.0))
+        counts[bisect_left(self.buckets, value)] += 1
+        self.values[label_values] = (counts, total + value)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for values, (counts, total) in self.values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                label_str = _format_labels(self.labels, values, 'le="' + le + '"')
+                lines.append(f"{self.name}_bucket{label_str} {cumulative}")
+            label_str = _format_labels(self.labels, values)
+            lines.append(f"{self.name}_sum{label_str} {total}")
+            lines.append(f"{self.name}_count{label_str} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics = []
+        self.callbacks: List[Callable[[], None]] = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def on_collect(self, callback: Callable[[], None]):
+        """Run ``callback`` before every render, e.g. to refresh gauges."""
+        self.callbacks.append(callback)
+
+    def render(self) -> str:
+        for callback in self.callbacks:
+            callback()
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+upstream_latency = registry.register(
+    Histogram(
+        "upstream_request_duration_seconds",
+        "Latency of calls to bitcoind and the mempool API.",
+        ("service", "operation", "outcome"),
+    )
+)
+upstream_response_bytes = registry.register(
+    Histogram(
+        "upstream_response_bytes",
+        "Size of upstream response bodies.",
+        ("service", "operation"),
+        buckets=SIZE_BUCKETS,
+    )
+)
+upstream_errors = registry.register(
+    Counter(
+        "upstream_errors_total",
+        "Failed upstream calls by error type.",
+        ("service", "operation", "error"),
+    )
+)
+upstream_in_flight = registry.register(
+    Gauge(
+        "upstream_in_flight",
+        "Upstream calls currently in flight.",
+        ("service", "operation"),
+    )
+)
+upstream_concurrency_limit = registry.register(
+    Gauge(
+        "upstream_concurrency_limit",
+        "Current adaptive concurrency limit.",
+        ("service", "backend"),
+    )
+)
+upstream_queue_depth = registry.register(
+    Gauge(
+        "upstream_queue_depth",
+        "Calls waiting for an upstream concurrency slot.",
+        ("service", "backend"),
+    )
+)
+upstream_coalesced_calls = registry.register(
+    Gauge(
+        "upstream_coalesced_calls",
+        "Calls served by joining an identical in-flight request.",
+        ("service",),
+    )
+)
+http_cache_requests = registry.register(
+    Counter(
+        "http_cache_requests_total",
+        "Cacheable upstream GETs by result: miss (no cached copy), "
+        "not_modified (304, served from cache) or modified (revalidated, new body).",
+        ("service", "result"),
+    )
+)
+http_cache_bytes = registry.register(
+    Gauge(
+        "http_cache_bytes",
+        "Response bytes held by the revalidation cache.",
+        ("service",),
+    )
+)
+l1_cache_requests = registry.register(
+    Counter(
+        "l1_cache_requests_total",
+        "Lookups of L1-cached Redis keys by namespace and result (hit or miss).",
+        ("namespace", "result"),
+    )
+)
+l1_cache_evictions = registry.register(
+    Counter(
+        "l1_cache_evictions_total",
+        "L1 cache entries dropped to stay within the byte budget.",
+    )
+)
+l1_cache_invalidations = registry.register(
+    Counter(
+        "l1_cache_invalidations_total",
+        "L1 cache invalidations by origin (local write or pub/sub message).",
+        ("origin",),
+    )
+)
+l1_cache_bytes = registry.register(
+    Gauge("l1_cache_bytes", "Bytes held by the in-process L1 cache.")
+)
+cache_refresh_requests = registry.register(
+    Counter(
+        "cache_refresh_requests_total",
+        "Stampede-protected cache reads by namespace and result (hit, stale, "
+        "computed or waited).",
+        ("namespace", "result"),
+    )
+)
+rate_limit_wait = registry.register(
+    Histogram(
+        "rate_limit_wait_seconds",
+        "Time spent waiting for a rate limiter token, by caller priority.",
+        ("limiter", "priority"),
+    )
+)
+rate_limit_queue_depth = registry.register(
+    Gauge(
+        "rate_limit_queue_depth",
+        "Callers waiting for a rate limiter token, by priority.",
+        ("limiter", "priority"),
+    )
+)
+
+
+class UpstreamCall:
+    """Mutable record filled in by the code being measured."""
+
+    def __init__(self):
+        self.response_bytes = None
+        self.error = None
+
+
+@asynccontextmanager
+async def track_upstream(service: str, operation: str):
+    """
+    Measure one upstream call. Exceptions are counted as errors; the caller
+    may also set ``call.error`` for failures reported without raising, and
+    ``call.response_bytes`` for the body size.
+    """
+    call = UpstreamCall()
+    upstream_in_flight.inc(service, operation)
+    started = time.monotonic()
+    try:
+        yield call
+    except Exception as e:
+        call.error = type(e).__name__
+        raise
+    finally:
+        upstream_in_flight.dec(service, operation)
+        outcome = "error" if call.error else "ok"
+        upstream_latency.observe(
+            service, operation, outcome, value=time.monotonic() - started
+        )
+        if call.error:
+            upstream_errors.inc(service, operation, call.error)
+        if call.response_bytes is not None:
+            upstream_response_bytes.observe(
+                service, operation, value=call.response_bytes
+            )
+
+
+_HEX64 = re.compile(r"^[0-9a-fA-F]{64}$")
+_NUMBER = re.compile(r"^\d+$")
+_PARAMETER_AFTER = {
+    "address": "{address}",
+    "scripthash": "{scripthash}",
+    "tx": "{txid}",
+    "block": "{hash}",
+    "block-height": "{height}",
+    "blocks": "{height}",
+}
+
+
+def template_path(path: str) -> str:
+    """
+    Collapse ids in a REST path so metrics labels stay low-cardinality,
+    e.g. ``api/tx/<txid>/outspends?x=1`` -> ``api/tx/{txid}/outspends``.
+    """
+    segments = path.split("?", 1)[0].strip("/").split("/")
+    templated = []
+    for index, segment in enumerate(segments):
+        previous = segments[index - 1] if index else ""
+        # Keep extensions such as the ".bin" of bitcoind REST paths
+        name, dot, extension = segment.partition(".")
+        if previous in _PARAMETER_AFTER and (
+            previous in ("address", "scripthash")
+            or _HEX64.match(name)
+            or _NUMBER.match(name)
+        ):
+            name = _PARAMETER_AFTER[previous]
+        elif _HEX64.match(name):
+            name = "{hash}"
+        elif _NUMBER.match(name):
+            name = "{n}"
+        templated.append(name + dot + extension)
+    return "/".join(templated)
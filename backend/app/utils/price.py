@@ -1,14 +1,16 @@
-from app.utils.mempool_api import mempool_api_call
+import logging
+
+from app.utils.mempool_api import mempool_client
+
+logger = logging.getLogger(__name__)
 
 
 async def get_price_based_on_timestamp(timestamp: int):
     try:
-        price = await mempool_api_call(
-            f"api/v1/historical-price?currency=EUR&timestamp={timestamp}"
-        )
+        price = await mempool_client.get_historical_price(timestamp)
 
     except Exception as e:
-        print(e)
+        logger.warning(f"Historical price lookup for {timestamp} failed: {e}")
         price = None
 
     return price
@@ -0,0 +1,111 @@
+import asyncio
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Deque, Dict, Optional
+
+from app.utils.metrics import rate_limit_wait
+
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+# Highest priority first
+PRIORITIES = (INTERACTIVE, BACKGROUND)
+
+# Priority of upstream calls made by the current task. Router calls keep the
+# default; background cache refreshes, address walks past their first page
+# and Celery tasks switch to BACKGROUND. Tasks inherit it when created.
+request_priority: ContextVar[str] = ContextVar("request_priority", default=INTERACTIVE)
+
+
+@contextmanager
+def priority(level: str):
+    """Run the enclosed upstream calls at ``level`` priority."""
+    token = request_priority.set(level)
+    try:
+        yield
+    finally:
+        request_priority.reset(token)
+
+
+class PriorityRateLimiter:
+    """
+    Token bucket shared by callers of different priority.
+
+    Tokens refill at ``rate`` per second up to ``burst``. When callers have to
+    wait, tokens are handed out strictly by priority, so interactive requests
+    overtake any queued background work. A ``rate`` of 0 disables limiting.
+
+    The bucket lives in the process: with several API workers, the upstream
+    sees up to ``rate`` times the number of workers.
+    """
+
+    def __init__(self, name: str, rate: float, burst: int):
+        self.name = name
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._waiters: Dict[str, Deque[asyncio.Future]] = {
+            level: deque() for level in PRIORITIES
+        }
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    def queued(self, level: str) -> int:
+        return len(self._waiters[level])
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _dispatch(self):
+        self._timer = None
+        self._refill()
+        for level in PRIORITIES:
+            waiters = self._waiters[level]
+            while waiters and self.tokens >= 1:
+                waiter = waiters.popleft()
+                if not waiter.done():
+                    self.tokens -= 1
+                    waiter.set_result(None)
+
+        if any(self._waiters.values()):
+            delay = max(0.0, (1 - self.tokens) / self.rate)
+            self._timer = asyncio.get_running_loop().call_later(delay, self._dispatch)
+
+    async def acquire(self, level: str = None):
+        if self.rate <= 0:
+            return
+        level = level or request_priority.get()
+        started = time.monotonic()
+
+        self._refill()
+        if self.tokens >= 1 and not any(self._waiters.values()):
+            self.tokens -= 1
+            rate_limit_wait.observe(self.name, level, value=0.0)
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters[level].append(waiter)
+        if self._timer is None:
+            self._dispatch()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Granted just as we got cancelled; return the token
+                self.tokens += 1
+            elif waiter in self._waiters[level]:
+                # _dispatch() may already have popped (and skipped) it
+                self._waiters[level].remove(waiter)
+            raise
+        rate_limit_wait.observe(self.name, level, value=time.monotonic() - started)
+
+    def snapshot(self) -> dict:
+        return {
+            "rate": self.rate,
+            "burst": self.burst,
+            "tokens": round(self.tokens, 2),
+            "queued": {level: self.queued(level) for level in PRIORITIES},
+        }
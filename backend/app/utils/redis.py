@@ -1,6 +1,10 @@
+from typing import Optional
+
 import redis
+import redis.asyncio as aioredis
 from app.config.config import settings
 
+# Synchronous client, used by the Celery task code only
 try:
     # Initialize Redis Connection using URL
     r = redis.from_url(settings.REDIS_URL)
@@ -28,4 +32,39 @@ def get_redis():
         except Exception as e:
             print(f"Redis still unavailable: {e}")
             raise ConnectionError(f"Redis connection failed: {e}")
-    return r
\ No newline at end of file
+    return r
+
+
+# Asyncio client for the API, backed by one connection pool per process. The
+# pool is opened in the app lifespan; connections are made on demand, so a
+# Redis outage surfaces per request instead of preventing startup.
+_async_redis: Optional[aioredis.Redis] = None
+
+
+def get_async_redis() -> aioredis.Redis:
+    global _async_redis
+    if _async_redis is None:
+        pool = aioredis.BlockingConnectionPool.from_url(
+            settings.REDIS_URL,
+            max_connections=settings.REDIS_MAX_CONNECTIONS,
+            timeout=settings.REDIS_POOL_TIMEOUT,
+        )
+        _async_redis = aioredis.Redis(connection_pool=pool)
+    return _async_redis
+
+
+async def start_async_redis():
+    client = get_async_redis()
+    try:
+        await client.ping()
+        print("Connected to Redis (async pool) successfully!")
+    except Exception as e:
+        print(f"Redis connection failed: {e}")
+
+
+async def close_async_redis():
+    global _async_redis
+    if _async_redis is not None:
+        await _async_redis.aclose()
+        await _async_redis.connection_pool.disconnect()
+        _async_redis = None
@@ -1,52 +1,351 @@
-from app.utils.redis import get_redis
-import json
+import asyncio
+import logging
+import math
+import random
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+from redis.exceptions import LockError
+
+from app.config.config import settings
+from app.utils.cache_policy import (
+    TIP,
+    TIP_EXPIRED,
+    TIP_KEYS,
+    VOLATILE,
+    cache_policy,
+    namespace_of,
+)
+from app.utils.l1_cache import L1Cache, l1_cache
+from app.utils.metrics import cache_refresh_requests
+from app.utils.rate_limiter import BACKGROUND, priority
+from app.utils.redis import get_async_redis, get_redis
+from app.utils.serialization import JSONDecodeError, dumps, loads
+from app.utils.single_flight import SingleFlight
+from app.utils.value_codec import value_codec
+
+logger = logging.getLogger(__name__)
+
+# How often a request waiting on another worker's recompute checks for it
+_LOCK_POLL_INTERVAL = 0.05
+
+# Long enough for every worker's header index to have seen a block
+_TIP_CLAIM_TTL = 600
+
+# Per-process coalescing of recomputes and the background refreshes in flight
+_compute_flight = SingleFlight(settings.SINGLE_FLIGHT_MAX_KEYS)
+_refreshing: Dict[str, asyncio.Task] = {}
+
+
+def _meta_key(key: str) -> str:
+    return f"{key}:xfetch"
+
+
+def _lock_key(key: str) -> str:
+    return f"lock:{key}"
+
+
+def _refresh_due(meta: Optional[bytes], beta: float) -> bool:
+    """
+    XFetch: whether to recompute a value now. The probability rises towards
+    its expiry, and earlier for values that were slow to compute, so one
+    request usually refreshes it before it expires. ``meta`` is
+    ``[compute seconds, expiry timestamp]``; without it the value is stale.
+    """
+    if not meta:
+        return True
+    delta, expires_at = loads(meta)
+    if expires_at is None:
+        return False
+    return time.time() - delta * beta * math.log(1.0 - random.random()) >= expires_at
+
+
+def _decode(value):
+    if value:
+        try:
+            return loads(value)
+        except JSONDecodeError:
+            return value.decode()
+    return None
 
 
 class RedisService:
-    def __init__(self, redis_client):
+    """
+    Cache access for the API, on the shared asyncio connection pool, with an
+    optional in-process L1 tier (see ``app.utils.l1_cache``). Large values are
+    stored compressed (see ``app.utils.value_codec``); L1 holds them decoded.
+    """
+
+    def __init__(self, redis_client, l1: Optional[L1Cache] = None):
         self.redis = redis_client
+        self.l1 = l1
 
-    def get(self, key):
-        value = self.redis.get(key)
-        if value:
+    async def get(self, key):
+        return _decode(await self.get_raw(key))
+
+    async def get_raw(self, key):
+        """JSON bytes of ``key`` without parsing them, e.g. to return as is."""
+        if self.l1 is None:
+            return value_codec.decode(await self.redis.get(key))
+        found, value = self.l1.get(key)
+        if found:
+            return value
+        generation = self.l1.generation
+        value = value_codec.decode(await self.redis.get(key))
+        self.l1.put(key, value, generation)
+        return value
+
+    async def get_many(self, keys):
+        """Values of ``keys`` in one MGET, ``None`` for missing keys."""
+        return [_decode(value) for value in await self.get_raw_many(keys)]
+
+    async def get_raw_many(self, keys):
+        if not keys:
+            return []
+        if self.l1 is None:
+            values = await self.redis.mget(keys)
+            return [value_codec.decode(value) for value in values]
+
+        values = {}
+        for key in keys:
+            found, value = self.l1.get(key)
+            if found:
+                values[key] = value
+        missing = [key for key in keys if key not in values]
+        if missing:
+            generation = self.l1.generation
+            for key, value in zip(missing, await self.redis.mget(missing)):
+                values[key] = value = value_codec.decode(value)
+                self.l1.put(key, value, generation)
+        return [values[key] for key in keys]
+
+    async def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[bytes]],
+        state: str = VOLATILE,
+    ) -> bytes:
+        """
+        JSON bytes of ``key``, computed by ``compute()`` when missing, for
+        hot keys whose expiry would otherwise send every concurrent request
+        to the node at once.
+
+        Only the holder of a short Redis lock recomputes; requests on other
+        workers wait for its result and requests in this one share it. Values
+        are kept ``CACHE_STALE_TTL`` past their policy expiry and refreshed in
+        the background ahead of it (XFetch), or once expired, while the stale
+        value keeps being served.
+        """
+        namespace = namespace_of(key)
+        value, meta = await self.get_raw_many([key, _meta_key(key)])
+        if value is not None:
+            if not _refresh_due(meta, settings.CACHE_XFETCH_BETA):
+                cache_refresh_requests.inc(namespace, "hit")
+                return value
+            cache_refresh_requests.inc(namespace, "stale")
+            self._refresh_in_background(key, compute, state)
+            return value
+        return await _compute_flight.do(
+            key, lambda: self._compute_locked(key, compute, state)
+        )
+
+    async def _compute_locked(self, key, compute, state):
+        namespace = namespace_of(key)
+        lock = self.redis.lock(
+            _lock_key(key), timeout=settings.CACHE_LOCK_TIMEOUT, blocking=False
+        )
+        if await lock.acquire():
             try:
-                return json.loads(value.decode())
-            except json.JSONDecodeError:
-                return value.decode()
-        return None
-
-    def set(self, key, value, expiry=None):
-        if expiry is not None:
-            self.redis.setex(key, expiry, value)
+                cache_refresh_requests.inc(namespace, "computed")
+                return await self._compute(key, compute, state)
+            finally:
+                await self._release(lock)
+
+        # Another worker is computing it; read Redis directly, since L1 may
+        # hold the miss until the invalidation arrives
+        deadline = time.monotonic() + settings.CACHE_LOCK_TIMEOUT
+        while time.monotonic() < deadline:
+            await asyncio.sleep(_LOCK_POLL_INTERVAL)
+            value = value_codec.decode(await self.redis.get(key))
+            if value is not None:
+                cache_refresh_requests.inc(namespace, "waited")
+                return value
+        logger.warning(f"Timed out waiting for {key} to be computed elsewhere")
+        cache_refresh_requests.inc(namespace, "computed")
+        return await self._compute(key, compute, state)
+
+    def _refresh_in_background(self, key, compute, state):
+        if key in _refreshing:
+            return
+        # Someone is already being served the stale value
+        with priority(BACKGROUND):
+            task = asyncio.create_task(self._refresh(key, compute, state))
+        _refreshing[key] = task
+        task.add_done_callback(lambda _: _refreshing.pop(key, None))
+
+    async def _refresh(self, key, compute, state):
+        lock = self.redis.lock(
+            _lock_key(key), timeout=settings.CACHE_LOCK_TIMEOUT, blocking=False
+        )
+        acquired = False
+        try:
+            acquired = await lock.acquire()
+            if acquired:
+                await self._compute(key, compute, state)
+        except Exception as e:
+            logger.warning(f"Background refresh of {key} failed: {e}")
+        finally:
+            if acquired:
+                await self._release(lock)
+
+    @staticmethod
+    async def _release(lock):
+        try:
+            await lock.release()
+        except LockError:
+            # Held past its timeout; someone else may own it by now
+            pass
+
+    async def _compute(self, key, compute, state):
+        started = time.monotonic()
+        value = await compute()
+        delta = time.monotonic() - started
+
+        ttl = cache_policy.expiry(key, state)
+        meta_key = _meta_key(key)
+        if ttl is None:
+            meta, keep = dumps([delta, None]), None
         else:
-            self.redis.set(key, value)
+            meta, keep = dumps([delta, time.time() + ttl]), ttl + settings.CACHE_STALE_TTL
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.set(key, value_codec.encode(value), ex=keep)
+            pipe.set(meta_key, meta, ex=keep)
+            if state == TIP:
+                # A new block only drops the metadata: the value turns stale
+                # and is served while one request refreshes it
+                pipe.sadd(TIP_KEYS, meta_key)
+                pipe.expire(TIP_KEYS, settings.CACHE_TTL_TIP)
+            await self._write(pipe, [key, meta_key])
+        return value
 
-    def delete(self, key):
-        self.redis.delete(key)
+    async def _write(self, pipe, keys):
+        """
+        Execute ``pipe`` plus, when L1 is in use, the invalidation of
+        ``keys`` (``None``: all) for the other workers, in one round trip.
+        """
+        message = (
+            self.l1.invalidation_message(keys) if self.l1 is not None else None
+        )
+        if message is not None:
+            pipe.publish(self.l1.channel, message)
+        await pipe.execute()
+        # After the write, so a concurrent read cannot re-cache the old value
+        if message is not None:
+            self.l1.invalidate(keys)
+
+    async def set(self, key, value, state=VOLATILE, expiry=None):
+        """
+        Store ``value`` under ``key``, expiring as ``cache_policy`` decides
+        for a value in ``state``. ``expiry`` is only for values with an
+        external lifetime, such as access tokens.
+        """
+        await self.set_many({key: value}, state=state, expiry=expiry)
 
-    def lpush_trim(self, key, value, limit=10):
-        self.redis.lpush(key, value)
-        self.redis.ltrim(key, 0, limit - 1)
+    async def set_many(self, mapping, state=VOLATILE, expiry=None):
+        """Set every ``key: value`` of ``mapping`` in one pipeline round trip."""
+        if not mapping:
+            return
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for key, value in mapping.items():
+                ttl = cache_policy.expiry(key, state, expiry)
+                if ttl is not None:
+                    pipe.setex(key, ttl, value_codec.encode(value))
+                else:
+                    pipe.set(key, value_codec.encode(value))
+            if state == TIP:
+                pipe.sadd(TIP_KEYS, *mapping)
+                pipe.expire(TIP_KEYS, settings.CACHE_TTL_TIP)
+            await self._write(pipe, list(mapping))
 
-    def lrange(self, key, start, end):
-        return self.redis.lrange(key, start, end)
+    async def delete(self, key):
+        await self.delete_many([key])
 
-    def get_recent_list(self, key, limit=10):
-        items = self.redis.lrange(key, 0, limit - 1)
+    async def delete_many(self, keys):
+        if not keys:
+            return
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.delete(*keys)
+            await self._write(pipe, list(keys))
+
+    async def expire_tip_keys(self, block_hash: str):
+        """
+        Delete every tip-dependent value (for ``get_or_compute`` keys, only
+        their freshness metadata) once ``block_hash`` is the new tip. Every
+        worker reports the block; only the first to claim it deletes, so a
+        late one cannot drop values already recomputed for the new tip.
+        """
+        claimed = await self.redis.set(
+            f"{TIP_EXPIRED}:{block_hash}", 1, nx=True, ex=_TIP_CLAIM_TTL
+        )
+        if not claimed:
+            return
+        # Take the set and reset it at once, so keys tracked meanwhile stay
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.smembers(TIP_KEYS)
+            pipe.delete(TIP_KEYS)
+            members, _ = await pipe.execute()
+        await self.delete_many([key.decode() for key in members])
+
+    async def lpush_trim(self, key, value, limit=10):
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.lpush(key, value)
+            pipe.ltrim(key, 0, limit - 1)
+            await pipe.execute()
+
+    async def lrange(self, key, start, end):
+        return await self.redis.lrange(key, start, end)
+
+    async def get_recent_list(self, key, limit=10):
+        items = await self.redis.lrange(key, 0, limit - 1)
         result = []
         for item in items:
             try:
-                parsed = json.loads(item.decode())
+                parsed = loads(item)
                 if isinstance(parsed, dict):
                     result.append(parsed)
-            except json.JSONDecodeError:
+            except JSONDecodeError:
                 continue
         return result
 
-    def empty_redis(self):
-        self.redis.flushdb()
+    async def empty_redis(self):
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.flushdb()
+            await self._write(pipe, None)
+
+
+class SyncRedisService:
+    """Blocking cache access for the Celery task code."""
+
+    def __init__(self, redis_client):
+        self.redis = redis_client
+
+    def get(self, key):
+        return _decode(value_codec.decode(self.redis.get(key)))
+
+    def set(self, key, value, state=VOLATILE, expiry=None):
+        ttl = cache_policy.expiry(key, state, expiry)
+        if ttl is not None:
+            self.redis.setex(key, ttl, value_codec.encode(value))
+        else:
+            self.redis.set(key, value_codec.encode(value))
+
+    def delete(self, key):
+        self.redis.delete(key)
 
 
 def get_redis_service():
-    redis = get_redis()
-    return RedisService(redis)
+    return RedisService(get_async_redis(), l1_cache)
+
+
+def get_sync_redis_service():
+    return SyncRedisService(get_redis())
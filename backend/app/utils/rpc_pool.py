@@ -0,0 +1,176 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, List, Optional
+from urllib.parse import urlsplit, urlunsplit
+
+import aiohttp
+
+from app.utils.adaptive_limiter import AdaptiveLimiter
+
+logger = logging.getLogger(__name__)
+
+
+class RPCBackend:
+    """One bitcoind node together with its live routing statistics."""
+
+    def __init__(
+        self,
+        url: str,
+        auth: aiohttp.BasicAuth,
+        base_url: Optional[str] = None,
+        limiter: Optional[AdaptiveLimiter] = None,
+        ewma_alpha: float = 0.3,
+    ):
+        self.url = url
+        # Node root without the wallet path, used for REST endpoints
+        self.base_url = base_url or url
+        self.auth = auth
+        self.limiter = limiter
+        self.ewma_alpha = ewma_alpha
+        self.outstanding = 0
+        self.ewma_latency: Optional[float] = None
+        self.healthy = True
+        self.blocks: Optional[int] = None
+        self.last_error: Optional[str] = None
+
+    @classmethod
+    def from_url(
+        cls,
+        url: str,
+        user: str,
+        password: str,
+        wallet_path: str = "",
+        limiter: Optional[AdaptiveLimiter] = None,
+    ) -> "RPCBackend":
+        """
+        Build a backend from ``host:port`` or a full URL. Credentials embedded
+        in the URL take precedence over the shared ``user``/``password``.
+        """
+        if "://" not in url:
+            url = f"http://{url}"
+        parts = urlsplit(url)
+        auth = aiohttp.BasicAuth(parts.username or user, parts.password or password)
+        netloc = parts.hostname + (f":{parts.port}" if parts.port else "")
+        base_path = parts.path.rstrip("/")
+        return cls(
+            urlunsplit((parts.scheme, netloc, base_path + wallet_path, "", "")),
+            auth,
+            base_url=urlunsplit((parts.scheme, netloc, base_path, "", "")),
+            limiter=limiter,
+        )
+
+    @property
+    def name(self) -> str:
+        return urlsplit(self.url).netloc
+
+    def record_latency(self, latency: float):
+        if self.ewma_latency is None:
+            self.ewma_latency = latency
+        else:
+            self.ewma_latency += self.ewma_alpha * (latency - self.ewma_latency)
+
+    def mark_down(self, error: str):
+        if self.healthy:
+            logger.warning(f"Ejecting Bitcoin RPC backend {self.name}: {error}")
+        self.healthy = False
+        self.last_error = error
+
+    def score(self) -> float:
+        # Expected wait if we queue behind everything already outstanding here
+        return (self.ewma_latency or 0.0) * (self.outstanding + 1)
+
+    def snapshot(self) -> dict:
+        return {
+            "url": self.name,
+            "healthy": self.healthy,
+            "blocks": self.blocks,
+            "outstanding": self.outstanding,
+            "ewma_latency_ms": (
+                round(self.ewma_latency * 1000, 2)
+                if self.ewma_latency is not None
+                else None
+            ),
+            "last_error": self.last_error,
+            "concurrency": self.limiter.snapshot() if self.limiter else None,
+        }
+
+
+class RPCBackendPool:
+    """
+    Routes calls across several bitcoind nodes.
+
+    Healthy backends are picked by the lowest ``ewma`` score (EWMA latency
+    weighted by outstanding requests) or by ``least_outstanding`` requests.
+    A periodic ``getblockchaininfo`` probe ejects nodes that are unreachable or
+    more than ``max_block_lag`` blocks behind the best tip seen, and brings
+    them back once they recover.
+    """
+
+    def __init__(
+        self,
+        backends: List[RPCBackend],
+        routing: str = "ewma",
+        max_block_lag: int = 2,
+    ):
+        if not backends:
+            raise ValueError("At least one Bitcoin RPC backend is required")
+        if routing not in ("ewma", "least_outstanding"):
+            raise ValueError(f"Unknown Bitcoin RPC routing strategy: {routing}")
+        self.backends = backends
+        self.routing = routing
+        self.max_block_lag = max_block_lag
+
+    def choose(self, exclude: Optional[RPCBackend] = None) -> RPCBackend:
+        candidates = [b for b in self.backends if b.healthy and b is not exclude]
+        if not candidates:
+            # Everything looks down; keep trying rather than failing outright
+            candidates = [b for b in self.backends if b is not exclude] or self.backends
+
+        if self.routing == "least_outstanding":
+            return min(candidates, key=lambda b: (b.outstanding, b.ewma_latency or 0.0))
+        return min(candidates, key=lambda b: (b.score(), b.outstanding))
+
+    async def check_health(
+        self, probe: Callable[[RPCBackend], Awaitable[dict]]
+    ) -> None:
+        """Probe every backend once and update which ones may receive traffic."""
+
+        async def probe_one(backend: RPCBackend):
+            started = time.monotonic()
+            try:
+                info = await probe(backend)
+            except Exception as e:
+                backend.mark_down(str(e) or type(e).__name__)
+                return
+            backend.record_latency(time.monotonic() - started)
+            backend.blocks = info.get("blocks")
+            backend.last_error = None
+
+        await asyncio.gather(*(probe_one(b) for b in self.backends))
+
+        reachable = [b for b in self.backends if b.last_error is None]
+        if not reachable:
+            return
+        best_tip = max(b.blocks or 0 for b in reachable)
+        for backend in reachable:
+            if (backend.blocks or 0) < best_tip - self.max_block_lag:
+                backend.mark_down(
+                    f"behind tip ({backend.blocks} < {best_tip - self.max_block_lag})"
+                )
+            elif not backend.healthy:
+                logger.info(f"Bitcoin RPC backend {backend.name} is healthy again")
+                backend.healthy = True
+
+    async def run_health_checks(
+        self, probe: Callable[[RPCBackend], Awaitable[dict]], interval: float
+    ) -> None:
+        while True:
+            try:
+                await self.check_health(probe)
+            except Exception as e:
+                logger.error(f"Bitcoin RPC health check failed: {e}")
+            await asyncio.sleep(interval)
+
+    def snapshot(self) -> List[dict]:
+        return [backend.snapshot() for backend in self.backends]
@@ -0,0 +1,41 @@
+"""
+JSON encoding shared by the upstream clients, the Redis cache, the immutable
+store and API responses.
+
+Everything goes through orjson, which works on bytes: upstream bodies are
+decoded straight from the socket buffer, cache values are stored as the
+encoded bytes, and a cached payload can be returned with ``RawJSONResponse``
+without being decoded and re-encoded on the way out.
+"""
+
+from typing import Any, Union
+
+import orjson
+from fastapi.responses import JSONResponse, Response
+
+# Subclass of json.JSONDecodeError, so existing handlers keep working
+JSONDecodeError = orjson.JSONDecodeError
+
+_DUMPS_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+
+def loads(data: Union[bytes, bytearray, memoryview, str]) -> Any:
+    return orjson.loads(data)
+
+
+def dumps(value: Any) -> bytes:
+    """Compact JSON as bytes. Non-string dict keys are stringified like stdlib json."""
+    return orjson.dumps(value, option=_DUMPS_OPTIONS)
+
+
+class FastJSONResponse(JSONResponse):
+    """Default response class of the API, rendering with orjson."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class RawJSONResponse(Response):
+    """Response whose body is already-encoded JSON, sent as is."""
+
+    media_type = "application/json"
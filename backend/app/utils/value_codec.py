@@ -0,0 +1,94 @@
+"""
+Storage format of Redis cache values.
+
+Callers hand ``RedisService`` encoded JSON (see ``app.utils.serialization``)
+and get JSON back. Small values, the hot keys among them, are stored exactly
+as given. Values of ``CACHE_COMPRESS_THRESHOLD`` bytes or more (address
+summaries carrying every transaction reach tens of MB) are stored behind a
+two-byte header, ``MAGIC`` plus a format byte:
+
+* ``ZSTD_JSON``: the JSON compressed with zstd
+* ``ZSTD_MSGPACK``: the payload re-encoded as msgpack, then compressed
+
+Values without the header are read as they are, so entries written before
+the codec existed, and plain strings such as token ids, keep working.
+
+``CACHE_VALUE_FORMAT`` picks the format of new entries. msgpack is the more
+compact of the two, but a hit then has to be re-encoded as JSON before it can
+be sent, while compressed JSON only needs decompressing; see
+``benchmarks/cache_codec.py``.
+"""
+
+import logging
+from typing import Any
+
+import msgpack
+import zstandard
+
+from app.config.config import settings
+from app.utils.serialization import JSONDecodeError, dumps, loads
+
+logger = logging.getLogger(__name__)
+
+# Neither valid JSON nor valid UTF-8, so no legacy value starts with it
+MAGIC = b"\xff"
+ZSTD_JSON = b"j"
+ZSTD_MSGPACK = b"m"
+
+FORMATS = {"json": ZSTD_JSON, "msgpack": ZSTD_MSGPACK}
+
+
+class ValueCodec:
+    def __init__(self, value_format: str, compress_threshold: int, level: int = 3):
+        if value_format not in FORMATS:
+            raise ValueError(
+                f"Unknown cache value format {value_format!r}, "
+                f"expected one of {', '.join(FORMATS)}"
+            )
+        self.format = FORMATS[value_format]
+        # 0 disables the codec: everything is stored as given
+        self.compress_threshold = compress_threshold
+        self.level = level
+
+    def encode(self, value: Any) -> Any:
+        """Value to store for ``value`` (JSON bytes or text)."""
+        if isinstance(value, str):
+            value = value.encode()
+        if (
+            not isinstance(value, bytes)
+            or not self.compress_threshold
+            or len(value) < self.compress_threshold
+        ):
+            return value
+
+        value_format = self.format
+        if value_format == ZSTD_MSGPACK:
+            try:
+                value = msgpack.packb(loads(value))
+            except (JSONDecodeError, OverflowError, TypeError, ValueError):
+                # Not JSON (or not representable in msgpack): keep the bytes
+                value_format = ZSTD_JSON
+        # Compressor objects are not thread-safe, so one per call
+        compressed = zstandard.ZstdCompressor(level=self.level).compress(value)
+        return MAGIC + value_format + compressed
+
+    def decode(self, stored: Any) -> Any:
+        """JSON bytes (or text) of a stored value; ``None`` stays ``None``."""
+        if not stored or stored[:1] != MAGIC:
+            return stored
+        value_format = stored[1:2]
+        if value_format not in (ZSTD_JSON, ZSTD_MSGPACK):
+            # Written by a newer version; treat as a miss
+            logger.warning(f"Unknown cache value format {value_format!r}")
+            return None
+        data = zstandard.ZstdDecompressor().decompress(stored[2:])
+        if value_format == ZSTD_MSGPACK:
+            return dumps(msgpack.unpackb(data, strict_map_key=False))
+        return data
+
+
+value_codec = ValueCodec(
+    settings.CACHE_VALUE_FORMAT,
+    settings.CACHE_COMPRESS_THRESHOLD,
+    settings.CACHE_COMPRESS_LEVEL,
+)
@@ -0,0 +1,218 @@
+"""
+Time to fetch the full history of a large address through the mempool API.
+
+A local stand-in esplora server serves a synthetic address with ``--txs``
+confirmed transactions (25 per ``after_txid`` page) and adds ``--latency-ms``
+to every response. Each mode runs in a fresh subprocess:
+
+* ``serial``: the previous behaviour, one page after another, totals computed
+  once everything has arrived
+* ``pipelined``: ``AddressHistoryWalk`` without anchors, totals computed while
+  the next page is in flight
+* ``parallel``: ``AddressHistoryWalk`` reusing the page anchors recorded by a
+  previous (untimed) walk, checked against ``chain_stats.tx_count``
+
+    cd backend && python -m benchmarks.address_summary_pagination --txs 10000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+from aiohttp import web
+
+HOST = "127.0.0.1"
+PORT = 18554
+ADDRESS = "bc1qbenchmarkaddress0000000000000000000000"
+PAGE_SIZE = 25
+
+
+def synthetic_history(tx_count: int):
+    def tx(i):
+        incoming = i % 2 == 0
+        return {
+            "txid": f"{i:064x}",
+            "version": 2,
+            "locktime": 0,
+            "vin": [
+                {
+                    "txid": f"{i + 10**6 + j:064x}",
+                    "vout": j,
+                    "prevout": {
+                        "scriptpubkey": "0014" + "ab" * 20,
+                        "scriptpubkey_type": "v0_p2wpkh",
+                        "scriptpubkey_address": "bc1qother" if incoming else ADDRESS,
+                        "value": 50_000,
+                    },
+                    "witness": ["30" * 71, "02" * 33],
+                    "sequence": 4294967293,
+                }
+                for j in range(2)
+            ],
+            "vout": [
+                {
+                    "scriptpubkey": "0014" + "cd" * 20,
+                    "scriptpubkey_type": "v0_p2wpkh",
+                    "scriptpubkey_address": ADDRESS if incoming and j == 0 else "bc1qother",
+                    "value": 40_000,
+                }
+                for j in range(2)
+            ],
+            "size": 370,
+            "weight": 832,
+            "fee": 20_000,
+            "status": {
+                "confirmed": True,
+                "block_height": 800_000 - i // 3,
+                "block_hash": "00" * 32,
+                "block_time": 1_700_000_000 - i * 200,
+            },
+        }
+
+    # Newest first, as esplora returns them
+    return [tx(i) for i in range(tx_count)]
+
+
+async def serve(tx_count: int, latency: float):
+    txs = synthetic_history(tx_count)
+    position = {tx["txid"]: i for i, tx in enumerate(txs)}
+    address_info = json.dumps(
+        {
+            "address": ADDRESS,
+            "chain_stats": {"tx_count": tx_count},
+            "mempool_stats": {"tx_count": 0},
+        }
+    ).encode()
+    requests = {"count": 0}
+
+    async def address_txs(request):
+        requests["count"] += 1
+        after = request.query.get("after_txid")
+        start = position[after] + 1 if after else 0
+        await asyncio.sleep(latency)
+        return web.Response(
+            body=json.dumps(txs[start : start + PAGE_SIZE]).encode(),
+            content_type="application/json",
+        )
+
+    async def address(request):
+        requests["count"] += 1
+        await asyncio.sleep(latency)
+        return web.Response(body=address_info, content_type="application/json")
+
+    app = web.Application()
+    app.router.add_get("/api/address/{address}/txs", address_txs)
+    app.router.add_get("/api/address/{address}", address)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, HOST, PORT).start()
+    return runner, requests
+
+
+def totals(txs):
+    from app.utils.address_history import address_flow
+
+    received = sent = 0
+    for tx in txs:
+        r, s = address_flow(tx, ADDRESS)
+        received += r
+        sent += s
+    return received, sent
+
+
+async def run_serial():
+    from app.utils.mempool_api import mempool_client
+
+    txs = []
+    page = await mempool_client.get_address_txs(ADDRESS)
+    while page:
+        txs.extend(page)
+        page = await mempool_client.get_address_txs(ADDRESS, after_txid=page[-1]["txid"])
+    return len(txs), totals(txs)
+
+
+async def run_walk(anchors=(), expected=None):
+    from app.utils.address_history import AddressHistoryWalk, address_flow
+
+    walk = AddressHistoryWalk(ADDRESS, anchors, expected)
+    count = received = sent = 0
+    async for page in walk.iter_pages():
+        count += len(page)
+        for tx in page:
+            r, s = address_flow(tx, ADDRESS)
+            received += r
+            sent += s
+    return walk, count, (received, sent)
+
+
+async def measure(mode: str):
+    from app.utils.mempool_api import mempool_client
+
+    await mempool_client.start()
+    if mode == "parallel":
+        # A previous request recorded the page anchors
+        previous, _, _ = await run_walk()
+        info = await mempool_client.get_address(ADDRESS)
+
+    started = time.perf_counter()
+    if mode == "serial":
+        count, sums = await run_serial()
+    elif mode == "pipelined":
+        _, count, sums = await run_walk()
+    else:
+        info = await mempool_client.get_address(ADDRESS)
+        walk, count, sums = await run_walk(
+            previous.anchors, info["chain_stats"]["tx_count"]
+        )
+        assert walk.complete, "parallel walk did not match chain_stats"
+    elapsed = time.perf_counter() - started
+    await mempool_client.close()
+    return count, sums, elapsed
+
+
+def child(mode: str):
+    count, sums, elapsed = asyncio.run(measure(mode))
+    print(json.dumps({"mode": mode, "txs": count, "totals": sums, "seconds": elapsed}))
+
+
+async def main(tx_count: int, latency_ms: float):
+    runner, requests = await serve(tx_count, latency_ms / 1000)
+    print(f"address history: {tx_count} txs, {latency_ms:g} ms per request")
+    env = dict(
+        os.environ,
+        UMBREL_HOST=HOST,
+        UMBREL_PORT=str(PORT),
+        MEMPOOL_CONCURRENCY_INITIAL="8",
+    )
+    try:
+        for mode in ("serial", "pipelined", "parallel"):
+            requests["count"] = 0
+            proc = await asyncio.create_subprocess_exec(
+                sys.executable, "-m", "benchmarks.address_summary_pagination",
+                "--child", mode, env=env, stdout=subprocess.PIPE,
+            )
+            out, _ = await proc.communicate()
+            result = json.loads(out.decode().strip().splitlines()[-1])
+            print(
+                f"{mode:>9}: {result['txs']} txs in {result['seconds']:.2f}s "
+                f"({requests['count']} requests incl. warm-up), "
+                f"totals {result['totals']}"
+            )
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--txs", type=int, default=10000)
+    parser.add_argument("--latency-ms", type=float, default=10)
+    parser.add_argument("--child", choices=["serial", "pipelined", "parallel"])
+    args = parser.parse_args()
+    if args.child:
+        child(args.child)
+    else:
+        asyncio.run(main(args.txs, args.latency_ms))
@@ -0,0 +1,150 @@
+"""
+Peak RSS of fetching one large verbose block: full ``response.json()`` decode
+versus streaming the transactions with ``rpc_client.stream``.
+
+A local stand-in JSON-RPC server serves a synthetic ``getblock`` verbosity 2
+document, and each mode runs in a fresh subprocess so its peak RSS is not
+polluted by the other.
+
+    cd backend && python -m benchmarks.block_streaming --txs 6000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+from aiohttp import web
+
+HOST = "127.0.0.1"
+PORT = 18553
+
+
+def synthetic_block(tx_count: int) -> bytes:
+    def tx(i):
+        return {
+            "txid": f"{i:064x}",
+            "hash": f"{i:064x}",
+            "version": 2,
+            "size": 370,
+            "vsize": 208,
+            "weight": 832,
+            "locktime": 0,
+            "vin": [
+                {
+                    "txid": f"{i + j:064x}",
+                    "vout": j,
+                    "scriptSig": {"asm": "", "hex": ""},
+                    "txinwitness": ["30" * 71, "02" * 33],
+                    "sequence": 4294967293,
+                }
+                for j in range(2)
+            ],
+            "vout": [
+                {
+                    "value": 0.01 * j,
+                    "n": j,
+                    "scriptPubKey": {
+                        "asm": "0 " + "ab" * 20,
+                        "hex": "0014" + "ab" * 20,
+                        "address": "bc1q" + "x" * 38,
+                        "type": "witness_v0_keyhash",
+                    },
+                }
+                for j in range(2)
+            ],
+            "fee": 0.0001,
+            "hex": "02" * 370,
+        }
+
+    block = {
+        "hash": "00" * 32,
+        "height": 840000,
+        "time": 1713571767,
+        "nTx": tx_count,
+        "tx": [tx(i) for i in range(tx_count)],
+    }
+    return json.dumps({"result": block, "error": None, "id": 0}).encode()
+
+
+async def serve(tx_count: int):
+    body = synthetic_block(tx_count)
+
+    async def rpc(request):
+        await request.read()
+        return web.Response(body=body, content_type="application/json")
+
+    app = web.Application()
+    app.router.add_post("/{tail:.*}", rpc)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, HOST, PORT).start()
+    return runner, len(body)
+
+
+async def fetch(mode: str):
+    from app.utils.bitcoin_rpc import rpc_client
+
+    await rpc_client.start()
+    started = time.perf_counter()
+    if mode == "full":
+        block = await rpc_client.call("getblock", ["00" * 32, 2])
+        count = len(block["tx"])
+    else:
+        count = 0
+        async with rpc_client.stream("getblock", ["00" * 32, 2], "tx") as txs:
+            async for _ in txs:
+                count += 1
+    elapsed = time.perf_counter() - started
+    await rpc_client.close()
+    return count, elapsed
+
+
+def child(mode: str):
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    count, elapsed = asyncio.run(fetch(mode))
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({"mode": mode, "txs": count, "seconds": elapsed,
+                      "baseline_kb": baseline, "peak_kb": peak}))
+
+
+async def main(tx_count: int):
+    runner, size = await serve(tx_count)
+    print(f"block document: {tx_count} txs, {size / 1e6:.1f} MB")
+    env = dict(
+        os.environ,
+        BITCOIN_RPC_BACKENDS=f"{HOST}:{PORT}",
+        BITCOIN_WALLET_NAME="",
+        BITCOIN_RPC_TIMEOUT="300",
+    )
+    try:
+        for mode in ("full", "stream"):
+            proc = await asyncio.create_subprocess_exec(
+                sys.executable, "-m", "benchmarks.block_streaming", "--child", mode,
+                env=env, stdout=subprocess.PIPE,
+            )
+            out, _ = await proc.communicate()
+            result = json.loads(out.decode().strip().splitlines()[-1])
+            print(
+                f"{mode:>6}: {result['txs']} txs in {result['seconds']:.2f}s, "
+                f"peak RSS {result['peak_kb'] / 1024:.1f} MB "
+                f"(+{(result['peak_kb'] - result['baseline_kb']) / 1024:.1f} MB "
+                f"over baseline)"
+            )
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--txs", type=int, default=6000)
+    parser.add_argument("--child", choices=["full", "stream"])
+    args = parser.parse_args()
+    if args.child:
+        child(args.child)
+    else:
+        asyncio.run(main(args.txs))
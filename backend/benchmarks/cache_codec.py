@@ -0,0 +1,158 @@
+"""
+Bytes stored and hit cost of the cache value formats, for the largest
+keyspaces:
+
+* ``address-txs-summary``: the summary of an address with ``--txs`` full
+  transactions (synthetic history of the pagination benchmark)
+* ``tx-info``: a verbose ``getrawtransaction`` with ``--inputs`` inputs
+* ``latest_blocks``: the dashboard list, below the compression threshold
+
+Hashes, scripts and witnesses are randomised so compression is not flattered
+by the repetitive synthetic data. For each format:
+
+* ``plain``: the JSON as stored before the codec existed
+* ``json``: zstd-compressed JSON (``CACHE_VALUE_FORMAT=json``)
+* ``msgpack``: msgpack, zstd-compressed (``CACHE_VALUE_FORMAT=msgpack``)
+
+the stored size, the encode cost on a miss and the decode cost on a hit are
+shown, both to JSON bytes (``get_raw``, returned as ``RawJSONResponse``) and
+to objects (``get``). Redis memory and transfer time scale with the stored
+size.
+
+    cd backend && python -m benchmarks.cache_codec --txs 10000
+"""
+
+import argparse
+import os
+
+from app.utils.serialization import dumps, loads
+from app.utils.value_codec import ValueCodec
+from benchmarks.address_summary_pagination import ADDRESS, synthetic_history
+from benchmarks.json_codec import best_of
+
+
+def random_hex(size: int) -> str:
+    return os.urandom(size).hex()
+
+
+def address_summary(tx_count: int) -> dict:
+    txs = synthetic_history(tx_count)
+    for tx in txs:
+        tx["txid"] = random_hex(32)
+        tx["status"]["block_hash"] = random_hex(32)
+        for vin in tx["vin"]:
+            vin["txid"] = random_hex(32)
+            vin["witness"] = [random_hex(71), random_hex(33)]
+            vin["prevout"]["scriptpubkey"] = "0014" + random_hex(20)
+        for vout in tx["vout"]:
+            vout["scriptpubkey"] = "0014" + random_hex(20)
+    return {
+        "address": ADDRESS,
+        "total_received_sats": 0,
+        "total_sent_sats": 0,
+        "total_received_btc": 0.0,
+        "total_sent_btc": 0.0,
+        "balance_sats": 0,
+        "balance_btc": 0.0,
+        "tx_count": len(txs),
+        "transactions": txs,
+    }
+
+
+def verbose_tx(inputs: int) -> dict:
+    return {
+        "transaction": {
+            "txid": random_hex(32),
+            "hash": random_hex(32),
+            "version": 2,
+            "size": 68 * inputs + 100,
+            "vsize": 68 * inputs + 50,
+            "weight": 272 * inputs + 200,
+            "locktime": 0,
+            "vin": [
+                {
+                    "txid": random_hex(32),
+                    "vout": i % 4,
+                    "scriptSig": {"asm": "", "hex": ""},
+                    "txinwitness": [random_hex(71), random_hex(33)],
+                    "sequence": 4294967293,
+                }
+                for i in range(inputs)
+            ],
+            "vout": [
+                {
+                    "value": 0.015,
+                    "n": n,
+                    "scriptPubKey": {
+                        "asm": "0 " + random_hex(20),
+                        "desc": "addr(bc1qexample)#checksum",
+                        "hex": "0014" + random_hex(20),
+                        "address": "bc1qexample",
+                        "type": "witness_v0_keyhash",
+                    },
+                }
+                for n in range(2)
+            ],
+            "hex": random_hex(68 * inputs + 100),
+            "blockhash": random_hex(32),
+            "confirmations": 3,
+            "time": 1_700_000_000,
+            "blocktime": 1_700_000_000,
+        }
+    }
+
+
+def latest_blocks(count: int = 7) -> dict:
+    return {
+        "latest_blocks": [
+            {
+                "height": 800_000 - i,
+                "hash": random_hex(32),
+                "time": 1_700_000_000 - i * 600,
+                "transactions": 3000,
+            }
+            for i in range(count)
+        ]
+    }
+
+
+def main(tx_count: int, inputs: int, threshold: int, level: int, repeat: int):
+    keyspaces = {
+        "address-txs-summary": address_summary(tx_count),
+        "tx-info": verbose_tx(inputs),
+        "latest_blocks": latest_blocks(),
+    }
+    codecs = {
+        "plain": ValueCodec("json", 0),
+        "json": ValueCodec("json", threshold, level),
+        "msgpack": ValueCodec("msgpack", threshold, level),
+    }
+    print(f"threshold {threshold} bytes, zstd level {level}")
+    print(
+        f"{'keyspace':<20} {'format':>8} {'stored':>12} {'ratio':>6} "
+        f"{'encode':>10} {'hit raw':>10} {'hit obj':>10}"
+    )
+    for keyspace, payload in keyspaces.items():
+        value = dumps(payload)
+        for name, codec in codecs.items():
+            stored = codec.encode(value)
+            encode = best_of(repeat, lambda: codec.encode(value))
+            hit_raw = best_of(repeat, lambda: codec.decode(stored))
+            hit_obj = best_of(repeat, lambda: loads(codec.decode(stored)))
+            print(
+                f"{keyspace:<20} {name:>8} {len(stored):>12,} "
+                f"{len(value) / len(stored):>6.1f} "
+                f"{encode * 1000:>8.2f}ms {hit_raw * 1000:>8.2f}ms "
+                f"{hit_obj * 1000:>8.2f}ms"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--txs", type=int, default=10000)
+    parser.add_argument("--inputs", type=int, default=500)
+    parser.add_argument("--threshold", type=int, default=16 * 1024)
+    parser.add_argument("--level", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    main(args.txs, args.inputs, args.threshold, args.level, args.repeat)
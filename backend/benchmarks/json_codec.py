@@ -0,0 +1,81 @@
+"""
+Cost of serving a cached ``/address/txs/summary`` payload.
+
+The payload is built from the synthetic history of the pagination benchmark
+and stored as JSON bytes, the way Redis returns it. Three paths are timed:
+
+* ``stdlib``: the previous behaviour, ``json.loads`` in ``RedisService.get``,
+  then FastAPI's ``jsonable_encoder`` and ``json.dumps`` for the response
+* ``orjson``: the same decode/encode round trip through
+  ``app.utils.serialization``
+* ``raw``: the stored bytes returned as ``RawJSONResponse``, no decoding
+
+Encoding on a cache miss is timed separately for both libraries.
+
+    cd backend && python -m benchmarks.json_codec --txs 10000
+"""
+
+import argparse
+import json
+import time
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.utils.serialization import FastJSONResponse, RawJSONResponse, dumps, loads
+from benchmarks.address_summary_pagination import ADDRESS, synthetic_history
+
+
+def summary_payload(tx_count: int) -> dict:
+    txs = synthetic_history(tx_count)
+    return {
+        "address": ADDRESS,
+        "total_received_sats": 0,
+        "total_sent_sats": 0,
+        "total_received_btc": 0.0,
+        "total_sent_btc": 0.0,
+        "balance_sats": 0,
+        "balance_btc": 0.0,
+        "tx_count": len(txs),
+        "transactions": txs,
+    }
+
+
+def best_of(repeat: int, fn) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main(tx_count: int, repeat: int):
+    payload = summary_payload(tx_count)
+    cached = json.dumps(payload).encode()
+    print(f"summary payload: {tx_count} txs, {len(cached) / 1e6:.1f} MB")
+
+    hit = {
+        "stdlib": lambda: JSONResponse(
+            jsonable_encoder(json.loads(cached.decode()))
+        ).body,
+        "orjson": lambda: FastJSONResponse(loads(cached)).body,
+        "raw": lambda: RawJSONResponse(cached).body,
+    }
+    for name, fn in hit.items():
+        print(f"cache hit  {name:>6}: {best_of(repeat, fn) * 1000:8.1f} ms")
+
+    miss = {
+        "stdlib": lambda: json.dumps(payload),
+        "orjson": lambda: dumps(payload),
+    }
+    for name, fn in miss.items():
+        print(f"encode     {name:>6}: {best_of(repeat, fn) * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--txs", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    main(args.txs, args.repeat)
@@ -0,0 +1,121 @@
+"""
+Request latency under concurrent load: cache hits through the blocking Redis
+client called from ``async def`` endpoints (the previous behaviour) versus the
+asyncio ``RedisService`` on its shared connection pool.
+
+A local stand-in Redis server answers GET/PING over RESP with ``--latency-ms``
+of delay. ``--requests`` simulated requests arrive at a steady ``--rate`` per
+second; each does the two lookups of an authenticated cache hit (token
+``jti`` and the cached payload). Latency is measured from the scheduled
+arrival, so time spent queued behind a blocked event loop counts. While the
+blocking client waits on the socket, every other request waits with it.
+
+    cd backend && python -m benchmarks.redis_async --rate 500
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import threading
+import time
+
+HOST = "127.0.0.1"
+PORT = 18555
+
+
+async def serve(latency: float, payload: bytes):
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                header = await reader.readline()
+                if not header:
+                    return
+                args = []
+                for _ in range(int(header[1:])):
+                    await reader.readline()
+                    args.append((await reader.readline())[:-2])
+                await asyncio.sleep(latency)
+                command = args[0].upper()
+                if command == b"GET":
+                    writer.write(b"$%d\r\n%s\r\n" % (len(payload), payload))
+                elif command == b"PING":
+                    writer.write(b"+PONG\r\n")
+                else:
+                    # CLIENT SETINFO and friends sent on connect
+                    writer.write(b"+OK\r\n")
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, HOST, PORT)
+    async with server:
+        await server.serve_forever()
+
+
+def run_server(latency: float, payload: bytes):
+    threading.Thread(
+        target=lambda: asyncio.run(serve(latency, payload)), daemon=True
+    ).start()
+    time.sleep(0.2)
+
+
+async def load(mode: str, requests: int, rate: float):
+    import redis
+
+    from app.utils.redis import close_async_redis, get_async_redis
+    from app.utils.redis_service import RedisService, SyncRedisService
+
+    if mode == "sync":
+        service = SyncRedisService(redis.from_url(f"redis://{HOST}:{PORT}/0"))
+
+        async def lookup(key):
+            return service.get(key)
+
+    else:
+        service = RedisService(get_async_redis())
+
+        async def lookup(key):
+            return await service.get(key)
+
+    latencies = []
+    started = time.perf_counter()
+
+    async def request(i: int):
+        arrival = started + i / rate
+        await asyncio.sleep(arrival - time.perf_counter())
+        await lookup(f"jti-{i}")
+        await lookup(f"tx-info:{i}")
+        latencies.append(time.perf_counter() - arrival)
+
+    await asyncio.gather(*(request(i) for i in range(requests)))
+    elapsed = time.perf_counter() - started
+    if mode == "async":
+        await close_async_redis()
+    return latencies, elapsed
+
+
+def main(requests: int, rate: float, latency_ms: float):
+    os.environ["REDIS_URL"] = f"redis://{HOST}:{PORT}/0"
+    run_server(latency_ms / 1000, b'{"transaction": {"txid": "00"}}')
+    print(f"{requests} requests at {rate:.0f}/s, {latency_ms} ms Redis latency")
+    for mode in ("sync", "async"):
+        latencies, elapsed = asyncio.run(load(mode, requests, rate))
+        latencies.sort()
+        p50 = statistics.median(latencies)
+        p99 = latencies[int(len(latencies) * 0.99) - 1]
+        print(
+            f"{mode:>5}: {requests / elapsed:7.0f} req/s, "
+            f"p50 {p50 * 1000:7.1f} ms, p99 {p99 * 1000:7.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--rate", type=float, default=500)
+    parser.add_argument("--latency-ms", type=float, default=1.0)
+    args = parser.parse_args()
+    main(args.requests, args.rate, args.latency_ms)
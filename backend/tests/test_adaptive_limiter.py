@@ -0,0 +1,88 @@
+import asyncio
+
+import pytest
+
+from app.utils.adaptive_limiter import AdaptiveLimiter
+
+
+def make_limiter(limit: int = 1) -> AdaptiveLimiter:
+    return AdaptiveLimiter(
+        "test",
+        initial=limit,
+        min_limit=1,
+        max_limit=10,
+        is_overload=lambda e: isinstance(e, OverflowError),
+    )
+
+
+async def queued_acquire(limiter: AdaptiveLimiter) -> asyncio.Task:
+    task = asyncio.create_task(limiter.acquire())
+    await asyncio.sleep(0)
+    assert limiter.queued == 1
+    return task
+
+
+def test_cancelled_waiter_is_dequeued():
+    async def main():
+        limiter = make_limiter()
+        await limiter.acquire()
+        task = await queued_acquire(limiter)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert limiter.queued == 0
+        assert limiter.in_flight == 1
+
+    asyncio.run(main())
+
+
+def test_cancelled_waiter_already_popped_by_wake_raises_cancelled():
+    async def main():
+        limiter = make_limiter()
+        await limiter.acquire()
+        task = await queued_acquire(limiter)
+        task.cancel()
+        # Before the waiter resumes, a release pops (and skips) its future
+        limiter.release()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert limiter.queued == 0
+        assert limiter.in_flight == 0
+
+    asyncio.run(main())
+
+
+def test_slot_granted_while_cancelled_is_handed_on():
+    async def main():
+        limiter = make_limiter()
+        await limiter.acquire()
+        first = await queued_acquire(limiter)
+        second = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        # The first waiter is granted the slot, then cancelled before it runs
+        limiter.release()
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        await second
+        assert limiter.in_flight == 1
+        assert limiter.queued == 0
+
+    asyncio.run(main())
+
+
+def test_overload_backs_off_once_per_window():
+    async def main():
+        limiter = make_limiter(8)
+
+        async def overloaded():
+            with pytest.raises(OverflowError):
+                async with limiter.slot():
+                    await asyncio.sleep(0)
+                    raise OverflowError
+
+        await asyncio.gather(*(overloaded() for _ in range(4)))
+        assert limiter.limit == 4
+        assert limiter.decreases == 1
+
+    asyncio.run(main())
@@ -0,0 +1,203 @@
+import asyncio
+
+import pytest
+
+from app.utils import address_sync
+from app.utils.address_sync import AddressSyncStore, fetch_address_history
+from app.utils.immutable_store import ImmutableStore
+from app.utils.mempool_api import mempool_client
+from app.utils.rate_limiter import BACKGROUND, INTERACTIVE, request_priority
+from app.utils.serialization import dumps, loads
+
+ADDRESS = "bc1qtest"
+PAGE_SIZE = 25
+
+
+def make_tx(n: int, height: int) -> dict:
+    return {
+        "txid": f"{n:064x}",
+        "status": {"confirmed": True, "block_height": height},
+        "vin": [],
+        "vout": [{"value": 1000 + n, "scriptpubkey_address": ADDRESS}],
+    }
+
+
+class FakeMempool:
+    """Esplora paging over a confirmed history, newest first."""
+
+    def __init__(self, txs):
+        self.txs = txs
+        self.requests = []
+        # after_txid -> txid left out of that page, once
+        self.gaps = {}
+
+    async def get_address_txs(self, address, after_txid=None):
+        self.requests.append(after_txid)
+        start = 0
+        if after_txid is not None:
+            start = [tx["txid"] for tx in self.txs].index(after_txid) + 1
+        page = self.txs[start : start + PAGE_SIZE]
+        gap = self.gaps.pop(after_txid, None)
+        return [tx for tx in page if tx["txid"] != gap]
+
+    async def get_address(self, address):
+        return {"chain_stats": {"tx_count": len(self.txs)}}
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        value = self.data.get(key)
+        return loads(value) if value is not None else None
+
+    async def set(self, key, value, **kwargs):
+        self.data[key] = value
+
+
+@pytest.fixture
+def env(tmp_path, monkeypatch):
+    """A fake mempool API and chain tip, with stores in a temporary dir."""
+    mempool = FakeMempool([make_tx(n, 100 - n) for n in range(60)])
+    tip = {"height": 100}
+
+    async def get_chain_height():
+        return tip["height"]
+
+    store = AddressSyncStore(str(tmp_path / "address_sync.sqlite3"))
+    saves = []
+    save = store._save
+    monkeypatch.setattr(store, "_save", lambda state: (saves.append(state), save(state)))
+    immutable = ImmutableStore(str(tmp_path / "immutable.sqlite3"), min_confirmations=6)
+
+    monkeypatch.setattr(address_sync, "address_sync_store", store)
+    monkeypatch.setattr(address_sync, "immutable_store", immutable)
+    monkeypatch.setattr(address_sync, "get_chain_height", get_chain_height)
+    monkeypatch.setattr(address_sync.settings, "IMMUTABLE_MIN_CONFIRMATIONS", 6)
+    monkeypatch.setattr(mempool_client, "get_address_txs", mempool.get_address_txs)
+    monkeypatch.setattr(mempool_client, "get_address", mempool.get_address)
+    yield mempool, tip, store, saves, immutable
+    store.close()
+    immutable.close()
+
+
+def txids(history):
+    return [tx["txid"] for tx in loads(history.encode_txs())]
+
+
+def test_incremental_refresh_fetches_and_persists_only_what_is_new(env):
+    mempool, tip, store, saves, immutable = env
+
+    async def main():
+        redis = FakeRedis()
+        history = await fetch_address_history(ADDRESS, redis)
+        assert not history.incremental
+        assert txids(history) == [tx["txid"] for tx in mempool.txs]
+        # Heights 100..96 are not final yet at tip 100
+        state = await store.load(ADDRESS)
+        assert state.tx_count == 55
+        assert state.txid == mempool.txs[5]["txid"]
+
+        # A new block with a new tx; height 96 becomes final
+        mempool.txs.insert(0, make_tx(60, 101))
+        tip["height"] = 101
+        mempool.requests.clear()
+        saves.clear()
+
+        history = await fetch_address_history(ADDRESS, redis)
+        assert history.incremental
+        assert mempool.requests == [None]
+        assert txids(history) == [tx["txid"] for tx in mempool.txs]
+        assert history.tx_count == 61
+        assert history.received == sum(tx["vout"][0]["value"] for tx in mempool.txs)
+
+        state = await store.load(ADDRESS)
+        assert len(saves) == 1
+        assert state.tx_count == 56
+        assert state.txid == mempool.txs[5]["txid"]
+        assert state.received == sum(
+            tx["vout"][0]["value"] for tx in mempool.txs[5:]
+        )
+        assert await immutable.get("mempool-tx", state.txid) == mempool.txs[5]
+
+    asyncio.run(main())
+
+
+def test_state_is_not_rewritten_when_nothing_new_is_final(env):
+    mempool, tip, store, saves, immutable = env
+
+    async def main():
+        redis = FakeRedis()
+        await fetch_address_history(ADDRESS, redis)
+        saves.clear()
+
+        history = await fetch_address_history(ADDRESS, redis)
+        assert history.incremental
+        assert txids(history) == [tx["txid"] for tx in mempool.txs]
+        assert saves == []
+
+    asyncio.run(main())
+
+
+def test_stale_anchors_fall_back_to_a_serial_walk(env):
+    mempool, tip, store, saves, immutable = env
+    history_txids = [tx["txid"] for tx in mempool.txs]
+
+    async def main():
+        redis = FakeRedis()
+        # Boundaries that no longer line up with the pages: the walk detects
+        # it after the first parallel fetch and continues serially
+        redis.data[f"address-page-anchors:{ADDRESS}"] = dumps(
+            [[history_txids[24], 76], [history_txids[40], 60]]
+        )
+        history = await fetch_address_history(ADDRESS, redis)
+        assert txids(history) == history_txids
+        assert history.walk.complete
+
+    asyncio.run(main())
+
+
+def test_incomplete_parallel_walk_is_redone_serially(env):
+    mempool, tip, store, saves, immutable = env
+    history_txids = [tx["txid"] for tx in mempool.txs]
+
+    async def main():
+        redis = FakeRedis()
+        await fetch_address_history(ADDRESS, redis)
+        anchors = redis.data[f"address-page-anchors:{ADDRESS}"]
+        assert loads(anchors)[0][0] == history_txids[24]
+
+        # The parallel page after the first anchor comes back one tx short
+        await store.save(address_sync.AddressSyncState(ADDRESS))
+        mempool.gaps[history_txids[24]] = history_txids[30]
+        mempool.requests.clear()
+        history = await fetch_address_history(ADDRESS, redis)
+        assert txids(history) == history_txids
+        assert history.walk.parallel_pages == 0
+        # Parallel walk, then the serial one from the top
+        assert mempool.requests.count(None) == 2
+
+    asyncio.run(main())
+
+
+def test_resync_past_the_first_page_runs_at_background_priority(env, monkeypatch):
+    mempool, tip, store, saves, immutable = env
+    priorities = []
+    get_address_txs = mempool.get_address_txs
+
+    async def recording(address, after_txid=None):
+        priorities.append(request_priority.get())
+        return await get_address_txs(address, after_txid)
+
+    monkeypatch.setattr(mempool_client, "get_address_txs", recording)
+
+    async def main():
+        # The synced tx has been reorged out of the history
+        await store.save(address_sync.AddressSyncState(ADDRESS, txid="ff" * 32))
+        history = await fetch_address_history(ADDRESS, FakeRedis())
+        assert not history.incremental
+        assert txids(history) == [tx["txid"] for tx in mempool.txs]
+        assert priorities == [INTERACTIVE] + [BACKGROUND] * 3
+
+    asyncio.run(main())
@@ -0,0 +1,136 @@
+import asyncio
+
+import pytest
+from aiohttp import web
+
+from app.utils.bitcoin_rpc import BitcoinRPCClient, BitcoinRPCTimeoutError
+from app.utils.serialization import dumps
+
+HOST = "127.0.0.1"
+
+
+async def serve_block(tx_count: int):
+    body = dumps({"result": {"tx": [{"txid": f"{i:064x}"} for i in range(tx_count)]}})
+
+    async def rpc(request):
+        return web.Response(body=body, content_type="application/json")
+
+    app = web.Application()
+    app.router.add_post("/{tail:.*}", rpc)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, HOST, 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"{HOST}:{port}"
+
+
+def test_stream_yields_items_and_releases_on_early_exit():
+    async def main():
+        runner, url = await serve_block(500)
+        client = BitcoinRPCClient(urls=[url])
+        backend = client.pool.backends[0]
+        try:
+            async with client.stream("getblock", ["00" * 32, 2], "tx") as txs:
+                seen = [tx["txid"] async for tx in txs]
+            assert len(seen) == 500
+
+            async with client.stream("getblock", ["00" * 32, 2], "tx") as txs:
+                async for _ in txs:
+                    assert backend.outstanding == 1
+                    assert backend.limiter.in_flight == 1
+                    break
+            assert backend.outstanding == 0
+            assert backend.limiter.in_flight == 0
+        finally:
+            await client.close()
+            await runner.cleanup()
+
+    asyncio.run(main())
+
+
+def test_stream_cancelled_while_queued_does_not_leak_outstanding():
+    async def main():
+        client = BitcoinRPCClient(urls=[f"{HOST}:1"])
+        backend = client.pool.backends[0]
+        # Every slot taken: the stream has to queue
+        backend.limiter.in_flight = int(backend.limiter.limit)
+
+        async def consume():
+            async with client.stream("getblock", ["00" * 32, 2], "tx") as txs:
+                async for _ in txs:
+                    pass
+
+        task = asyncio.create_task(consume())
+        await asyncio.sleep(0.01)
+        assert backend.outstanding == 1
+        assert backend.limiter.queued == 1
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        assert backend.outstanding == 0
+        assert backend.limiter.queued == 0
+        assert backend.limiter.in_flight == int(backend.limiter.limit)
+        await client.close()
+
+    asyncio.run(main())
+
+
+def test_consumer_errors_and_pace_are_not_charged_to_the_node():
+    async def main():
+        runner, url = await serve_block(50)
+        client = BitcoinRPCClient(urls=[url])
+        backend = client.pool.backends[0]
+        try:
+            with pytest.raises(asyncio.TimeoutError):
+                async with client.stream("getblock", ["00" * 32, 2], "tx") as txs:
+                    async for _ in txs:
+                        # e.g. a cache call made while iterating times out
+                        await asyncio.sleep(0.3)
+                        raise asyncio.TimeoutError()
+            assert backend.healthy
+            # Time to headers only, not the consumer's 0.3 s
+            assert backend.ewma_latency < 0.2
+            assert backend.limiter.in_flight == 0
+        finally:
+            await client.close()
+            await runner.cleanup()
+
+    asyncio.run(main())
+
+
+def test_stalled_body_read_ejects_the_backend():
+    async def main():
+        async def rpc(request):
+            response = web.StreamResponse()
+            await response.prepare(request)
+            await response.write(b'{"result": {"tx": [{"txid": "00"},')
+            await asyncio.sleep(1)
+            return response
+
+        app = web.Application()
+        app.router.add_post("/{tail:.*}", rpc)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, HOST, 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+
+        client = BitcoinRPCClient(urls=[f"{HOST}:{port}"])
+        backend = client.pool.backends[0]
+        try:
+            with pytest.raises(BitcoinRPCTimeoutError):
+                async with client.stream(
+                    "getblock", ["00" * 32, 2], "tx", timeout=0.2
+                ) as txs:
+                    async for _ in txs:
+                        pass
+            assert not backend.healthy
+            assert backend.limiter.in_flight == 0
+        finally:
+            await client.close()
+            await runner.cleanup()
+
+    asyncio.run(main())
@@ -0,0 +1,117 @@
+import asyncio
+
+from app.utils.cache_policy import (
+    CONFIRMED,
+    FINAL,
+    TIP,
+    TIP_KEYS,
+    UNCONFIRMED,
+    VOLATILE,
+    CachePolicy,
+    parse_ttls,
+    state_for_confirmations,
+    state_for_mempool_tx,
+)
+from app.utils.redis_service import RedisService
+
+policy = CachePolicy(
+    {UNCONFIRMED: 30, CONFIRMED: 600, FINAL: 0, TIP: 600, VOLATILE: 300},
+    parse_ttls("node_info=5, address-page-anchors=86400,"),
+)
+
+
+def test_namespace_ttl_takes_precedence_over_the_state():
+    assert policy.expiry("node_info", TIP) == 5
+    assert policy.expiry("address-page-anchors:bc1q", FINAL) == 86400
+    assert policy.expiry("tx-info:abc", UNCONFIRMED) == 30
+    assert policy.expiry("tx-info:abc", TIP) == 600
+    assert policy.expiry("wallet_info:bc1q") == 300
+    # 0 means no expiry
+    assert policy.expiry("tx-info:abc", FINAL) is None
+    # Values with an external lifetime keep theirs
+    assert policy.expiry("node_info", TIP, expiry=3600) == 3600
+
+
+def test_states_of_chain_data():
+    assert state_for_confirmations(None) == UNCONFIRMED
+    assert state_for_confirmations(0) == UNCONFIRMED
+    assert state_for_confirmations(1) == TIP
+    assert state_for_confirmations(6) == FINAL
+
+    tip = 100
+    assert state_for_mempool_tx({"status": {"confirmed": False}}, tip) == UNCONFIRMED
+    confirmed = {"status": {"confirmed": True, "block_height": 99}}
+    assert state_for_mempool_tx(confirmed, tip) == CONFIRMED
+    assert state_for_mempool_tx(confirmed, None) == CONFIRMED
+    buried = {"status": {"confirmed": True, "block_height": 95}}
+    assert state_for_mempool_tx(buried, tip) == FINAL
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.calls = []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.calls.append((name, args, kwargs))
+
+    async def execute(self):
+        return [
+            await getattr(self.redis, name)(*args, **kwargs)
+            for name, args, kwargs in self.calls
+        ]
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        pass
+
+
+class FakeRedis:
+    """The commands ``expire_tip_keys`` needs, without expiry."""
+
+    def __init__(self):
+        self.data = {}
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    async def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    async def sadd(self, key, *members):
+        self.data.setdefault(key, set()).update(m.encode() for m in members)
+
+    async def smembers(self, key):
+        return set(self.data.get(key, ()))
+
+    async def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+
+def test_tip_keys_are_expired_once_per_block():
+    async def main():
+        redis = FakeRedis()
+        first, late = RedisService(redis), RedisService(redis)
+
+        await redis.set("node_info", b"old")
+        await redis.sadd(TIP_KEYS, "node_info")
+        await first.expire_tip_keys("block-1")
+        assert "node_info" not in redis.data
+
+        # Recomputed for the new tip before the late worker sees the block
+        await redis.set("node_info", b"new")
+        await redis.sadd(TIP_KEYS, "node_info")
+        await late.expire_tip_keys("block-1")
+        assert redis.data["node_info"] == b"new"
+
+        await late.expire_tip_keys("block-2")
+        assert "node_info" not in redis.data
+        assert TIP_KEYS not in redis.data
+
+    asyncio.run(main())
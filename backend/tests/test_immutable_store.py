@@ -0,0 +1,61 @@
+import asyncio
+
+from app.routers import rpc_node
+from app.utils.bitcoin_rpc import BitcoinRPCError
+from app.utils.immutable_store import ImmutableStore
+
+
+def test_round_trip_off_the_event_loop(tmp_path):
+    async def main():
+        store = ImmutableStore(str(tmp_path / "store.sqlite3"), min_confirmations=6)
+        await store.put_many("tx", [("a", {"n": 1}), ("b", {"n": 2})])
+        # Content is immutable: a second write of the same key is ignored
+        await store.put("tx", "a", {"n": 99})
+        assert await store.get("tx", "a") == {"n": 1}
+        assert await store.get("tx", "missing") is None
+        assert await store.get_many("tx", ["a", "b", "c"]) == {
+            "a": {"n": 1},
+            "b": {"n": 2},
+        }
+        assert await store.get_many("other", ["a"]) == {}
+        assert store.stats()["writes"] == 2
+        store.close()
+
+    asyncio.run(main())
+
+
+def test_final_tx_height_comes_from_the_block_not_the_tip(monkeypatch):
+    indexed = {"indexed-block": 100}
+    headers = {"unindexed-block": {"height": 200}}
+    requested = []
+
+    def locate(block_hash, height_hint):
+        return indexed.get(block_hash)
+
+    async def batch(calls):
+        requested.extend(params[0] for _, params in calls)
+        return [
+            headers.get(block_hash) or BitcoinRPCError("not found", code=-5)
+            for _, (block_hash,) in calls
+        ]
+
+    monkeypatch.setattr(rpc_node.header_index, "locate", locate)
+    monkeypatch.setattr(rpc_node, "bitcoin_rpc_batch", batch)
+
+    txs = [
+        # The index tip (500) lags the node, which already counts 10 more blocks
+        {"txid": "a", "blockhash": "indexed-block", "confirmations": 411},
+        {"txid": "b", "blockhash": "unindexed-block", "confirmations": 311},
+        {"txid": "c", "blockhash": "unknown-block", "confirmations": 50},
+        {"txid": "d", "blockhash": "indexed-block", "confirmations": 2},
+        {"txid": "e", "confirmations": 0},
+    ]
+    records = asyncio.run(rpc_node._final_tx_records(txs, tip=500))
+
+    assert records[0] == {"height": 100, "tx": {"txid": "a", "blockhash": "indexed-block"}}
+    assert records[1]["height"] == 200
+    # Height unknown: not persisted rather than persisted wrong
+    assert records[2] is None
+    # Not final
+    assert records[3] is None and records[4] is None
+    assert requested == ["unindexed-block", "unknown-block"]
@@ -0,0 +1,67 @@
+import asyncio
+import time
+
+import pytest
+
+from app.utils.rate_limiter import BACKGROUND, INTERACTIVE, PriorityRateLimiter, priority
+
+
+def test_interactive_calls_jump_queued_background_ones():
+    async def main():
+        limiter = PriorityRateLimiter("test", rate=100, burst=1)
+        await limiter.acquire()
+        served = []
+
+        async def call(name):
+            await limiter.acquire()
+            served.append(name)
+
+        with priority(BACKGROUND):
+            background = [asyncio.create_task(call(f"background-{i}")) for i in range(3)]
+        await asyncio.sleep(0)
+        assert limiter.queued(BACKGROUND) == 3
+
+        interactive = asyncio.create_task(call("interactive"))
+        await asyncio.gather(interactive, *background)
+        assert served == ["interactive", "background-0", "background-1", "background-2"]
+        assert limiter.queued(BACKGROUND) == limiter.queued(INTERACTIVE) == 0
+
+    asyncio.run(main())
+
+
+def test_cancel_after_dispatch_skipped_the_waiter():
+    async def main():
+        limiter = PriorityRateLimiter("test", rate=1, burst=1)
+        await limiter.acquire()
+        task = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+
+        # Cancelled, then popped and skipped by a dispatch before the task
+        # gets to run its cleanup
+        task.cancel()
+        limiter.tokens = 1
+        limiter._updated = time.monotonic()
+        limiter._dispatch()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert limiter.queued(INTERACTIVE) == 0
+        # The token was not spent on the cancelled caller
+        await asyncio.wait_for(limiter.acquire(), 0.1)
+
+    asyncio.run(main())
+
+
+def test_cancel_while_queued():
+    async def main():
+        limiter = PriorityRateLimiter("test", rate=1, burst=1)
+        await limiter.acquire()
+        task = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        assert limiter.queued(INTERACTIVE) == 1
+
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert limiter.queued(INTERACTIVE) == 0
+
+    asyncio.run(main())
@@ -0,0 +1,37 @@
+import asyncio
+import logging
+
+from redis.exceptions import ConnectionError
+
+from app.utils.cache_policy import TIP
+from app.utils.redis_service import RedisService
+
+
+class UnreachableLock:
+    async def acquire(self):
+        raise ConnectionError("Connection refused")
+
+    async def release(self):
+        raise AssertionError("released a lock that was never acquired")
+
+
+class UnreachableRedis:
+    def lock(self, name, timeout=None, blocking=True):
+        return UnreachableLock()
+
+
+def test_background_refresh_logs_lock_errors(caplog):
+    computed = []
+
+    async def compute():
+        computed.append(True)
+        return b"{}"
+
+    async def main():
+        service = RedisService(UnreachableRedis())
+        await service._refresh("node_info", compute, TIP)
+
+    with caplog.at_level(logging.WARNING, logger="app.utils.redis_service"):
+        asyncio.run(main())
+    assert computed == []
+    assert "Background refresh of node_info failed" in caplog.text
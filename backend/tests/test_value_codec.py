@@ -0,0 +1,53 @@
+import pytest
+
+from app.utils.serialization import dumps, loads
+from app.utils.value_codec import MAGIC, ValueCodec
+
+PAYLOAD = {
+    "address": "bc1qexample",
+    "tx_count": 500,
+    "transactions": [
+        {"txid": f"{n:064x}", "value": n * 1000, "fee": 0.00001 * n, "rbf": n % 2 == 0}
+        for n in range(500)
+    ],
+}
+
+
+@pytest.mark.parametrize("value_format", ["json", "msgpack"])
+def test_large_values_round_trip(value_format):
+    codec = ValueCodec(value_format, compress_threshold=1024)
+    value = dumps(PAYLOAD)
+    stored = codec.encode(value)
+    assert stored[:1] == MAGIC
+    assert len(stored) < len(value)
+    assert loads(codec.decode(stored)) == PAYLOAD
+
+
+def test_small_values_and_legacy_entries_pass_through():
+    codec = ValueCodec("json", compress_threshold=1024)
+    small = dumps({"blocks": 800000})
+    assert codec.encode(small) == small
+    assert codec.encode("jti-value") == b"jti-value"
+    # Written before the codec existed, or by SET elsewhere
+    assert codec.decode(dumps(PAYLOAD)) == dumps(PAYLOAD)
+    assert codec.decode(b"plain") == b"plain"
+    assert codec.decode(None) is None
+    # A threshold of 0 disables compression
+    assert ValueCodec("json", 0).encode(dumps(PAYLOAD)) == dumps(PAYLOAD)
+
+
+def test_non_json_values_are_stored_as_compressed_json():
+    codec = ValueCodec("msgpack", compress_threshold=16)
+    value = b"not json " * 10
+    assert codec.decode(codec.encode(value)) == value
+
+
+def test_unknown_format_is_a_miss(caplog):
+    codec = ValueCodec("json", compress_threshold=1024)
+    assert codec.decode(MAGIC + b"z" + b"\x00" * 16) is None
+    assert "Unknown cache value format" in caplog.text
+
+
+def test_unknown_configured_format_is_rejected():
+    with pytest.raises(ValueError):
+        ValueCodec("pickle", compress_threshold=1024)